@@ -8,118 +8,790 @@ from fastapi import (
 )
 from uuid import uuid4
 import os
+import time
+import asyncio
+import logging
+import threading
+import weakref
+from contextlib import nullcontext
+from pydantic import ValidationError
 from config.settings import settings
-from utils.file_handler import FileHandler
-from services.llm_service import LLMService
-from core.data_processor import DataProcessor
+from utils.file_handler import OUTPUT_FORMATS, FileHandler
+from services.llm_scheduler import LLMScheduler
+from services.agent_events import AgentEvent
 from core.meta_data import MetadataExtractor
-from typing import List
+from core.dataframe_cache import DataFrameCache
+from core.answer_cache import AnswerCache
+from core.query_planner import QueryPlanner
+from core.column_index import ColumnIndex
+from core import metrics, tracing
+from utils.content_store import ContentStore
+from services.ingest_jobs import IngestJob, IngestJobManager, IngestQueueFullError
+from services.repl_pool import ExecutionLimits, ReplPool
+from services.sql_engine import SqlEngine, SqlTable
+from core.excel_reader import table_slug, table_slugs
+from services.chat_memory import ChatMemory
+from fastapi.concurrency import run_in_threadpool
+from typing import Callable, Dict, List, Optional
 
-# from api.websocket import ConnectionManager
+from api.websocket import Connection, ConnectionClosedError, ConnectionManager
 from schema.requests import QueryRequest
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+# Fail at startup rather than on the first upload
+if settings.OUTPUT_FORMAT not in OUTPUT_FORMATS:
+    raise ValueError(
+        f"OUTPUT_FORMAT must be one of {', '.join(OUTPUT_FORMATS)}, "
+        f"not {settings.OUTPUT_FORMAT!r}"
+    )
 file_handler = FileHandler()
 meta_data = MetadataExtractor()
-llm_service = LLMService(settings.MODEL_NAME)
+dataframe_cache = DataFrameCache(settings.DATAFRAME_CACHE_MAX_BYTES)
+content_store = ContentStore(
+    settings.UPLOAD_DIR,
+    settings.OUTPUT_DIR,
+    settings.UPLOAD_STORE_MAX_BYTES,
+    settings.UPLOAD_RETENTION_SECONDS,
+)
+answer_cache = (
+    AnswerCache(
+        settings.ANSWER_CACHE_PATH,
+        settings.ANSWER_CACHE_TTL_SECONDS,
+        settings.ANSWER_CACHE_MAX_ENTRIES,
+    )
+    if settings.ANSWER_CACHE_MODE != "off"
+    else None
+)
+ingest_jobs = IngestJobManager(settings.INGEST_WORKERS, settings.INGEST_QUEUE_DEPTH)
+llm_scheduler = LLMScheduler(
+    settings.LLM_REQUESTS_PER_MINUTE,
+    settings.LLM_BURST,
+    settings.LLM_MAX_CONCURRENCY,
+    target_latency=settings.LLM_TARGET_LATENCY_SECONDS,
+    timeout=settings.LLM_TIMEOUT_SECONDS,
+    max_retries=settings.LLM_MAX_RETRIES,
+    backoff=settings.LLM_BACKOFF_SECONDS,
+)
+sql_engine = (
+    SqlEngine(
+        settings.SQL_THREADS,
+        settings.SQL_MEMORY_LIMIT,
+        settings.SQL_TIMEOUT_SECONDS,
+        settings.SQL_MAX_ROWS,
+    )
+    if settings.SQL_TOOL
+    else None
+)
+query_planner = QueryPlanner() if settings.QUERY_PLANNER else None
+chat_memory = ChatMemory(settings.CHAT_MEMORY_TOKENS, settings.CHAT_MEMORY_TURNS)
+repl_pool = (
+    ReplPool(
+        settings.REPL_POOL_SIZE,
+        settings.REPL_IDLE_SECONDS,
+        ExecutionLimits(
+            settings.REPL_CPU_SECONDS,
+            settings.REPL_TIMEOUT_SECONDS,
+            settings.REPL_MEMORY_MB * 2**20,
+        ),
+    )
+    if settings.REPL_POOL_SIZE > 0
+    else None
+)
+
+
+# Built on first use: importing langchain and the model client takes seconds
+_llm_service = None
+_llm_service_lock = threading.Lock()
 
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+def get_llm_service():
+    """Return the LLMService, building it on first call."""
+    global _llm_service
+    with _llm_service_lock:
+        if _llm_service is None:
+            from services.llm_service import LLMService
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+            _llm_service = LLMService(
+                settings.MODEL_NAME,
+                settings.MAX_CONCURRENT_QUERIES,
+                verbose=settings.AGENT_VERBOSE,
+                scheduler=llm_scheduler,
+                sql_engine=sql_engine,
+                preferred_tool=settings.AGENT_PREFERRED_TOOL,
+            )
+        return _llm_service
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
 
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+# Startup work done in the background; the app is ready once it finishes
+readiness = {"ready": False, "warmup_seconds": None, "error": None}
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
 
+async def warmup() -> None:
+    """
+    Do the work that would otherwise slow the first requests: build the LLM
+    service, load the SQL engine and start the ingest worker processes.
+    """
+    started = time.perf_counter()
+    try:
+        with tracing.span("warmup"):
+            # Worker processes start while this process imports langchain
+            steps = [*map(asyncio.wrap_future, ingest_jobs.warmup())]
+            steps.append(run_in_threadpool(get_llm_service))
+            if sql_engine is not None:
+                steps.append(run_in_threadpool(sql_engine.run, "SELECT 1", []))
+            await asyncio.gather(*steps)
+    except Exception as e:
+        logger.exception("Warmup failed")
+        readiness["error"] = str(e)
+        return
+    readiness["warmup_seconds"] = round(time.perf_counter() - started, 3)
+    readiness["ready"] = True
+    logger.info(f"Warmup finished in {readiness['warmup_seconds']}s")
 
-manager = ConnectionManager()
+
+manager = ConnectionManager(
+    settings.WS_SEND_QUEUE_SIZE, settings.WS_SEND_TIMEOUT_SECONDS
+)
+
+metrics.gauge(
+    "dataframe_cache_bytes",
+    "Memory used by cached datasets.",
+    lambda: dataframe_cache.stats()["bytes"],
+)
+metrics.gauge(
+    "websocket_connections",
+    "Open websocket connections.",
+    lambda: len(manager.active_connections),
+)
+metrics.gauge(
+    "llm_concurrency_limit",
+    "Adaptive limit on model calls in flight.",
+    lambda: llm_scheduler.limit,
+)
+metrics.gauge(
+    "llm_calls_in_flight",
+    "Model calls in flight.",
+    lambda: llm_scheduler.stats()["in_flight"],
+)
+if repl_pool is not None:
+    metrics.gauge(
+        "repl_workers", "Live REPL worker processes.", lambda: repl_pool.stats()["workers"]
+    )
 
 
 @router.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
+    file_id = str(uuid4())
     try:
-        file_id = str(uuid4())
-        file_path = os.path.join(settings.UPLOAD_DIR, f"{file_id}_{file.filename}")
-        output_path = os.path.join(settings.OUTPUT_DIR, f"{file_id}.csv")
+        file_type = file.filename.split(".")[-1].lower()
+
+        if file_type not in ["csv", "xlsx"]:
+            raise ValueError("Unsupported file type")
 
         # Create directories if they don't exist
         os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
         os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
 
-        # Save and process file
-        file_handler.save_upload_file(file, file_path)
-        file_type = file.filename.split(".")[-1].lower()
+        # Save the upload under the hash of its contents
+        digest, file_path = await run_in_threadpool(
+            content_store.save_upload, file, f".{file_type}"
+        )
+        # Registering up front keeps the blob from being evicted mid-ingest
+        content_store.register(file_id, digest, file.filename)
 
-        if file_type not in ["csv", "xlsx"]:
-            raise ValueError("Unsupported file type")
+        # Artifacts of a digest still being ingested may be incomplete; join its job
+        if not ingest_jobs.is_active(digest) and content_store.is_processed(digest):
+            job = ingest_jobs.completed(digest, file_id, file.filename)
+            _evict_unreferenced()
+        else:
+            job = ingest_jobs.submit(
+                digest, file_path, file_type, file_id, file.filename, _on_ingest_finished
+            )
 
-        data_processor = DataProcessor()
-        data_processor.clean_and_process_file(
-            file_path=file_path, output_path=output_path
-        )
+        return {
+            "file_id": file_id,
+            "filename": file.filename,
+            "job_id": job.job_id,
+            "status": job.status,
+            "deduplicated": job.stage == "deduplicated" or job.file_ids[0] != file_id,
+        }
 
-        return {"file_id": file_id, "filename": file.filename}
+    except IngestQueueFullError as e:
+        content_store.remove(file_id)
+        raise HTTPException(status_code=503, detail=str(e))
 
     except Exception as e:
+        content_store.remove(file_id)
         raise HTTPException(status_code=400, detail=f"Failed to upload file: {str(e)}")
 
 
-async def query(query_request: QueryRequest):
+# Queries of one chat session use its REPL worker one after another
+_session_turns: Dict[str, asyncio.Lock] = {}
+
+# Appends to one file_id run one after another, each on top of the last. A
+# lock lives only while an append holds or waits for it
+_append_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+@router.post("/files/{file_id}/append")
+async def append_file(file_id: str, file: UploadFile = File(...)):
+    """
+    Append the rows of a CSV or Excel file to the dataset of file_id. Only the
+    new rows are cleaned, into a new part next to the existing data; file_id
+    then refers to the grown dataset.
+    """
+    file_type = file.filename.split(".")[-1].lower()
+    if file_type not in ["csv", "xlsx"]:
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+
+    lock = _append_locks.setdefault(file_id, asyncio.Lock())
+    async with lock:
+        try:
+            await ingest_jobs.wait_for_file(file_id, settings.INGEST_WAIT_SECONDS)
+            base = content_store.resolve(file_id)
+            file_handler.find_output(settings.OUTPUT_DIR, base)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail=f"Unknown file_id: {file_id}")
+        except Exception as e:
+            raise HTTPException(status_code=409, detail=f"Dataset not ready: {str(e)}")
+
+        try:
+            digest, file_path = await run_in_threadpool(
+                content_store.save_upload, file, f".{file_type}", base
+            )
+            content_store.update(file_id, digest)
+            if not ingest_jobs.is_active(digest) and content_store.is_processed(digest):
+                job = ingest_jobs.completed(digest, file_id, file.filename)
+            else:
+                job = ingest_jobs.submit(
+                    digest,
+                    file_path,
+                    file_type,
+                    file_id,
+                    file.filename,
+                    lambda job: _on_append_finished(job, base),
+                    base=base,
+                )
+        except IngestQueueFullError as e:
+            content_store.update(file_id, base)
+            raise HTTPException(status_code=503, detail=str(e))
+        except Exception as e:
+            content_store.update(file_id, base)
+            raise HTTPException(status_code=400, detail=f"Failed to append: {str(e)}")
+
+    return {
+        "file_id": file_id,
+        "filename": file.filename,
+        "job_id": job.job_id,
+        "status": job.status,
+        "deduplicated": job.stage == "deduplicated",
+    }
+
+
+def _on_append_finished(job: IngestJob, base: str) -> None:
+    # A failed append leaves the dataset as it was
+    if job.status == "failed":
+        for file_id in job.file_ids:
+            content_store.update(file_id, base)
+            ingest_jobs.detach(file_id, job)
+        _remove_failed_artifacts(job)
+    _evict_unreferenced()
+
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job_id: {job_id}")
+    return job.to_dict()
+
+
+def _on_ingest_finished(job: IngestJob) -> None:
+    # A failed ingest leaves nothing to query, so release its references
+    if job.status == "failed":
+        for file_id in job.file_ids:
+            content_store.remove(file_id)
+        _remove_failed_artifacts(job)
+    _evict_unreferenced()
+
+
+def _remove_failed_artifacts(job: IngestJob) -> None:
+    # A worker killed mid-write leaves partial outputs that later identical
+    # uploads would dedup onto, unless a retry of the digest is already running
+    if not ingest_jobs.is_active(job.digest):
+        content_store.remove_artifacts(job.digest)
+
+
+def _evict_unreferenced() -> None:
+    for evicted in content_store.evict():
+        dataframe_cache.invalidate(evicted)
+        if answer_cache is not None:
+            answer_cache.invalidate(evicted)
+
+
+@router.delete("/files/{file_id}")
+async def delete_file(file_id: str):
+    if not content_store.remove(file_id):
+        raise HTTPException(status_code=404, detail=f"Unknown file_id: {file_id}")
+    _evict_unreferenced()
+    return {"file_id": file_id, "deleted": True}
+
+
+@router.get("/files/{file_id}/tables")
+async def file_tables(file_id: str):
+    """Tables of a multi-sheet Excel upload; empty for single-table uploads."""
     try:
-        output_path = os.path.join(settings.OUTPUT_DIR, f"{query_request.file_id}.csv")
-        df = file_handler.read_dataframe(output_path, "csv")
-        metadata = meta_data.extract_metadata(df)
+        output_path, _ = file_handler.find_output(
+            settings.OUTPUT_DIR, content_store.resolve(file_id)
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    tables = file_handler.read_sidecar(output_path).get("tables", [])
+    return {
+        "file_id": file_id,
+        "tables": [{"table": t["table"], "name": t["name"]} for t in tables],
+    }
+
+
+@router.get("/store/stats")
+async def store_stats():
+    return {**content_store.stats(), "ingest": ingest_jobs.stats()}
+
+
+def _load_dataset(file_path: str):
+    file_type = os.path.splitext(file_path)[1].lstrip(".")
+    with tracing.span("read", format=file_type) as span:
+        df = file_handler.read_dataframe(file_path, file_type)
+        span["rows"] = len(df)
+
+    with tracing.span("metadata"):
+        # Profiles and column indexes are built at ingest; older artifacts get
+        # them here
+        sidecar = file_handler.read_sidecar(file_path)
+        updates = {}
+        profile = sidecar.get("profile")
+        if profile is None:
+            profile = updates["profile"] = meta_data.profile(df)
+        column_index = ColumnIndex.from_dict(sidecar.get("column_index"))
+        if column_index is None:
+            column_index = ColumnIndex.build(profile)
+            updates["column_index"] = column_index.to_dict()
+        if updates:
+            file_handler.write_sidecar(file_path, updates)
+
+        metadata = meta_data.extract_metadata(df, profile)
+        metadata["Column Index"] = column_index
+    return df, metadata
+
+
+def _sql_tables(
+    dataset_key: str, output_path: str, file_type: str, query_request: QueryRequest
+) -> List[SqlTable]:
+    """
+    Tables the agent can query with SQL: the dataset as "df", the other
+    sheets of its workbook by table name, and the tables of the uploads in
+    query_request.file_ids named after their file names.
+    """
+    # (name, dataset key, source) of each table; names are made unique below
+    candidates = [("df", dataset_key, "")]
+    uploads = [(query_request.file_id, None)] + [
+        (file_id, content_store.filename(file_id) or file_id)
+        for file_id in query_request.file_ids
+    ]
+    for file_id, filename in uploads:
+        key = content_store.resolve(file_id)
+        path, _ = file_handler.find_output(settings.OUTPUT_DIR, key)
+        tables = file_handler.read_sidecar(path).get("tables") or [
+            {"table": "", "key": key}
+        ]
+        stem = table_slug(os.path.splitext(filename)[0]) if filename else ""
+        for i, table in enumerate(tables):
+            if table["key"] == dataset_key:
+                continue
+            if not stem:
+                name = table["table"]
+            else:
+                name = stem if i == 0 else f"{stem}_{table['table']}"
+            candidates.append((name, table["key"], filename or ""))
 
-        agent_executor = llm_service.setup_agent(df, metadata)
-        query_input = f"""
-        query: {query_request.query}
+    sql_tables = []
+    names = table_slugs([name for name, _, _ in candidates])
+    for name, (_, key, source) in zip(names, candidates):
+        if key == dataset_key:
+            path, part_type = output_path, file_type
+        else:
+            path, part_type = file_handler.find_output(settings.OUTPUT_DIR, key)
+        sql_tables.append(
+            SqlTable(
+                # Unquoted SQL identifiers can't start with a digit
+                name=f"t_{name}" if name[0].isdigit() else name,
+                paths=file_handler.part_paths(path, part_type),
+                file_type=part_type,
+                source=source,
+            )
+        )
+    return sql_tables
+
+
+def _build_prompt(query_text: str, metadata) -> str:
+    """Agent input for query_text; wide tables list only the relevant columns."""
+    columns = metadata["Schema"]
+    column_index = metadata.get("Column Index")
+    schema_note = ""
+    if column_index is not None and len(columns) > settings.SCHEMA_PRUNE_MIN_COLUMNS:
+        columns = column_index.select(query_text, settings.SCHEMA_TOP_K)
+        schema_note = (
+            f" (the {len(columns)} of {len(metadata['Schema'])} columns most relevant"
+            " to the query; call the full_schema tool if you need the others)"
+        )
+
+    return f"""
+        query: {query_text}
         You're task is to write code to satisfy the query and also execute.
         Use the tools provided to execute the code.
         Output the stdout of the code exectution.
         The output should be formatted so that each row appears on a new line, enclosed in a Python code block.
         
-        Here is the dataset schema:
-        {metadata['Schema']}
+        Here is the dataset schema{schema_note}:
+        {columns}
+
+        Column profile (use it instead of running code to explore values):
+        {meta_data.render_profile(metadata['Profile'], columns)}
         """
 
-        result = agent_executor.invoke({"input": query_input, "chat_history": ""})
-        return {"response": result["output"]}
 
+@router.get("/cache/stats")
+async def cache_stats():
+    return dataframe_cache.stats()
+
+
+@router.get("/answers/stats")
+async def answer_cache_stats():
+    return answer_cache.stats() if answer_cache is not None else {"entries": 0}
+
+
+@router.get("/repl/stats")
+async def repl_stats():
+    return repl_pool.stats() if repl_pool is not None else {"workers": 0}
+
+
+@router.get("/llm/stats")
+async def llm_stats():
+    return llm_scheduler.stats()
+
+
+@router.get("/chat/stats")
+async def chat_stats():
+    return chat_memory.stats()
+
+
+def _run_plan(
+    query_text: str,
+    df,
+    metadata,
+    on_event: Optional[Callable[[AgentEvent], None]] = None,
+) -> Optional[dict]:
+    """Answer query_text with the query planner, or return None to use the agent."""
+    plan = query_planner.plan(query_text, df, metadata.get("Profile"))
+    if plan is None:
+        return None
+    if on_event:
+        on_event({"type": "plan", "kind": plan.kind, "code": plan.code})
+    try:
+        result = plan.execute(df)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Query failed: {str(e)}")
+        logger.warning(f"Planned query failed, falling back to the agent: {e}")
+        return None
+    return {
+        "response": query_planner.render(result),
+        "cache": "miss",
+        "path": "planner",
+        "code": plan.code,
+    }
+
+
+async def query(
+    query_request: QueryRequest,
+    on_event: Optional[Callable[[AgentEvent], None]] = None,
+    priority: int = 0,
+):
+    with tracing.trace() as trace:
+        try:
+            response = await _answer_query(query_request, on_event, priority)
+        except Exception as e:
+            metrics.QUERIES.inc(path="error")
+            raise HTTPException(status_code=400, detail=f"Query failed: {str(e)}")
+    timing = trace.timing()
+    metrics.QUERIES.inc(path=response["path"])
+    metrics.QUERY_SECONDS.observe(timing["total_seconds"], path=response["path"])
+    if query_request.timing:
+        response["timing"] = timing
+
+    # Follow-up questions in the session can refer to this answer by handle
+    if query_request.session_id is not None:
+        response["handle"] = chat_memory.add(
+            query_request.session_id, query_request.query, response["response"]
+        )
+    return response
+
+
+async def _answer_query(
+    query_request: QueryRequest,
+    on_event: Optional[Callable[[AgentEvent], None]] = None,
+    priority: int = 0,
+) -> dict:
+    session_id = query_request.session_id
+    # Questions that lean on earlier answers mean something else next time
+    follow_up = session_id is not None and chat_memory.is_follow_up(
+        session_id, query_request.query
+    )
+    chat_history = chat_memory.render(session_id) if session_id else ""
+    results = chat_memory.results(session_id) if session_id else {}
+
+    with tracing.span("ingest_wait"):
+        for file_id in [query_request.file_id, *query_request.file_ids]:
+            await ingest_jobs.wait_for_file(file_id, settings.INGEST_WAIT_SECONDS)
+    # Answers joining other uploads depend on more than this dataset
+    joined = bool(query_request.file_ids)
+    if joined and sql_engine is None:
+        raise ValueError("Joining other file_ids needs the SQL tool (SQL_TOOL=true)")
+
+    # Identical uploads share one artifact and one cache entry
+    dataset_key = content_store.resolve(query_request.file_id)
+    if query_request.table is not None:
+        dataset_key = file_handler.find_table(
+            settings.OUTPUT_DIR, dataset_key, query_request.table
+        )
+    output_path, file_type = file_handler.find_output(
+        settings.OUTPUT_DIR, dataset_key
+    )
+
+    # Repeated questions on the same content skip the agent
+    cached = None
+    if answer_cache is not None and not follow_up and not joined:
+        with tracing.span("answer_cache") as span:
+            cached = await run_in_threadpool(
+                answer_cache.get, dataset_key, query_request.query
+            )
+            span["hit"] = cached is not None
+        if cached is not None and (
+            settings.ANSWER_CACHE_MODE != "reexecute" or not cached.code
+        ):
+            return {"response": cached.answer, "cache": "hit", "path": "cache"}
+
+    with tracing.span("load"):
+        entry = await run_in_threadpool(
+            dataframe_cache.get_or_load, dataset_key, output_path, _load_dataset
+        )
+    metadata = entry.metadata
+
+    # Simple top-N, filter, aggregate and count questions skip the LLM
+    if query_planner is not None and not follow_up and not joined:
+        with tracing.span("plan") as span:
+            planned = await run_in_threadpool(
+                _run_plan, query_request.query, entry.df, metadata, on_event
+            )
+            span["matched"] = planned is not None
+        if planned is not None:
+            return planned
+
+    query_input = _build_prompt(query_request.query, metadata)
+    sql_tables = None
+    if sql_engine is not None:
+        sql_tables = await run_in_threadpool(
+            _sql_tables, dataset_key, output_path, file_type, query_request
+        )
+        if joined:
+            names = ", ".join(table.name for table in sql_tables[1:])
+            query_input += f"\n        Other tables to join with in SQL: {names}\n"
+
+    async def answer(df, repl=None):
+        llm_service = await run_in_threadpool(get_llm_service)
+        if cached is not None:
+            # Re-run the cached code locally instead of asking the LLM again
+            with tracing.span("replay"):
+                response = await run_in_threadpool(
+                    llm_service.replay, df, cached.code, repl
+                )
+            return {"response": response, "cache": "replayed", "path": "replay"}
+
+        result = await llm_service.arun_agent(
+            df,
+            metadata,
+            query_input,
+            repl=repl,
+            on_event=on_event,
+            chat_history=chat_history,
+            variables={"results": results},
+            priority=priority,
+            sql_tables=sql_tables,
+        )
+        if (
+            answer_cache is not None
+            and not follow_up
+            and not joined
+            and not result["output"].startswith("Agent stopped")
+        ):
+            await run_in_threadpool(
+                answer_cache.put,
+                dataset_key,
+                query_request.query,
+                result["output"],
+                llm_service.executed_code(result),
+                len(result.get("intermediate_steps", [])) + 1,
+            )
+        return {"response": result["output"], "cache": "miss", "path": "agent"}
+
+    if repl_pool is None:
+        # Hand the agent a copy so generated code can't mutate the cached frame
+        df = await run_in_threadpool(entry.df.copy)
+        return await answer(df)
+
+    # The session's worker process loads the artifact itself and keeps it,
+    # with any variables from earlier answers, for follow-up questions
+    worker_session = session_id or str(uuid4())
+    # Queries of one session take turns here, instead of each holding a
+    # threadpool thread while it waits in the pool for the session's worker
+    turn = (
+        _session_turns.setdefault(session_id, asyncio.Lock())
+        if session_id is not None
+        else nullcontext()
+    )
+    async with turn:
+        acquire = asyncio.ensure_future(
+            run_in_threadpool(
+                repl_pool.acquire,
+                worker_session,
+                dataset_key,
+                output_path,
+                file_type,
+                settings.REPL_ACQUIRE_TIMEOUT_SECONDS or None,
+            )
+        )
+        cancelled = False
+        try:
+            with tracing.span("repl_acquire"):
+                # Shielded: a cancelled query still frees the worker once acquired
+                worker = await asyncio.shield(acquire)
+            return await answer(None, worker)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            keep = session_id is not None and not cancelled
+            acquire.add_done_callback(
+                lambda acquired: _free_repl_session(acquired, worker_session, keep)
+            )
+
+
+def _free_repl_session(acquired: asyncio.Future, session_id: str, keep: bool) -> None:
+    """
+    Give back the worker of a finished query once its acquire completes:
+    released for follow-ups if keep, otherwise closed, which also stops code
+    a cancelled query left running in it.
+    """
+    if acquired.cancelled() or acquired.exception() is not None:
+        return
+    if keep:
+        repl_pool.release(session_id)
+    else:
+        asyncio.ensure_future(
+            run_in_threadpool(repl_pool.close_session, session_id, force=True)
+        )
+
+
+async def _run_query(
+    connection: Connection, query_request: QueryRequest, priority: int = 0
+) -> None:
+    """Run one query, streaming its agent events and answer to connection."""
+    request_id = query_request.request_id
+    loop = asyncio.get_running_loop()
+
+    def emit(event: AgentEvent) -> None:
+        # Called on the agent's worker thread, which waits while the client's
+        # send queue is full so a slow reader throttles its own query
+        asyncio.run_coroutine_threadsafe(
+            connection.send({**event, "request_id": request_id}), loop
+        ).result()
+
+    try:
+        await connection.send({"type": "start", "request_id": request_id})
+        try:
+            response = await query(query_request, on_event=emit, priority=priority)
+            message = {"type": "final", "request_id": request_id, **response}
+        except asyncio.CancelledError:
+            message = {"type": "cancelled", "request_id": request_id}
+        except HTTPException as e:
+            message = {"type": "error", "request_id": request_id, "detail": e.detail}
+        await connection.send(message)
+    except ConnectionClosedError:
+        pass
+    finally:
+        connection.tasks.pop(request_id, None)
+
+
+async def _handle_message(connection: Connection, session_id: str, data: dict) -> None:
+    request_id = data.get("request_id") or str(uuid4())
+    if data.get("type") == "cancel":
+        task = connection.tasks.get(request_id)
+        if task is not None:
+            task.cancel()
+        return
+
+    try:
+        query_request = QueryRequest(**data)
+    except ValidationError as e:
+        detail = f"Query failed: {str(e)}"
+        await connection.send({"type": "error", "request_id": request_id, "detail": detail})
+        return
+    if request_id in connection.tasks:
+        detail = f"Query failed: request_id {request_id} is already in flight"
+        await connection.send({"type": "error", "request_id": request_id, "detail": detail})
+        return
+    if len(connection.tasks) >= settings.WS_MAX_QUERIES_IN_FLIGHT:
+        detail = "Query failed: too many queries in flight on this connection"
+        await connection.send({"type": "error", "request_id": request_id, "detail": detail})
+        return
+
+    query_request.request_id = request_id
+    # Sessions are bound to the connection so clients can't share workers
+    query_request.session_id = session_id
+    # A connection's queries queue behind those it already has in flight, so
+    # one busy client can't hold back the model calls of the others
+    priority = len(connection.tasks)
+    connection.tasks[request_id] = asyncio.ensure_future(
+        _run_query(connection, query_request, priority)
+    )
+
+
+@router.get("/ws/stats")
+async def websocket_stats():
+    return manager.stats()
 
 
 @router.websocket("/ws/query")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    connection = await manager.connect(websocket)
+    # Follow-ups on one connection share a REPL worker
+    session_id = connection.id
     try:
+        # Queries run as tasks so one socket can have several in flight
         while True:
             data = await websocket.receive_json()
-            if (
-                websocket.application_state == "CLOSING"
-                or websocket.application_state == "CLOSED"
-            ):
-                break
-            query_request = QueryRequest(**data)
-            try:
-                response = await query(query_request)
-                await manager.broadcast(response["response"])
-
-            except Exception as e:
-                error_message = f"Query failed: {str(e)}"
-                await manager.broadcast(f"{error_message}")
-
-    except WebSocketDisconnect:
-        manager.disconnect(websocket)
-        await manager.broadcast("A client disconnected.")
+            await _handle_message(connection, session_id, data)
+
+    except (WebSocketDisconnect, ConnectionClosedError):
+        pass
+
+    finally:
+        tasks = list(connection.tasks.values())
+        await manager.disconnect(connection)
+        # Cancelled queries give their REPL worker back before it is closed
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if repl_pool is not None:
+            await run_in_threadpool(repl_pool.close_session, session_id)
+        _session_turns.pop(session_id, None)
+        chat_memory.clear(session_id)
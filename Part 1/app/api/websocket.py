@@ -1,21 +1,146 @@
+import asyncio
+import logging
+from typing import Any, Dict, List
+from uuid import uuid4
+
 from fastapi import WebSocket
-from typing import List
+
+
+class ConnectionClosedError(Exception):
+    """Raised when sending to a connection that has been closed."""
+
+
+class Connection:
+    """
+    A websocket with its own bounded send queue. A writer task drains the
+    queue, so a slow client only ever holds up senders to that client.
+    """
+
+    def __init__(self, websocket: WebSocket, queue_size: int, send_timeout: float):
+        """
+        Initialize the Connection.
+
+        Args:
+            websocket (WebSocket): Accepted websocket
+            queue_size (int): Messages buffered before senders wait
+            send_timeout (float): Seconds a sender waits for room before the
+                client is treated as stalled and disconnected
+        """
+        self.id = str(uuid4())
+        self.websocket = websocket
+        self.send_timeout = send_timeout
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.closed = False
+        self.logger = logging.getLogger(__name__)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._writer = asyncio.ensure_future(self._write_loop())
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        """
+        Queue a message, waiting while the queue is full.
+
+        Raises:
+            ConnectionClosedError: If the connection is closed, or stalls for
+                longer than send_timeout
+        """
+        if self.closed:
+            raise ConnectionClosedError(f"Connection {self.id} is closed")
+        try:
+            await asyncio.wait_for(self._queue.put(message), self.send_timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"Closing stalled connection {self.id}")
+            await self.close()
+            raise ConnectionClosedError(f"Connection {self.id} stalled")
+
+    def try_send(self, message: Dict[str, Any]) -> bool:
+        """Queue a message without waiting; drop it if the queue is full."""
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.logger.warning(f"Dropped message for slow connection {self.id}")
+            return False
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def close(self) -> None:
+        """Cancel in-flight queries and stop the writer."""
+        if self.closed:
+            return
+        self.closed = True
+        for task in list(self.tasks.values()):
+            task.cancel()
+        self._writer.cancel()
+        # Unblock senders still waiting for room
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                message = await self._queue.get()
+                await self.websocket.send_json(message)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.logger.debug(f"Send to connection {self.id} failed: {e}")
+            await self.close()
 
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    """
+    Tracks open websocket connections. Replies go to the connection that
+    asked; broadcasts are queued on every connection without waiting, so
+    delivery to each client proceeds in parallel.
+    """
 
-    async def connect(self, websocket: WebSocket):
+    def __init__(self, queue_size: int = 256, send_timeout: float = 10.0):
+        """
+        Initialize the ConnectionManager.
+
+        Args:
+            queue_size (int): Send queue bound per connection
+            send_timeout (float): Seconds before a stalled client is dropped
+        """
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.active_connections: Dict[str, Connection] = {}
+
+    async def connect(self, websocket: WebSocket) -> Connection:
         await websocket.accept()
-        self.active_connections.append(websocket)
+        connection = Connection(websocket, self.queue_size, self.send_timeout)
+        self.active_connections[connection.id] = connection
+        return connection
+
+    async def disconnect(self, connection: Connection) -> None:
+        self.active_connections.pop(connection.id, None)
+        await connection.close()
+
+    async def send_personal_message(
+        self, message: Dict[str, Any], connection: Connection
+    ) -> None:
+        await connection.send(message)
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+    async def broadcast(self, message: Dict[str, Any]) -> int:
+        """
+        Queue message on every connection; slow clients miss it.
 
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+        Returns:
+            int: Connections the message was queued on
+        """
+        return sum(
+            connection.try_send(message)
+            for connection in list(self.active_connections.values())
+        )
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
+    def stats(self) -> Dict[str, Any]:
+        connections: List[Connection] = list(self.active_connections.values())
+        return {
+            "connections": len(connections),
+            "queries_in_flight": sum(len(c.tasks) for c in connections),
+            "queued_messages": sum(c.pending for c in connections),
+        }
@@ -0,0 +1,93 @@
+"""
+Compare the legacy and vectorized cleaning engines on the bundled stats CSV
+scaled up by replication.
+
+Run from the app directory:
+    python -m benchmarks.bench_cleaning --scales 10,50
+
+The legacy engine needs several GB of RAM at 100x; use --skip-legacy there.
+"""
+
+import argparse
+import glob
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from core.data_processor import DataProcessor, VectorizedDataProcessor
+
+DEFAULT_SOURCE = sorted(glob.glob(os.path.join("files", "*_stats.csv")))[:1]
+
+
+def make_scaled_csv(source: str, scale: int, path: str) -> int:
+    """
+    Write source replicated scale times to path.
+    Replicas get a suffixed name so deduplication keeps every row.
+
+    Returns:
+        int: Number of rows written
+    """
+    df = pd.read_csv(source)
+    text_col = df.select_dtypes(include=["object"]).columns[0]
+    replicas = []
+    for i in range(scale):
+        replica = df.copy()
+        if i:
+            replica[text_col] = replica[text_col].astype(str) + f" #{i}"
+        replicas.append(replica)
+    scaled = pd.concat(replicas, ignore_index=True)
+    scaled.to_csv(path, index=False)
+    return len(scaled)
+
+
+def time_engine(processor: DataProcessor, input_path: str):
+    """Time loading and cleaning separately; saving is shared by both engines."""
+    start = time.perf_counter()
+    df = processor._load_file(input_path, "utf-8", ",")
+    loaded = time.perf_counter()
+    df = processor._clean_dataframe(df)
+    cleaned = time.perf_counter()
+    return loaded - start, cleaned - loaded, df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--source", default=DEFAULT_SOURCE[0] if DEFAULT_SOURCE else None)
+    parser.add_argument("--scales", default="10,50")
+    parser.add_argument("--csv-engine", default="c", choices=["c", "pyarrow"])
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    if not args.source:
+        parser.error("No stats CSV found; pass --source")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in (int(s) for s in args.scales.split(",")):
+            input_path = os.path.join(tmp, f"stats_x{scale}.csv")
+            rows = make_scaled_csv(args.source, scale, input_path)
+            result = {"scale": scale, "rows": rows}
+
+            load, clean, vectorized_df = time_engine(
+                VectorizedDataProcessor(csv_engine=args.csv_engine), input_path
+            )
+            result["vectorized_load_seconds"] = round(load, 3)
+            result["vectorized_clean_seconds"] = round(clean, 3)
+            vectorized_time = load + clean
+
+            if not args.skip_legacy:
+                load, clean, legacy_df = time_engine(DataProcessor(), input_path)
+                result["legacy_load_seconds"] = round(load, 3)
+                result["legacy_clean_seconds"] = round(clean, 3)
+                result["speedup"] = round((load + clean) / vectorized_time, 2)
+                result["identical_output"] = legacy_df.equals(vectorized_df)
+
+            results.append(result)
+            print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
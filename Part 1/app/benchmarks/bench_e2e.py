@@ -0,0 +1,350 @@
+"""
+Offline end-to-end benchmark of the query service: synthetic sports tables
+are uploaded through /api/upload by concurrent clients, then many websocket
+clients ask questions on /ws/query at once.
+
+The server is a fresh uvicorn process running the replay model, which plays
+scripted ReAct transcripts: the generated pandas (or SQL) is real and runs in
+the REPL workers, only the model is simulated, so nothing touches the network.
+The result is one JSON object with ingest throughput, query latency
+percentiles (overall and per answer path) and the server's peak RSS.
+
+Run from the app directory:
+    python -m benchmarks.bench_e2e --rows 50000 --tables 4 --clients 16 --queries 8
+
+Server settings can be overridden through the environment as usual, e.g.
+OUTPUT_FORMAT=feather or REPL_POOL_SIZE=0. With --baseline, the exit status
+is 1 if ingest throughput fell or p95 query latency grew by more than
+--tolerance against an earlier result.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_startup import free_port, server_env, wait_for
+
+BASE_COLUMNS = 9
+TEAMS = [f"Team {i}" for i in range(16)]
+POSITIONS = ["Batter", "Bowler", "All-rounder", "Wicketkeeper"]
+
+# Question mix: (query, transcript responses). A None transcript leaves the
+# question to the query planner, or to the fake model's default when it
+# doesn't match.
+QUESTIONS = [
+    (
+        "how do the teams rank on mean runs",
+        [
+            "Thought: Do I need to use a tool? Yes\nAction: python_repl\n"
+            "Action Input: print(df.groupby('team', observed=True)['runs']"
+            ".mean().round(2).sort_values(ascending=False).to_string())",
+            "Thought: Do I need to use a tool? No\nFinal Answer: teams by mean runs",
+        ],
+    ),
+    (
+        "best scorer of each season",
+        [
+            "Thought: Do I need to use a tool? Yes\nAction: python_repl\n"
+            "Action Input: best = df.loc[df.groupby('season')['runs'].idxmax()]\n"
+            "print(best[['season', 'player_name', 'runs']].to_string(index=False))",
+            "Thought: Do I need to use a tool? No\nFinal Answer: best per season",
+        ],
+    ),
+    (
+        "strike rate of experienced bowlers",
+        [
+            # A wrong column first, so the agent takes an extra step to recover
+            "Thought: Do I need to use a tool? Yes\nAction: python_repl\n"
+            "Action Input: print(df[df['role'] == 'Bowler']['strike_rate'].mean())",
+            "Thought: Do I need to use a tool? Yes\nAction: python_repl\n"
+            "Action Input: bowlers = df[(df['position'] == 'Bowler') & "
+            "(df['matches'] > 20)]\nprint(len(bowlers), round(bowlers['strike_rate']"
+            ".mean(), 2))",
+            "Thought: Do I need to use a tool? No\nFinal Answer: bowler strike rate",
+        ],
+    ),
+    (
+        "correlation between runs and average",
+        [
+            "Thought: Do I need to use a tool? Yes\nAction: python_repl\n"
+            "Action Input: print(round(df['runs'].corr(df['average']), 4))",
+            "Thought: Do I need to use a tool? No\nFinal Answer: correlation",
+        ],
+    ),
+    (
+        "total wickets by position in sql",
+        [
+            "Thought: Do I need to use a tool? Yes\nAction: sql_query\n"
+            "Action Input: SELECT position, SUM(wickets) AS wickets, COUNT(*) AS "
+            "players FROM df GROUP BY position ORDER BY wickets DESC",
+            "Thought: Do I need to use a tool? No\nFinal Answer: wickets by position",
+        ],
+    ),
+    ("top 5 players by runs", None),
+    ("average strike rate by position", None),
+]
+
+
+def make_table(rows: int, columns: int, seed: int = 0) -> pd.DataFrame:
+    """
+    A season-stats-like table: names, teams, positions, seasons, counts and
+    rates, with a few missing averages. Columns beyond the first nine are
+    extra numeric stats.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "player_name": [f"Player {seed}-{i}" for i in range(rows)],
+            "team": rng.choice(TEAMS, rows),
+            "position": rng.choice(POSITIONS, rows),
+            "season": rng.integers(2015, 2025, rows),
+            "matches": rng.integers(1, 30, rows),
+            "runs": rng.integers(0, 1200, rows),
+            "wickets": rng.integers(0, 40, rows),
+            "average": (rng.random(rows) * 60).round(2),
+            "strike_rate": (rng.random(rows) * 200).round(2),
+        }
+    )
+    df.loc[rng.random(rows) < 0.02, "average"] = np.nan
+    for i in range(BASE_COLUMNS, columns):
+        df[f"stat_{i}"] = rng.normal(50, 15, rows).round(3)
+    return df
+
+
+def write_transcripts(path: str) -> None:
+    transcripts = [
+        {"match": query, "responses": responses}
+        for query, responses in QUESTIONS
+        if responses is not None
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(transcripts, f)
+
+
+def percentiles(latencies: List[float]) -> Dict[str, Optional[float]]:
+    if not latencies:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {"p50": round(p50, 4), "p95": round(p95, 4), "p99": round(p99, 4)}
+
+
+async def upload_all(base: str, payloads: List[bytes]) -> dict:
+    """Upload every table at once and wait for their ingest jobs."""
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base, timeout=600) as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(
+            *(
+                client.post(
+                    "/api/upload",
+                    files={"file": (f"season_{i}.csv", payload, "text/csv")},
+                )
+                for i, payload in enumerate(payloads)
+            )
+        )
+        uploads = [response.raise_for_status().json() for response in responses]
+        jobs = {}
+        while len(jobs) < len(uploads):
+            for upload in uploads:
+                if upload["job_id"] in jobs:
+                    continue
+                job = (await client.get(f"/api/jobs/{upload['job_id']}")).json()
+                if job["status"] in ("completed", "failed"):
+                    jobs[upload["job_id"]] = job
+            await asyncio.sleep(0.05)
+        seconds = time.perf_counter() - started
+
+    failed = [job["error"] for job in jobs.values() if job["status"] == "failed"]
+    if failed:
+        raise RuntimeError(f"Ingest failed: {failed[0]}")
+    return {
+        "file_ids": [upload["file_id"] for upload in uploads],
+        "seconds": seconds,
+        "job_seconds": [
+            job["finished_at"] - job["created_at"] for job in jobs.values()
+        ],
+    }
+
+
+async def run_client(
+    url: str, file_id: str, queries: int, offset: int, timeout: float
+) -> List[dict]:
+    """Ask queries questions on one websocket, one after another."""
+    import websockets
+
+    results = []
+    async with websockets.connect(url, max_size=None) as ws:
+        for n in range(queries):
+            question = QUESTIONS[(offset + n) % len(QUESTIONS)][0]
+            request_id = f"{offset}-{n}"
+            started = time.perf_counter()
+            message = {"file_id": file_id, "query": question, "request_id": request_id}
+            await ws.send(json.dumps(message))
+            while True:
+                message = json.loads(await asyncio.wait_for(ws.recv(), timeout))
+                if message.get("request_id") != request_id:
+                    continue
+                if message["type"] in ("final", "error"):
+                    break
+            failed = message["type"] == "error"
+            results.append(
+                {
+                    "seconds": time.perf_counter() - started,
+                    "path": message.get("path", "error"),
+                    "error": message.get("detail") if failed else None,
+                }
+            )
+    return results
+
+
+async def drive(base: str, payloads: List[bytes], args) -> dict:
+    ingest = await upload_all(base, payloads)
+    file_ids = ingest["file_ids"]
+    url = base.replace("http://", "ws://") + "/ws/query"
+
+    started = time.perf_counter()
+    per_client = await asyncio.gather(
+        *(
+            run_client(url, file_ids[i % len(file_ids)], args.queries, i, args.timeout)
+            for i in range(args.clients)
+        )
+    )
+    seconds = time.perf_counter() - started
+    results = [result for client in per_client for result in client]
+    return {"ingest": ingest, "results": results, "seconds": seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000, help="Rows per table")
+    parser.add_argument(
+        "--columns", type=int, default=12, help=f"At least {BASE_COLUMNS} per table"
+    )
+    parser.add_argument("--tables", type=int, default=4, help="Tables uploaded")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent websockets")
+    parser.add_argument("--queries", type=int, default=8, help="Questions per client")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds per answer")
+    parser.add_argument(
+        "--answer-cache",
+        default="off",
+        help="ANSWER_CACHE_MODE for the server; off measures every query",
+    )
+    parser.add_argument("--baseline", help="JSON result of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    if args.columns < BASE_COLUMNS:
+        parser.error(f"--columns must be at least {BASE_COLUMNS}")
+
+    payloads = [
+        make_table(args.rows, args.columns, seed).to_csv(index=False).encode()
+        for seed in range(args.tables)
+    ]
+
+    with tempfile.TemporaryDirectory() as cwd:
+        transcripts = os.path.join(cwd, "transcripts.json")
+        write_transcripts(transcripts)
+        env = server_env(f"replay:{transcripts}")
+        # The replay model has no rate limits to respect
+        env.setdefault("LLM_REQUESTS_PER_MINUTE", "1000000")
+        env.setdefault("LLM_BURST", "1000")
+        env["ANSWER_CACHE_MODE"] = args.answer_cache
+
+        port = free_port()
+        base = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "main:create_app",
+                "--factory",
+                "--port",
+                str(port),
+                "--log-level",
+                "warning",
+            ],
+            cwd=cwd,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not wait_for(f"{base}/ready", time.perf_counter() + 120):
+                raise RuntimeError("Server was not ready within 120s")
+            run = asyncio.run(drive(base, payloads, args))
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+
+    # ru_maxrss of children: the largest process the server tree reaped
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    peak_mb = peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+    ingest, results = run["ingest"], run["results"]
+    rows = args.rows * args.tables
+    megabytes = sum(len(payload) for payload in payloads) / 1024**2
+    answered = [r for r in results if r["error"] is None]
+    by_path: Dict[str, dict] = {}
+    for path in sorted({r["path"] for r in answered}):
+        latencies = [r["seconds"] for r in answered if r["path"] == path]
+        by_path[path] = {"count": len(latencies), **percentiles(latencies)}
+
+    result = {
+        "rows_per_table": args.rows,
+        "columns": args.columns,
+        "tables": args.tables,
+        "clients": args.clients,
+        "queries_per_client": args.queries,
+        "ingest": {
+            "rows": rows,
+            "mb": round(megabytes, 2),
+            "seconds": round(ingest["seconds"], 3),
+            "rows_per_second": round(rows / ingest["seconds"]),
+            "mb_per_second": round(megabytes / ingest["seconds"], 2),
+            "job_seconds": percentiles(ingest["job_seconds"]),
+        },
+        "queries": {
+            "count": len(results),
+            "errors": len(results) - len(answered),
+            "seconds": round(run["seconds"], 3),
+            "per_second": round(len(results) / run["seconds"], 2),
+            **percentiles([r["seconds"] for r in answered]),
+            "by_path": by_path,
+        },
+        "server_peak_rss_mb": round(peak_mb, 1),
+    }
+
+    regressed = False
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        ingest_ratio = (
+            result["ingest"]["rows_per_second"] / baseline["ingest"]["rows_per_second"]
+        )
+        p95_ratio = (
+            result["queries"]["p95"] / baseline["queries"]["p95"]
+            if result["queries"]["p95"] and baseline["queries"]["p95"]
+            else None
+        )
+        result["ingest_vs_baseline"] = round(ingest_ratio, 3)
+        result["p95_vs_baseline"] = round(p95_ratio, 3) if p95_ratio else None
+        regressed = ingest_ratio < 1 - args.tolerance or (
+            p95_ratio is not None and p95_ratio > 1 + args.tolerance
+        )
+    print(json.dumps(result))
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
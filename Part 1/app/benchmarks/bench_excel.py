@@ -0,0 +1,148 @@
+"""
+Compare full-load and streaming ingest of a multi-sheet .xlsx workbook.
+
+Each case runs in a fresh process so its peak RSS is its own. "read_excel"
+only parses every sheet with pandas; "in_memory" and "streaming" clean every
+sheet into a Feather table the way uploads are ingested.
+
+Run from the app directory:
+    python -m benchmarks.bench_excel --rows 20000,100000 --sheets 2
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.chunked_processor import ChunkedDataProcessor
+from core.data_processor import VectorizedDataProcessor
+from core.excel_reader import sheet_names, table_slugs
+
+
+def make_workbook(path: str, rows: int, sheets: int, seed: int = 0) -> None:
+    """Write sheets of rows season-export-like rows (text, codes, ints, floats)."""
+    from openpyxl import Workbook
+
+    rng = np.random.default_rng(seed)
+    workbook = Workbook(write_only=True)
+    for s in range(sheets):
+        ws = workbook.create_sheet(f"Season {2020 + s}")
+        ws.append(["Player Name", "Team", "Matches", "Runs", "Average", "Strike Rate"])
+        teams = [f"Team {i}" for i in range(20)]
+        for i in range(rows):
+            ws.append(
+                [
+                    f"player {i}",
+                    teams[i % len(teams)],
+                    int(rng.integers(1, 30)),
+                    int(rng.integers(0, 1000)),
+                    None if i % 50 == 0 else round(float(rng.random() * 60), 2),
+                    round(float(rng.random() * 200), 2),
+                ]
+            )
+    workbook.save(path)
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _run_case(case: str, path: str, output_dir: str, chunk_size: int, results) -> None:
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    if case == "read_excel":
+        rows = sum(len(df) for df in pd.read_excel(path, sheet_name=None).values())
+    else:
+        if case == "in_memory":
+            processor = VectorizedDataProcessor()
+        else:
+            engine = "calamine" if case == "streaming_calamine" else "openpyxl"
+            processor = ChunkedDataProcessor(chunk_size=chunk_size, excel_engine=engine)
+        sheets = sheet_names(path)
+        rows = 0
+        for sheet, table in zip(sheets, table_slugs(sheets)):
+            output_path = os.path.join(output_dir, f"{case}.{table}.feather")
+            processor.clean_and_process_file(path, output_path, sheet_name=sheet)
+            rows += len(pd.read_feather(output_path))
+    results.put(
+        {
+            "seconds": round(time.perf_counter() - start, 3),
+            "rows_out": rows,
+            "peak_rss_mb": _peak_rss_mb(),
+            "baseline_rss_mb": baseline,
+        }
+    )
+
+
+def run_case(case: str, path: str, output_dir: str, chunk_size: int) -> dict:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(
+        target=_run_case, args=(case, path, output_dir, chunk_size, results)
+    )
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def same_tables(output_dir: str, left: str, right: str) -> bool:
+    """Whether two cases wrote the same tables, up to float rounding."""
+    for name in sorted(os.listdir(output_dir)):
+        if name.startswith(f"{left}."):
+            a = pd.read_feather(os.path.join(output_dir, name))
+            b = pd.read_feather(os.path.join(output_dir, right + name[len(left) :]))
+            # Means imputed from per-chunk sums differ in the last bits
+            try:
+                pd.testing.assert_frame_equal(a, b, check_exact=False)
+            except AssertionError:
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", default="20000,100000", help="Rows per sheet")
+    parser.add_argument("--sheets", type=int, default=2)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--skip-in-memory", action="store_true")
+    args = parser.parse_args()
+
+    cases = ["read_excel", "in_memory", "streaming"]
+    if args.skip_in_memory:
+        cases.remove("in_memory")
+    try:
+        import python_calamine  # noqa: F401
+
+        cases.append("streaming_calamine")
+    except ImportError:
+        pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in (int(r) for r in args.rows.split(",")):
+            path = os.path.join(tmp, f"season_{rows}.xlsx")
+            make_workbook(path, rows, args.sheets)
+            result = {
+                "rows_per_sheet": rows,
+                "sheets": args.sheets,
+                "file_mb": round(os.path.getsize(path) / 1024**2, 2),
+            }
+            for case in cases:
+                for key, value in run_case(case, path, tmp, args.chunk_size).items():
+                    result[f"{case}_{key}"] = value
+            if "in_memory" in cases:
+                result["identical_output"] = same_tables(tmp, "in_memory", "streaming")
+            print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Measure API cold start: import time of the app, from `python -X importtime`,
+and the time a fresh uvicorn process takes to answer /health (liveness) and
+/ready (warmup done).
+
+Each run starts new interpreters in an empty working directory, so nothing
+is cached in-process. Runs use the offline fake model unless --model is given.
+
+Run from the app directory:
+    python -m benchmarks.bench_startup --repeat 5
+    python -m benchmarks.bench_startup --repeat 5 --baseline startup.json
+
+With --baseline, a previous result is compared against and the exit status is
+1 if import or ready time grew by more than --tolerance.
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imports the app should only pay for on first use or during warmup
+DEFERRED_MODULES = [
+    "langchain_google_genai",
+    "langchain.agents",
+    "langchain_experimental",
+    "duckdb",
+]
+
+
+def server_env(model: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [APP_DIR, env.get("PYTHONPATH")]))
+    env.setdefault("GOOGLE_API_KEY", "unused")
+    env.update(MODEL_NAME=model, LOG_LEVEL="WARNING", AGENT_VERBOSE="false")
+    return env
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """Cumulative import time in microseconds per module."""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <indented module>"
+        _, cumulative_us, name = line[len("import time:") :].split("|")
+        cumulative[name.strip()] = int(cumulative_us)
+    return cumulative
+
+
+def import_time(model: str, cwd: str, top: int) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=cwd,
+        env=server_env(model),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = parse_importtime(completed.stderr)
+    # Top-level modules only, so packages aren't counted with their submodules
+    roots = {
+        name: us
+        for name, us in modules.items()
+        if "." not in name and name != "main"
+    }
+    slowest = sorted(roots.items(), key=lambda item: -item[1])[:top]
+    return {
+        "import_seconds": round(modules["main"] / 1e6, 3),
+        "endpoints_seconds": round(modules.get("api.endpoints", 0) / 1e6, 3),
+        "modules": len(modules),
+        "slowest": {name: round(us / 1e6, 3) for name, us in slowest},
+        "deferred_loaded": [name for name in DEFERRED_MODULES if name in modules],
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, deadline: float) -> bool:
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.02)
+    return False
+
+
+def startup_time(model: str, cwd: str, timeout: float) -> dict:
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:create_app",
+            "--factory",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=cwd,
+        env=server_env(model),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = started + timeout
+        base = f"http://127.0.0.1:{port}"
+        live = wait_for(f"{base}/health", deadline)
+        live_seconds = time.perf_counter() - started
+        ready = live and wait_for(f"{base}/ready", deadline)
+        ready_seconds = time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    if not ready:
+        raise RuntimeError(f"App was not ready within {timeout:g}s")
+    return {
+        "live_seconds": round(live_seconds, 3),
+        "ready_seconds": round(ready_seconds, 3),
+    }
+
+
+def _median(runs: List[dict], key: str) -> float:
+    return round(statistics.median(run[key] for run in runs), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--model", default="fake")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules listed")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--baseline", help="JSON result of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    imports, startups = [], []
+    with tempfile.TemporaryDirectory() as cwd:
+        for _ in range(args.repeat):
+            imports.append(import_time(args.model, cwd, args.top))
+            startups.append(startup_time(args.model, cwd, args.timeout))
+
+    result = {
+        "python": sys.version.split()[0],
+        "model": args.model,
+        "repeat": args.repeat,
+        "import_seconds": _median(imports, "import_seconds"),
+        "endpoints_seconds": _median(imports, "endpoints_seconds"),
+        "live_seconds": _median(startups, "live_seconds"),
+        "ready_seconds": _median(startups, "ready_seconds"),
+        "modules": imports[-1]["modules"],
+        "slowest": imports[-1]["slowest"],
+        "deferred_loaded": imports[-1]["deferred_loaded"],
+    }
+
+    regressed = False
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for key in ("import_seconds", "ready_seconds"):
+            ratio = result[key] / baseline[key] if baseline.get(key) else None
+            result[f"{key}_vs_baseline"] = round(ratio, 3) if ratio else None
+            regressed = regressed or (ratio is not None and ratio > 1 + args.tolerance)
+    print(json.dumps(result))
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Load test for the query path with a local fake LLM: runs the same batch of
+agent queries at increasing concurrency limits and reports throughput.
+
+Run from the app directory:
+    python -m benchmarks.load_query --queries 32 --concurrency 1,2,4,8 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import time
+
+import pandas as pd
+
+from core.meta_data import MetadataExtractor
+from services.fake_llm import FakeReActChatModel
+from services.llm_service import LLMService
+
+DEFAULT_SOURCE = sorted(glob.glob(os.path.join("files", "*_stats.csv")))[:1]
+
+
+async def run_batch(service: LLMService, df, metadata, queries: int) -> float:
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(
+            service.arun_agent(df, metadata, f"query {i}: show the first rows")
+            for i in range(queries)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    assert all(result["output"] for result in results)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--source", default=DEFAULT_SOURCE[0] if DEFAULT_SOURCE else None)
+    parser.add_argument("--queries", type=int, default=32)
+    parser.add_argument("--concurrency", default="1,2,4,8")
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="Seconds per fake LLM call"
+    )
+    args = parser.parse_args()
+
+    if not args.source:
+        parser.error("No stats CSV found; pass --source")
+
+    df = pd.read_csv(args.source)
+    metadata = MetadataExtractor().extract_metadata(df)
+    llm = FakeReActChatModel(latency=args.latency)
+
+    baseline = None
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        service = LLMService("fake", max_concurrency=concurrency, llm=llm, verbose=False)
+        elapsed = asyncio.run(run_batch(service, df, metadata, args.queries))
+        throughput = args.queries / elapsed
+        baseline = baseline or throughput
+        print(
+            json.dumps(
+                {
+                    "concurrency": concurrency,
+                    "queries": args.queries,
+                    "seconds": round(elapsed, 3),
+                    "queries_per_second": round(throughput, 2),
+                    "scaling": round(throughput / baseline, 2),
+                }
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
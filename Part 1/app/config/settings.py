@@ -8,7 +8,111 @@ class Settings:
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", os.getenv("GOOGLE_API_KEY"))
     UPLOAD_DIR = "files"
     OUTPUT_DIR = "outputs"
-    MODEL_NAME = "gemini-1.5-flash"
+    # A Gemini model, "fake" for an offline stand-in or "replay:<path>" to play
+    # recorded agent transcripts from a JSON file
+    MODEL_NAME = os.getenv("MODEL_NAME", "gemini-1.5-flash")
+    # Model calls are rate limited to LLM_REQUESTS_PER_MINUTE (bursts of
+    # LLM_BURST), and run at most LLM_MAX_CONCURRENCY at once; the limit
+    # shrinks when calls are slower than LLM_TARGET_LATENCY_SECONDS or fail
+    LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", 60))
+    LLM_BURST = int(os.getenv("LLM_BURST", 10))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+    LLM_TARGET_LATENCY_SECONDS = float(os.getenv("LLM_TARGET_LATENCY_SECONDS", 20))
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 60))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+    LLM_BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", 1))
+    # LOG_LEVEL=INFO and AGENT_VERBOSE=false keep per-step agent logging and
+    # debug output off the request path in production
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG").upper()
+    AGENT_VERBOSE = os.getenv("AGENT_VERBOSE", "true").lower() == "true"
+    # Build the LLM client, load the SQL engine and start ingest workers in
+    # the background at startup; GET /ready returns 503 until that is done
+    WARMUP = os.getenv("WARMUP", "true").lower() == "true"
+    # Agent runs executing at once; further queries wait their turn
+    MAX_CONCURRENT_QUERIES = int(os.getenv("MAX_CONCURRENT_QUERIES", 4))
+    # Each chat session runs generated code in its own worker process, up to
+    # REPL_POOL_SIZE at once (0 runs code in-process); idle workers are
+    # closed after REPL_IDLE_SECONDS. Every worker holds its own copy of its
+    # session's dataset, so size this against memory, not cores
+    REPL_POOL_SIZE = int(os.getenv("REPL_POOL_SIZE", 2))
+    REPL_IDLE_SECONDS = float(os.getenv("REPL_IDLE_SECONDS", 600))
+    # A query waits at most this long for its session's worker or a free
+    # slot in the pool before failing (0 waits indefinitely)
+    REPL_ACQUIRE_TIMEOUT_SECONDS = float(os.getenv("REPL_ACQUIRE_TIMEOUT_SECONDS", 120))
+    # Each code execution in a worker is stopped after REPL_CPU_SECONDS of CPU
+    # time or REPL_TIMEOUT_SECONDS of wall-clock time, or once the worker uses
+    # more than REPL_MEMORY_MB of memory on top of its loaded dataset; 0
+    # disables a limit
+    REPL_CPU_SECONDS = float(os.getenv("REPL_CPU_SECONDS", 30))
+    REPL_TIMEOUT_SECONDS = float(os.getenv("REPL_TIMEOUT_SECONDS", 60))
+    REPL_MEMORY_MB = int(os.getenv("REPL_MEMORY_MB", 2048))
+    # Prompts for tables wider than SCHEMA_PRUNE_MIN_COLUMNS list only the
+    # SCHEMA_TOP_K columns most relevant to the query, plus identifier columns
+    SCHEMA_PRUNE_MIN_COLUMNS = int(os.getenv("SCHEMA_PRUNE_MIN_COLUMNS", 20))
+    SCHEMA_TOP_K = int(os.getenv("SCHEMA_TOP_K", 12))
+    # Answer simple top-N, filter, group-by and count questions with pandas
+    # directly, using the agent only for queries the planner can't match
+    QUERY_PLANNER = os.getenv("QUERY_PLANNER", "true").lower() == "true"
+    # The agent gets a sql_query tool running DuckDB over the cleaned
+    # artifacts next to its Python REPL; AGENT_PREFERRED_TOOL ("python" or
+    # "sql") is the one its prompt tells it to use first. Each SQL query uses
+    # SQL_THREADS threads (0 for every core) and SQL_MEMORY_LIMIT of memory,
+    # is stopped after SQL_TIMEOUT_SECONDS and returns up to SQL_MAX_ROWS rows
+    SQL_TOOL = os.getenv("SQL_TOOL", "true").lower() == "true"
+    AGENT_PREFERRED_TOOL = os.getenv("AGENT_PREFERRED_TOOL", "python").lower()
+    SQL_THREADS = int(os.getenv("SQL_THREADS", 0))
+    SQL_MEMORY_LIMIT = os.getenv("SQL_MEMORY_LIMIT", "1GB")
+    SQL_TIMEOUT_SECONDS = float(os.getenv("SQL_TIMEOUT_SECONDS", 30))
+    SQL_MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", 50))
+    # Each chat session remembers its last CHAT_MEMORY_TURNS questions and
+    # answers, rendered into prompts within CHAT_MEMORY_TOKENS tokens
+    CHAT_MEMORY_TOKENS = int(os.getenv("CHAT_MEMORY_TOKENS", 1500))
+    CHAT_MEMORY_TURNS = int(os.getenv("CHAT_MEMORY_TURNS", 20))
+    # Answers are cached per (dataset content, normalized query). Mode "answer"
+    # returns the stored answer, "reexecute" re-runs the stored code without
+    # the LLM, "off" disables the cache
+    ANSWER_CACHE_MODE = os.getenv("ANSWER_CACHE_MODE", "answer").lower()
+    ANSWER_CACHE_PATH = os.getenv(
+        "ANSWER_CACHE_PATH", os.path.join(OUTPUT_DIR, "answers.sqlite3")
+    )
+    ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", 86400))
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 10000))
+    # Each websocket buffers up to WS_SEND_QUEUE_SIZE outgoing messages; a client
+    # that leaves it full for WS_SEND_TIMEOUT_SECONDS is disconnected
+    WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", 256))
+    WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", 10))
+    WS_MAX_QUERIES_IN_FLIGHT = int(os.getenv("WS_MAX_QUERIES_IN_FLIGHT", 4))
+    # Store small integers in the smallest safe type and low-cardinality text
+    # as categoricals after cleaning
+    OPTIMIZE_DTYPES = os.getenv("OPTIMIZE_DTYPES", "true").lower() == "true"
+    # Cleaning engine: "vectorized" or "legacy"; CSV_ENGINE is "c" or "pyarrow"
+    CLEANING_ENGINE = os.getenv("CLEANING_ENGINE", "vectorized").lower()
+    CSV_ENGINE = os.getenv("CSV_ENGINE", "c").lower()
+    # CSV uploads of at least STREAMING_INGEST_MIN_BYTES are cleaned in chunks
+    # of INGEST_CHUNK_ROWS rows to bound memory
+    STREAMING_INGEST_MIN_BYTES = int(
+        os.getenv("STREAMING_INGEST_MIN_BYTES", 256 * 1024 * 1024)
+    )
+    INGEST_CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", 100_000))
+    # .xlsx uploads are always streamed, every sheet into its own table;
+    # EXCEL_ENGINE is "openpyxl" or "calamine" (needs python-calamine)
+    EXCEL_ENGINE = os.getenv("EXCEL_ENGINE", "openpyxl").lower()
+    # Uploads are cleaned by INGEST_WORKERS processes with up to INGEST_QUEUE_DEPTH
+    # jobs waiting; queries wait INGEST_WAIT_SECONDS for an unfinished ingest
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 2))
+    INGEST_QUEUE_DEPTH = int(os.getenv("INGEST_QUEUE_DEPTH", 16))
+    INGEST_WAIT_SECONDS = float(os.getenv("INGEST_WAIT_SECONDS", 30))
+    # Format of cleaned datasets in OUTPUT_DIR: "csv", "feather" or "parquet"
+    OUTPUT_FORMAT = os.getenv("OUTPUT_FORMAT", "csv").lower()
+    KEEP_CSV_OUTPUT = os.getenv("KEEP_CSV_OUTPUT", "true").lower() == "true"
+    # Size bound for uploads plus cleaned artifacts; only unreferenced blobs are evicted
+    UPLOAD_STORE_MAX_BYTES = int(
+        os.getenv("UPLOAD_STORE_MAX_BYTES", 2 * 1024 * 1024 * 1024)
+    )
+    UPLOAD_RETENTION_SECONDS = int(os.getenv("UPLOAD_RETENTION_SECONDS", 0))
+    DATAFRAME_CACHE_MAX_BYTES = int(
+        os.getenv("DATAFRAME_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+    )
 
 
 settings = Settings()
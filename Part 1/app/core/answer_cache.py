@@ -0,0 +1,171 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    code: List[str]
+    llm_calls: int
+    created: float
+
+
+class AnswerCache:
+    """
+    A persistent cache of agent answers keyed by (dataset content hash,
+    normalized query). Each entry keeps the final answer and the code the
+    agent executed, so a hit can be served as-is or re-executed locally.
+    Entries expire after ttl_seconds and the least recently used are evicted
+    beyond max_entries.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: float, max_entries: int):
+        """
+        Initialize the AnswerCache.
+
+        Args:
+            db_path (str): SQLite database file
+            ttl_seconds (float): Age after which entries expire (0 = never)
+            max_entries (int): Entries kept before LRU eviction
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                dataset TEXT NOT NULL,
+                query TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                code TEXT NOT NULL,
+                llm_calls INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (dataset, query)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)"
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.llm_calls_saved = 0
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Case-fold, collapse whitespace and drop trailing punctuation."""
+        query = re.sub(r"\s+", " ", query.strip().lower())
+        return query.rstrip("?.!; ")
+
+    def get(self, dataset_key: str, query: str) -> Optional[CachedAnswer]:
+        """Return the live entry for (dataset_key, query), or None on a miss."""
+        normalized = self.normalize_query(query)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT answer, code, llm_calls, created FROM answers "
+                "WHERE dataset = ? AND query = ?",
+                (dataset_key, normalized),
+            ).fetchone()
+            if row is not None and self._expired(row[3], now):
+                self._conn.execute(
+                    "DELETE FROM answers WHERE dataset = ? AND query = ?",
+                    (dataset_key, normalized),
+                )
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE answers SET last_used = ? WHERE dataset = ? AND query = ?",
+                (now, dataset_key, normalized),
+            )
+            self._conn.commit()
+            self.hits += 1
+            self.llm_calls_saved += row[2]
+            return CachedAnswer(
+                answer=row[0], code=json.loads(row[1]), llm_calls=row[2], created=row[3]
+            )
+
+    def put(
+        self,
+        dataset_key: str,
+        query: str,
+        answer: str,
+        code: List[str],
+        llm_calls: int,
+    ) -> None:
+        """Store an answer with the code that produced it."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers "
+                "(dataset, query, answer, code, llm_calls, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    dataset_key,
+                    self.normalize_query(query),
+                    answer,
+                    json.dumps(code),
+                    llm_calls,
+                    now,
+                    now,
+                ),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def invalidate(self, dataset_key: str) -> None:
+        """Drop every entry for dataset_key and its tables ("{dataset_key}.{table}")."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM answers WHERE dataset = ? OR substr(dataset, 1, ?) = ?",
+                (dataset_key, len(dataset_key) + 1, f"{dataset_key}."),
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+            total = self.hits + self.misses
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "llm_calls_saved": self.llm_calls_saved,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and created < now - self.ttl_seconds
+
+    def _evict(self, now: float) -> None:
+        """Delete expired entries, then the least recently used beyond max_entries."""
+        if self.ttl_seconds > 0:
+            self._conn.execute(
+                "DELETE FROM answers WHERE created < ?", (now - self.ttl_seconds,)
+            )
+        self._conn.execute(
+            "DELETE FROM answers WHERE rowid IN ("
+            "SELECT rowid FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
@@ -0,0 +1,114 @@
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.data_processor import VectorizedDataProcessor, hash_rows
+
+
+class AppendProcessor(VectorizedDataProcessor):
+    """
+    A DataProcessor that cleans rows appended to an already cleaned dataset
+    without touching the rows it holds.
+
+    The state kept from earlier cleaning stands in for the full data: rows
+    whose hash was already seen are duplicates, and missing numbers are
+    imputed with the mean over every row so far, kept as a running count and
+    sum per column. Appended values are converted to the dataset's dtypes.
+    Rows cleaned earlier keep the values they were imputed with.
+    """
+
+    def __init__(
+        self,
+        schema: pd.DataFrame,
+        seen: np.ndarray,
+        column_sums: Dict[str, Dict[str, float]],
+        threshold: float = 0.5,
+        **kwargs,
+    ):
+        """
+        Initialize the AppendProcessor.
+
+        Args:
+            schema (pd.DataFrame): Empty frame with the dataset's columns and dtypes
+            seen (np.ndarray): Hashes of the distinct input rows cleaned so far
+            column_sums (Dict): Count and sum behind each numeric column's mean
+            threshold (float): Minimum percentage of non-NA values required in a row (0-1)
+            **kwargs: Passed to VectorizedDataProcessor
+        """
+        super().__init__(threshold, **kwargs)
+        self.schema = schema
+        self.seen = seen
+        self.column_sums = {col: dict(sums) for col, sums in column_sums.items()}
+        self.report: Optional[Dict[str, int]] = None
+
+    def _clean_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Clean appended rows against the state of the dataset."""
+        received = len(df)
+        df = self._standardize_columns(df)
+        missing = [col for col in self.schema.columns if col not in df.columns]
+        extra = [col for col in df.columns if col not in self.schema.columns]
+        if missing or extra:
+            raise ValueError(
+                f"Appended columns don't match the dataset (missing: {missing}, "
+                f"unexpected: {extra})"
+            )
+        df = df[list(self.schema.columns)]
+
+        # Duplicates of earlier rows and within the appended rows
+        hashes = hash_rows(df)
+        keep = ~pd.Series(hashes).duplicated().to_numpy() & ~np.isin(hashes, self.seen)
+        df = df[keep]
+        self.row_hashes = hashes[keep]
+        duplicates = received - len(df)
+
+        df = df.dropna(thresh=int(self.threshold * len(df.columns)))
+        sparse = received - duplicates - len(df)
+        df = self._conform_numeric(df)
+        df = self._remove_invalid_rows(df)
+        for col in df.columns:
+            if isinstance(self.schema[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype("category")
+
+        self.report = {
+            "rows_received": received,
+            "duplicates": duplicates,
+            "sparse": sparse,
+            "invalid": received - duplicates - sparse - len(df),
+            "rows_appended": len(df),
+        }
+        return df
+
+    def _conform_numeric(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Parse numeric columns and impute them with the running mean."""
+        for col in df.columns:
+            dtype = self.schema[col].dtype
+            if not (isinstance(dtype, np.dtype) and dtype.kind in "iuf"):
+                continue
+            values = pd.to_numeric(df[col], errors="coerce")
+            sums = self.column_sums.get(col, {"count": 0, "sum": 0.0})
+            count = sums["count"] + int(values.count())
+            total = sums["sum"] + float(values.sum())
+            self.column_sums[col] = {"count": count, "sum": total}
+            if count:
+                values = values.fillna(total / count)
+            df[col] = values.astype(self._numeric_dtype(values, dtype))
+        return df
+
+    @staticmethod
+    def _numeric_dtype(values: pd.Series, dtype: np.dtype) -> str:
+        """
+        The dataset's dtype if values fit it, else int64 or float64. Small
+        integer types keep headroom for the product of two values, as when
+        they were chosen at ingest.
+        """
+        if dtype.kind == "f" or values.isna().any():
+            return "float64"
+        if not (values == values.round()).all():
+            return "float64"
+        if values.empty:
+            return str(dtype)
+        bound = max(abs(int(values.min())), abs(int(values.max())))
+        if dtype.itemsize < 8 and bound * bound > np.iinfo(dtype).max:
+            return "int64"
+        return str(dtype)
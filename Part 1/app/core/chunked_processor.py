@@ -0,0 +1,337 @@
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.data_processor import VectorizedDataProcessor, hash_rows
+from core.excel_reader import iter_sheet_chunks
+from core.meta_data import MetadataExtractor
+from utils.file_handler import partial_path
+
+
+@dataclass
+class ColumnStats:
+    """Running statistics for one column, accumulated across chunks."""
+
+    kinds: Set[str] = field(default_factory=set)
+    non_null: int = 0
+    numeric_count: int = 0
+    numeric_sum: float = 0.0
+    sample: List = field(default_factory=list)
+    textual: bool = False
+
+    @property
+    def mean(self) -> float:
+        return self.numeric_sum / self.numeric_count if self.numeric_count else np.nan
+
+
+class ChunkWriter:
+    """
+    Append DataFrame chunks to a CSV, Feather or Parquet file. Chunks go to a
+    temporary file that only replaces output_path once the writer is closed.
+    """
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self._tmp_path = partial_path(output_path)
+        self._writer = None
+        self._schema = None
+        self._started = False
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        chunk = chunk.reset_index(drop=True)
+        if self.output_path.endswith(".csv"):
+            chunk.to_csv(
+                self._tmp_path,
+                mode="a" if self._started else "w",
+                header=not self._started,
+                index=False,
+                encoding="utf-8",
+            )
+        else:
+            import pyarrow as pa
+
+            if self._writer is None:
+                self._schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                # A column that is all-null in the first chunk still holds strings later
+                for i, column in enumerate(self._schema):
+                    if pa.types.is_null(column.type):
+                        self._schema = self._schema.set(i, column.with_type(pa.string()))
+                self._writer = self._open_writer(self._schema)
+            table = pa.Table.from_pandas(chunk, schema=self._schema, preserve_index=False)
+            self._writer.write_table(table)
+        self._started = True
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        os.replace(self._tmp_path, self.output_path)
+
+    def discard(self) -> None:
+        """Drop what was written so far, leaving output_path untouched."""
+        try:
+            if self._writer is not None:
+                self._writer.close()
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+
+    def _open_writer(self, schema):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.output_path.endswith(".parquet"):
+            return pq.ParquetWriter(self._tmp_path, schema)
+        if self.output_path.endswith(".feather"):
+            # Feather v2 is the Arrow IPC file format, left uncompressed
+            return pa.ipc.new_file(self._tmp_path, schema)
+        raise ValueError(f"Unsupported output format: {self.output_path}")
+
+
+class ChunkedDataProcessor(VectorizedDataProcessor):
+    """
+    A DataProcessor that cleans CSV and .xlsx files in fixed-size chunks so
+    peak memory is bounded by the chunk size rather than the file size.
+
+    The first pass drops duplicate rows (tracked by row hash) and sparse rows,
+    accumulates running sums and counts for mean imputation, and spills each
+    chunk to disk. The second pass imputes, converts and filters each spilled
+    chunk and writes it to the outputs incrementally.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.5,
+        chunk_size: int = 100_000,
+        excel_engine: str = "openpyxl",
+        **kwargs,
+    ):
+        """
+        Initialize the ChunkedDataProcessor.
+
+        Args:
+            threshold (float): Minimum percentage of non-NA values required in a row (0-1)
+            chunk_size (int): Rows held in memory at a time
+            excel_engine (str): Row reader for .xlsx files, "openpyxl" or "calamine"
+            **kwargs: Passed to VectorizedDataProcessor
+        """
+        super().__init__(threshold, **kwargs)
+        self.chunk_size = chunk_size
+        self.excel_engine = excel_engine
+        # Column profile of the cleaned output, merged chunk by chunk as it is
+        # written, since the whole frame is never in memory
+        self.profile: Optional[Dict[str, Any]] = None
+        self._profiler = MetadataExtractor()
+
+    def clean_and_process_file(
+        self,
+        file_path: str,
+        output_path: str,
+        encoding: str = "utf-8",
+        delimiter: str = ",",
+        extra_output_paths: Optional[List[str]] = None,
+        sheet_name: Optional[str] = None,
+    ) -> Optional[pd.DataFrame]:
+        """
+        Clean and process a data file chunk by chunk.
+        .xls files are processed in memory.
+
+        Returns:
+            Optional[pd.DataFrame]: Empty DataFrame with the cleaned schema, or
+            None if processing fails
+        """
+        file_extension = os.path.splitext(file_path)[1].lower()
+        if file_extension not in (".csv", ".xlsx"):
+            return super().clean_and_process_file(
+                file_path,
+                output_path,
+                encoding,
+                delimiter,
+                extra_output_paths,
+                sheet_name=sheet_name,
+            )
+
+        try:
+            if file_extension == ".csv":
+                chunks = pd.read_csv(
+                    file_path,
+                    encoding=encoding,
+                    delimiter=delimiter,
+                    on_bad_lines="skip",
+                    chunksize=self.chunk_size,
+                )
+            else:
+                chunks = iter_sheet_chunks(
+                    file_path, sheet_name, self.chunk_size, self.excel_engine
+                )
+        except Exception as e:
+            self.logger.error(f"Error loading file: {str(e)}")
+            return None
+
+        output_dir = os.path.dirname(output_path) or "."
+        os.makedirs(output_dir, exist_ok=True)
+        spill_dir = tempfile.mkdtemp(prefix=".spill-", dir=output_dir)
+        try:
+            stats = self._first_pass(chunks, spill_dir)
+
+            schema = self._second_pass(
+                spill_dir, [output_path, *(extra_output_paths or [])], stats
+            )
+            self.logger.info(f"Cleaning complete. Cleaned file saved to: {output_path}")
+            return schema
+
+        except Exception as e:
+            self.logger.error(f"Error during cleaning: {str(e)}")
+            return None
+
+        finally:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+    def _first_pass(
+        self, chunks: Iterable[pd.DataFrame], spill_dir: str
+    ) -> Dict[str, ColumnStats]:
+        """Deduplicate, drop sparse rows and accumulate column statistics."""
+        # Sorted hashes of the rows kept so far: 8 bytes a row, unlike a set
+        seen = np.empty(0, dtype=np.uint64)
+        stats: Dict[str, ColumnStats] = {}
+        rows_read = 0
+
+        for i, chunk in enumerate(chunks):
+            rows_read += len(chunk)
+            self._report_progress("reading", rows_read)
+            chunk = self._standardize_columns(chunk)
+            chunk, seen = self._remove_seen_rows(chunk, seen)
+            chunk = chunk.dropna(thresh=int(self.threshold * len(chunk.columns)))
+
+            for col in chunk.columns:
+                column = chunk[col]
+                col_stats = stats.setdefault(col, ColumnStats())
+                col_stats.kinds.add(column.dtype.kind)
+                non_null = int(column.notna().sum())
+                col_stats.non_null += non_null
+
+                # Same early rejection on the first non-null values as the
+                # in-memory engine, gathered across chunks if needed
+                needed = self.numeric_sample_size - len(col_stats.sample)
+                if needed > 0 and non_null:
+                    col_stats.sample.extend(column.dropna().iloc[:needed].tolist())
+                    if len(col_stats.sample) >= self.numeric_sample_size:
+                        col_stats.textual = self._is_textual(col_stats.sample)
+
+                if pd.api.types.is_numeric_dtype(column):
+                    numeric = column
+                elif col_stats.textual:
+                    continue
+                else:
+                    numeric = pd.to_numeric(column, errors="coerce")
+                col_stats.numeric_count += int(numeric.notna().sum())
+                col_stats.numeric_sum += float(numeric.sum())
+
+            # Pickle keeps each chunk's dtypes exactly and is cheap to reload
+            chunk.to_pickle(os.path.join(spill_dir, f"{i:08d}.pkl"))
+
+        for col_stats in stats.values():
+            if 0 < len(col_stats.sample) < self.numeric_sample_size:
+                col_stats.textual = self._is_textual(col_stats.sample)
+        self.row_hashes = seen
+        return stats
+
+    def _is_textual(self, sample: List) -> bool:
+        rate = self._coercion_rate(pd.Series(sample, dtype=object))
+        return rate > self.numeric_coercion_threshold
+
+    def _remove_seen_rows(
+        self, chunk: pd.DataFrame, seen: np.ndarray
+    ) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Drop rows whose hash was already seen in this or an earlier chunk.
+
+        Returns:
+            Tuple[pd.DataFrame, np.ndarray]: The new rows, and seen with
+            their hashes merged in, still sorted
+        """
+        hashes = hash_rows(chunk)
+        keep = ~pd.Series(hashes).duplicated().to_numpy() & ~np.isin(hashes, seen)
+        new = np.sort(hashes[keep])
+        return chunk[keep], np.insert(seen, np.searchsorted(seen, new), new)
+
+    def _second_pass(
+        self, spill_dir: str, output_paths: List[str], stats: Dict[str, ColumnStats]
+    ) -> pd.DataFrame:
+        """Impute, convert and filter spilled chunks into the outputs."""
+        dtypes = {}
+        converted = {}
+        for col, col_stats in stats.items():
+            if "O" in col_stats.kinds:
+                dtypes[col] = object
+                failed = col_stats.non_null - col_stats.numeric_count
+                if (
+                    col_stats.non_null
+                    and not col_stats.textual
+                    and failed / col_stats.non_null <= self.numeric_coercion_threshold
+                ):
+                    converted[col] = col_stats.mean
+            elif col_stats.kinds <= {"i", "u"}:
+                dtypes[col] = "int64"
+            elif col_stats.kinds <= {"i", "u", "f"}:
+                dtypes[col] = "float64"
+            if col in converted or dtypes.get(col) in ("int64", "float64"):
+                self._record_sum(col, col_stats.numeric_count, col_stats.numeric_sum)
+
+        writers = [ChunkWriter(path) for path in output_paths]
+        try:
+            schema = self._write_chunks(spill_dir, writers, dtypes, converted, stats)
+        except BaseException:
+            for writer in writers:
+                writer.discard()
+            raise
+        for writer in writers:
+            writer.close()
+        return schema
+
+    def _write_chunks(
+        self,
+        spill_dir: str,
+        writers: List[ChunkWriter],
+        dtypes: Dict[str, object],
+        converted: Dict[str, float],
+        stats: Dict[str, ColumnStats],
+    ) -> pd.DataFrame:
+        schema = None
+        rows_written = 0
+        for name in sorted(os.listdir(spill_dir)):
+            chunk = pd.read_pickle(os.path.join(spill_dir, name))
+            # Chunks were typed independently; align them on the unified dtypes
+            for col, dtype in dtypes.items():
+                chunk[col] = chunk[col].astype(dtype)
+                if dtype == "float64":
+                    chunk[col] = chunk[col].fillna(stats[col].mean)
+            for col, mean in converted.items():
+                chunk[col] = pd.to_numeric(chunk[col], errors="coerce").fillna(mean)
+            chunk = self._remove_invalid_rows(chunk)
+
+            for writer in writers:
+                writer.write(chunk)
+            self._add_to_profile(chunk)
+            rows_written += len(chunk)
+            self._report_progress("writing", rows_written)
+            if schema is None:
+                schema = chunk.head(0)
+
+        if schema is None:
+            # Every row was dropped; still leave a header-only output behind
+            schema = pd.DataFrame(columns=list(stats))
+            for writer in writers:
+                writer.write(schema)
+            self._add_to_profile(schema)
+        return schema
+
+    def _add_to_profile(self, chunk: pd.DataFrame) -> None:
+        profile = self._profiler.profile(chunk)
+        if self.profile is not None:
+            profile = self._profiler.merge_profiles(self.profile, profile)
+        self.profile = profile
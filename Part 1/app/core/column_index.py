@@ -0,0 +1,152 @@
+import re
+import math
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Words users say for common column names; matched against name tokens
+SYNONYMS = {
+    "name": ["player", "person", "who", "called"],
+    "age": ["old", "young", "oldest", "youngest", "years"],
+    "wage": ["salary", "pay", "paid", "earn", "earnings", "income"],
+    "value": ["worth", "price", "cost", "valuable", "expensive"],
+    "nationality": ["country", "nation", "national", "from"],
+    "club": ["team", "plays", "side"],
+    "league": ["competition", "division"],
+    "height": ["tall", "tallest", "short"],
+    "weight": ["heavy", "heaviest", "light"],
+    "rating": ["rated", "score", "best", "overall"],
+    "overall": ["rating", "best", "rated"],
+    "potential": ["future", "prospect"],
+    "pace": ["fast", "fastest", "quick", "speed"],
+    "speed": ["fast", "fastest", "quick", "pace"],
+    "acceleration": ["fast", "quick"],
+    "positions": ["position", "role", "plays", "striker", "defender", "goalkeeper"],
+    "position": ["positions", "role", "plays", "striker", "defender", "goalkeeper"],
+    "date": ["when", "day", "year", "born", "birth"],
+    "birth": ["born", "birthday", "age"],
+    "foot": ["footed", "left", "right"],
+    "count": ["number", "how", "many"],
+    "id": ["identifier", "key"],
+}
+
+# Identifier columns stay in the prompt whatever the query
+_IDENTIFIER_NAME = re.compile(r"(?:^|_|\b)(?:id|name|title|key)(?:$|_|\b)", re.IGNORECASE)
+
+
+def _words(text: str) -> List[str]:
+    # Split snake_case and camelCase names as well as prose
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(text))
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _features(words: List[str]) -> Counter:
+    """Word features plus character trigrams, which tolerate plurals and typos."""
+    features = Counter(f"w:{word}" for word in words)
+    for word in words:
+        padded = f" {word} "
+        features.update(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return features
+
+
+class ColumnIndex:
+    """
+    A TF-IDF index over column names, their synonyms and sample values, used
+    to pick the columns relevant to a query for the prompt. Built from a
+    column profile and serializable so it can be persisted at ingest.
+    """
+
+    def __init__(
+        self,
+        columns: List[str],
+        vectors: List[Dict[str, float]],
+        idf: Dict[str, float],
+        identifiers: List[str],
+    ):
+        self.columns = columns
+        self.vectors = vectors
+        self.idf = idf
+        self.identifiers = identifiers
+
+    @classmethod
+    def build(cls, profile: Dict[str, Any], max_identifiers: int = 3) -> "ColumnIndex":
+        """
+        Build an index from a column profile.
+
+        Args:
+            profile (Dict[str, Any]): Output of MetadataExtractor.profile
+            max_identifiers (int): Identifier columns always kept in prompts
+        """
+        columns = list(profile["columns"])
+        documents = []
+        for col in columns:
+            stats = profile["columns"][col]
+            name_words = _words(col)
+            words = name_words * 2
+            for word in name_words:
+                words.extend(SYNONYMS.get(word, []))
+            for value, _ in stats.get("top") or []:
+                if isinstance(value, str):
+                    words.extend(_words(value))
+            documents.append(_features(words))
+
+        counts = Counter(feature for document in documents for feature in document)
+        idf = {
+            feature: math.log((1 + len(documents)) / (1 + count)) + 1
+            for feature, count in counts.items()
+        }
+        vectors = [cls._normalize(document, idf) for document in documents]
+
+        identifiers = [
+            col
+            for col in columns
+            if _IDENTIFIER_NAME.search(col)
+            or profile["columns"][col].get("kind") == "unique"
+        ][:max_identifiers]
+        return cls(columns, vectors, idf, identifiers)
+
+    def select(self, query: str, k: int) -> List[str]:
+        """
+        Return identifier columns plus the k columns scoring highest for
+        query, in dataset order.
+        """
+        query_vector = self._normalize(_features(_words(query)), self.idf)
+        scores = [
+            sum(
+                weight * vector.get(feature, 0.0)
+                for feature, weight in query_vector.items()
+            )
+            for vector in self.vectors
+        ]
+        ranked = sorted(
+            (i for i, score in enumerate(scores) if score > 0),
+            key=lambda i: scores[i],
+            reverse=True,
+        )
+        selected = set(self.identifiers) | {self.columns[i] for i in ranked[:k]}
+        return [col for col in self.columns if col in selected]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "columns": self.columns,
+            "vectors": self.vectors,
+            "idf": self.idf,
+            "identifiers": self.identifiers,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> Optional["ColumnIndex"]:
+        if not data:
+            return None
+        return cls(data["columns"], data["vectors"], data["idf"], data["identifiers"])
+
+    @staticmethod
+    def _normalize(features: Counter, idf: Dict[str, float]) -> Dict[str, float]:
+        weighted = {
+            feature: count * idf[feature]
+            for feature, count in features.items()
+            if feature in idf
+        }
+        norm = math.sqrt(sum(weight * weight for weight in weighted.values()))
+        if not norm:
+            return {}
+        return {feature: round(weight / norm, 6) for feature, weight in weighted.items()}
@@ -1,7 +1,22 @@
+import numpy as np
 import pandas as pd
 import os
-from typing import Optional, List, Dict, Union
+from typing import Callable, Optional, List, Dict, Union
 import logging
+from pandas.api.types import infer_dtype
+from utils.file_handler import FileHandler
+
+
+def hash_rows(df: pd.DataFrame) -> np.ndarray:
+    """
+    64-bit hashes of the rows of df, used to recognize duplicate rows across
+    chunks and appended files. Numbers hash as floats so that 1 and 1.0 in
+    differently typed chunks match.
+    """
+    normalized = df.apply(
+        lambda col: col.astype("float64") if pd.api.types.is_numeric_dtype(col) else col
+    )
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
 
 
 class DataProcessor:
@@ -20,6 +35,16 @@ class DataProcessor:
         self.threshold = threshold
         self.logger = logging.getLogger(__name__)
         self._supported_extensions = {".csv", ".xls", ".xlsx"}
+        # Optional callable(stage, rows) notified as processing advances
+        self.progress_callback: Optional[Callable[[str, int], None]] = None
+        # Shrink dtypes after cleaning; the bytes saved end up in memory_report
+        self.optimize_dtypes = False
+        self.memory_report: Optional[Dict[str, object]] = None
+        # State kept after cleaning so rows appended later can be cleaned alone:
+        # hashes of the distinct input rows, and the count and sum behind the
+        # mean of each numeric column
+        self.row_hashes: Optional[np.ndarray] = None
+        self.column_sums: Dict[str, Dict[str, float]] = {}
 
     def clean_and_process_file(
         self,
@@ -27,6 +52,8 @@ class DataProcessor:
         output_path: str,
         encoding: str = "utf-8",
         delimiter: str = ",",
+        extra_output_paths: Optional[List[str]] = None,
+        sheet_name: Optional[str] = None,
     ) -> Optional[pd.DataFrame]:
         """
         Clean and process a data file.
@@ -36,21 +63,33 @@ class DataProcessor:
             output_path (str): Path to save cleaned file
             encoding (str): File encoding
             delimiter (str): CSV delimiter
+            extra_output_paths (List[str]): Additional paths (e.g. a CSV next to
+                a Feather file) to save the cleaned file to
+            sheet_name (str): Worksheet of an Excel file; the first one if None
 
         Returns:
             Optional[pd.DataFrame]: Cleaned DataFrame or None if processing fails
         """
         try:
             # Load and validate file
-            df = self._load_file(file_path, encoding, delimiter)
+            self._report_progress("loading")
+            df = self._load_file(file_path, encoding, delimiter, sheet_name)
             if df is None:
                 return None
 
             # Apply cleaning operations
+            self._report_progress("cleaning", len(df))
             df = self._clean_dataframe(df)
 
+            if self.optimize_dtypes:
+                self._report_progress("optimizing", len(df))
+                df = self._optimize_dtypes(df)
+
             # Save processed file
+            self._report_progress("saving", len(df))
             self._save_file(df, output_path, file_path)
+            for extra_path in extra_output_paths or []:
+                self._save_file(df, extra_path, file_path)
 
             self.logger.info(f"Cleaning complete. Cleaned file saved to: {output_path}")
             return df
@@ -59,8 +98,16 @@ class DataProcessor:
             self.logger.error(f"Error during cleaning: {str(e)}")
             return None
 
+    def _report_progress(self, stage: str, rows: int = 0) -> None:
+        if self.progress_callback is not None:
+            self.progress_callback(stage, rows)
+
     def _load_file(
-        self, file_path: str, encoding: str, delimiter: str
+        self,
+        file_path: str,
+        encoding: str,
+        delimiter: str,
+        sheet_name: Optional[str] = None,
     ) -> Optional[pd.DataFrame]:
         """Load data file based on extension."""
         file_extension = os.path.splitext(file_path)[1].lower()
@@ -81,7 +128,11 @@ class DataProcessor:
                     engine="python",
                 )
             else:  # Excel files
-                return pd.read_excel(file_path, engine="openpyxl")
+                return pd.read_excel(
+                    file_path,
+                    sheet_name=0 if sheet_name is None else sheet_name,
+                    engine="openpyxl",
+                )
 
         except Exception as e:
             self.logger.error(f"Error loading file: {str(e)}")
@@ -108,7 +159,9 @@ class DataProcessor:
 
     def _remove_duplicates(self, df: pd.DataFrame) -> pd.DataFrame:
         """Remove duplicate rows."""
-        return df.drop_duplicates()
+        df = df.drop_duplicates()
+        self.row_hashes = hash_rows(df)
+        return df
 
     def _handle_missing_values(self, df: pd.DataFrame) -> pd.DataFrame:
         """Handle missing values in DataFrame."""
@@ -118,10 +171,16 @@ class DataProcessor:
         # Fill missing values in numeric columns
         numeric_cols = df.select_dtypes(include=["float64", "int64"]).columns
         if not numeric_cols.empty:
+            for col in numeric_cols:
+                self._record_sum(col, df[col].count(), df[col].sum())
             df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].mean())
 
         return df
 
+    def _record_sum(self, col: str, count, total) -> None:
+        """Remember the count and sum behind a column's mean, for appends."""
+        self.column_sums[col] = {"count": int(count), "sum": float(total)}
+
     def _convert_numeric_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         """Convert object columns to numeric where possible."""
         for col in df.select_dtypes(include=["object"]).columns:
@@ -131,6 +190,7 @@ class DataProcessor:
 
                 # Fill new NaN values after conversion
                 if pd.api.types.is_numeric_dtype(df[col]):
+                    self._record_sum(col, df[col].count(), df[col].sum())
                     df[col] = df[col].fillna(df[col].mean())
 
         return df
@@ -139,18 +199,244 @@ class DataProcessor:
         """Remove rows with invalid or corrupted data."""
         return df[df.applymap(lambda x: isinstance(x, (int, float, str))).all(axis=1)]
 
+    # Text columns become categoricals with at most this many distinct values,
+    # making up at most this share of the rows
+    CATEGORY_MAX_DISTINCT = 1000
+    CATEGORY_MAX_RATIO = 0.5
+
+    def _optimize_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Downcast integer columns and turn low-cardinality text into categoricals."""
+        before = df.memory_usage(deep=True, index=False)
+        changed = {}
+        for col in df.columns:
+            dtype = self._smallest_dtype(df[col])
+            if dtype is not None:
+                changed[col] = (str(df[col].dtype), dtype)
+                df[col] = df[col].astype(dtype)
+        after = df.memory_usage(deep=True, index=False)
+
+        self.memory_report = {
+            "bytes_before": int(before.sum()),
+            "bytes_after": int(after.sum()),
+            "dtypes": {col: new for col, (_, new) in changed.items()},
+            "columns": {
+                col: {
+                    "from": old,
+                    "to": new,
+                    "bytes_saved": int(before[col] - after[col]),
+                }
+                for col, (old, new) in changed.items()
+            },
+        }
+        self.logger.info(
+            f"Optimized {len(changed)} column dtypes: "
+            f"{self.memory_report['bytes_before']} -> "
+            f"{self.memory_report['bytes_after']} bytes"
+        )
+        return df
+
+    def _smallest_dtype(self, series: pd.Series) -> Optional[str]:
+        """
+        The smallest dtype that holds series safely, or None to keep its dtype.
+
+        Integers keep enough headroom for the sum or product of any two of
+        their values, which numpy computes in the column's own type and would
+        silently overflow. Floats stay float64: float32 sums over many rows
+        lose precision.
+        """
+        dtype = series.dtype
+        if isinstance(dtype, np.dtype) and dtype.kind in "iu":
+            if series.empty:
+                return None
+            bound = max(abs(int(series.min())), abs(int(series.max())))
+            for candidate in ("int8", "int16", "int32"):
+                if np.dtype(candidate).itemsize >= dtype.itemsize:
+                    return None
+                if bound * bound <= np.iinfo(candidate).max:
+                    return candidate
+            return None
+
+        if dtype == object and infer_dtype(series, skipna=True) == "string":
+            distinct = series.nunique(dropna=True)
+            if (
+                distinct <= self.CATEGORY_MAX_DISTINCT
+                and distinct <= self.CATEGORY_MAX_RATIO * len(series)
+            ):
+                return "category"
+        return None
+
     def _save_file(
         self, df: pd.DataFrame, output_path: str, original_path: str
     ) -> None:
         """Save processed DataFrame to file."""
         try:
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-            if output_path.endswith(".csv"):
-                df.to_csv(output_path, index=False, encoding="utf-8")
-            elif output_path.endswith((".xls", ".xlsx")):
-                df.to_excel(output_path, index=False, engine="openpyxl")
+            file_type = os.path.splitext(output_path)[1].lstrip(".").lower()
+            FileHandler.write_dataframe(df, output_path, file_type)
 
         except Exception as e:
             self.logger.error(f"Error saving file: {str(e)}")
             raise
+
+
+class VectorizedDataProcessor(DataProcessor):
+    """
+    A DataProcessor that produces the same cleaned output with column-level
+    operations instead of per-cell Python callbacks.
+    """
+
+    # Types accepted by DataProcessor._remove_invalid_rows
+    _VALID_CELL_TYPES = (int, float, str)
+
+    def __init__(
+        self,
+        threshold: float = 0.5,
+        csv_engine: str = "c",
+        numeric_coercion_threshold: float = 0.05,
+        numeric_sample_size: int = 100,
+    ):
+        """
+        Initialize the VectorizedDataProcessor.
+
+        Args:
+            threshold (float): Minimum percentage of non-NA values required in a row (0-1)
+            csv_engine (str): pandas CSV engine, "c" or "pyarrow"
+            numeric_coercion_threshold (float): Maximum share of non-null values that
+                may fail numeric parsing for an object column to be converted (0-1)
+            numeric_sample_size (int): Values parsed per column before a full conversion
+        """
+        super().__init__(threshold)
+        self.csv_engine = csv_engine
+        self.numeric_coercion_threshold = numeric_coercion_threshold
+        self.numeric_sample_size = numeric_sample_size
+
+    def _load_file(
+        self,
+        file_path: str,
+        encoding: str,
+        delimiter: str,
+        sheet_name: Optional[str] = None,
+    ) -> Optional[pd.DataFrame]:
+        """Load data file, using a compiled CSV engine where possible."""
+        file_extension = os.path.splitext(file_path)[1].lower()
+
+        # Multi-character and regex delimiters are only handled by the python engine
+        if file_extension != ".csv" or len(delimiter) != 1:
+            return super()._load_file(file_path, encoding, delimiter, sheet_name)
+
+        try:
+            kwargs = {"low_memory": False} if self.csv_engine == "c" else {}
+            df = pd.read_csv(
+                file_path,
+                encoding=encoding,
+                delimiter=delimiter,
+                on_bad_lines="skip",
+                engine=self.csv_engine,
+                **kwargs,
+            )
+            if self.csv_engine == "pyarrow":
+                # Arrow nulls arrive as None in object columns; the other engines use NaN
+                for col in df.select_dtypes(include=["object"]).columns:
+                    df[col] = df[col].where(df[col].notna(), np.nan)
+            return df
+
+        except Exception as e:
+            self.logger.error(f"Error loading file: {str(e)}")
+            return None
+
+    def _convert_numeric_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Convert object columns that parse as numbers, within the coercion threshold."""
+        for col in df.select_dtypes(include=["object"]).columns:
+            values = df[col].dropna()
+            if values.empty:
+                continue
+
+            # Reject obviously textual columns on a small sample first
+            sample = values.iloc[: self.numeric_sample_size]
+            if self._coercion_rate(sample) > self.numeric_coercion_threshold:
+                continue
+
+            converted = pd.to_numeric(df[col], errors="coerce")
+            failed = converted.isna().sum() - df[col].isna().sum()
+            if failed / len(values) > self.numeric_coercion_threshold:
+                continue
+
+            self._record_sum(col, converted.count(), converted.sum())
+            df[col] = converted.fillna(converted.mean())
+
+        return df
+
+    def _remove_invalid_rows(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Remove rows with invalid or corrupted data, checking by dtype."""
+        valid = np.ones(len(df), dtype=bool)
+
+        for col in df.columns:
+            series = df[col]
+            dtype = series.dtype
+
+            # numpy int/uint/float/bool columns only hold valid values
+            if isinstance(dtype, np.dtype) and dtype.kind in "biuf":
+                continue
+
+            if dtype == object and infer_dtype(series, skipna=True) in (
+                "string",
+                "empty",
+            ):
+                # Only the null cells can be invalid: NaN is a float, None is not
+                nulls = series.isna().to_numpy()
+                if nulls.any():
+                    valid[nulls] &= (
+                        series[nulls].map(self._is_valid_cell).to_numpy(dtype=bool)
+                    )
+                continue
+
+            # Same per-cell values DataFrame.applymap would see
+            valid &= (
+                series.astype(object).map(self._is_valid_cell).to_numpy(dtype=bool)
+            )
+
+        return df[valid]
+
+    def _coercion_rate(self, values: pd.Series) -> float:
+        """Share of non-null values that fail numeric parsing."""
+        converted = pd.to_numeric(values, errors="coerce")
+        return float(converted.isna().sum()) / len(values)
+
+    @classmethod
+    def _is_valid_cell(cls, value) -> bool:
+        return isinstance(value, cls._VALID_CELL_TYPES)
+
+
+def create_data_processor(
+    engine: str = "vectorized",
+    csv_engine: str = "c",
+    chunk_size: Optional[int] = None,
+    optimize_dtypes: bool = False,
+    excel_engine: str = "openpyxl",
+):
+    """
+    Build the DataProcessor for a cleaning engine name.
+
+    A chunk_size streams CSV and .xlsx input through the chunked engine
+    instead, whatever engine is named: it builds on the vectorized engine and
+    reads CSV chunks with the C parser, as pyarrow can't read in chunks.
+    """
+    if engine not in ("legacy", "vectorized"):
+        raise ValueError(f"Unknown cleaning engine: {engine}")
+    if chunk_size:
+        from core.chunked_processor import ChunkedDataProcessor
+
+        if engine != "vectorized" or csv_engine != "c":
+            logging.getLogger(__name__).warning(
+                f"Streaming ingest uses the chunked engine; cleaning engine "
+                f"{engine!r} and CSV engine {csv_engine!r} are not used"
+            )
+        processor = ChunkedDataProcessor(
+            chunk_size=chunk_size, excel_engine=excel_engine
+        )
+    elif engine == "legacy":
+        processor = DataProcessor()
+    else:
+        processor = VectorizedDataProcessor(csv_engine=csv_engine)
+    processor.optimize_dtypes = optimize_dtypes
+    return processor
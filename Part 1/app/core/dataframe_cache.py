@@ -0,0 +1,136 @@
+import os
+import threading
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+
+@dataclass
+class CacheEntry:
+    df: pd.DataFrame
+    metadata: Dict[str, Any]
+    file_path: str
+    mtime: float
+    nbytes: int
+
+
+class DataFrameCache:
+    """
+    A process-wide LRU cache of parsed DataFrames and their metadata.
+    Entries are keyed by file_id and invalidated when the backing file changes
+    (different path or modification time).
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Initialize the DataFrameCache.
+
+        Args:
+            max_bytes (int): Memory budget for all cached DataFrames combined
+        """
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(__name__)
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_load(
+        self,
+        file_id: str,
+        file_path: str,
+        loader: Callable[[str], Tuple[pd.DataFrame, Dict[str, Any]]],
+    ) -> CacheEntry:
+        """
+        Return the cached entry for file_id, loading it with loader on a miss.
+
+        Args:
+            file_id (str): Key of the dataset
+            file_path (str): Path of the file backing the dataset
+            loader (Callable): Returns (DataFrame, metadata) for a file path
+
+        Returns:
+            CacheEntry: Cached DataFrame and metadata
+        """
+        mtime = os.path.getmtime(file_path)
+
+        with self._lock:
+            entry = self._entries.get(file_id)
+            if (
+                entry is not None
+                and entry.file_path == file_path
+                and entry.mtime == mtime
+            ):
+                self._entries.move_to_end(file_id)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                self._remove(file_id)
+            self.misses += 1
+
+        df, metadata = loader(file_path)
+        entry = CacheEntry(
+            df=df,
+            metadata=metadata,
+            file_path=file_path,
+            mtime=mtime,
+            nbytes=int(df.memory_usage(deep=True).sum()),
+        )
+
+        with self._lock:
+            if entry.nbytes > self.max_bytes:
+                self.logger.warning(
+                    f"DataFrame for {file_id} ({entry.nbytes} bytes) exceeds cache budget"
+                )
+                return entry
+            if file_id in self._entries:
+                self._remove(file_id)
+            self._entries[file_id] = entry
+            self._current_bytes += entry.nbytes
+            self._evict()
+
+        return entry
+
+    def invalidate(self, file_id: str) -> None:
+        """Drop the entries for file_id and its tables ("{file_id}.{table}")."""
+        with self._lock:
+            for key in list(self._entries):
+                if key == file_id or key.startswith(f"{file_id}."):
+                    self._remove(key)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters and current memory usage."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _remove(self, file_id: str) -> None:
+        entry = self._entries.pop(file_id)
+        self._current_bytes -= entry.nbytes
+
+    def _evict(self) -> None:
+        """Evict least recently used entries until within the memory budget."""
+        while self._current_bytes > self.max_bytes and self._entries:
+            file_id, _ = next(iter(self._entries.items()))
+            self._remove(file_id)
+            self.evictions += 1
+            self.logger.debug(f"Evicted {file_id} from DataFrame cache")
@@ -0,0 +1,134 @@
+import re
+from typing import Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+EXCEL_ENGINES = ("openpyxl", "calamine")
+
+
+def table_slug(sheet_name: str) -> str:
+    """File-name-safe table name for a sheet, e.g. "Batting 2023" -> "batting_2023"."""
+    slug = re.sub(r"[^a-z0-9]+", "_", str(sheet_name).strip().lower()).strip("_")
+    return slug or "sheet"
+
+
+def table_slugs(sheet_names: Sequence[str]) -> List[str]:
+    """Unique table names for the sheets of a workbook, in sheet order."""
+    slugs: List[str] = []
+    for name in sheet_names:
+        slug = base = table_slug(name)
+        suffix = 1
+        while slug in slugs:
+            suffix += 1
+            slug = f"{base}_{suffix}"
+        slugs.append(slug)
+    return slugs
+
+
+def sheet_names(file_path: str, engine: str = "openpyxl") -> List[str]:
+    """Names of the worksheets in a workbook, in workbook order."""
+    if engine == "calamine":
+        from python_calamine import CalamineWorkbook
+
+        return list(CalamineWorkbook.from_path(file_path).sheet_names)
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        # Chart sheets have no cells
+        return [ws.title for ws in workbook.worksheets]
+    finally:
+        workbook.close()
+
+
+def _header(row: Sequence) -> List[str]:
+    """Column names as pd.read_excel assigns them: blanks named, duplicates suffixed."""
+    columns: List[str] = []
+    seen = {}
+    for i, value in enumerate(row):
+        name = f"Unnamed: {i}" if value is None or value == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def _openpyxl_rows(file_path: str, sheet_name: str) -> Iterator[tuple]:
+    from openpyxl import load_workbook
+
+    # Read-only mode parses the sheet XML lazily instead of building every cell
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        yield from workbook[sheet_name].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _calamine_rows(file_path: str, sheet_name: str) -> Iterator[list]:
+    from python_calamine import CalamineWorkbook
+
+    sheet = CalamineWorkbook.from_path(file_path).get_sheet_by_name(sheet_name)
+    for row in sheet.iter_rows():
+        # calamine reports empty cells as ""
+        yield [None if value == "" else value for value in row]
+
+
+def iter_sheet_chunks(
+    file_path: str,
+    sheet_name: Optional[str] = None,
+    chunk_size: int = 100_000,
+    engine: str = "openpyxl",
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a worksheet as DataFrames of at most chunk_size rows.
+
+    The first non-empty row is the header, as with pd.read_excel. Empty rows
+    are skipped, so a sheet with stray formatting far below the data is not
+    padded with blank rows. Only one chunk of cell values is held at a time.
+
+    Args:
+        file_path (str): Path of the .xlsx workbook
+        sheet_name (str): Worksheet to read; the first one if None
+        chunk_size (int): Rows per yielded DataFrame
+        engine (str): "openpyxl", or "calamine" if python-calamine is installed
+
+    Yields:
+        pd.DataFrame: Consecutive row chunks of the sheet
+    """
+    if engine not in EXCEL_ENGINES:
+        raise ValueError(f"Unknown Excel engine: {engine}")
+    if sheet_name is None:
+        sheet_name = sheet_names(file_path, engine)[0]
+    reader = _calamine_rows if engine == "calamine" else _openpyxl_rows
+
+    columns: Optional[List[str]] = None
+    buffer: List[tuple] = []
+    chunks = 0
+    for row in reader(file_path, sheet_name):
+        if all(value is None for value in row):
+            continue
+        if columns is None:
+            # Trailing blank header cells are formatting, not columns
+            width = len(row)
+            while width and row[width - 1] in (None, ""):
+                width -= 1
+            columns = _header(row[:width])
+            continue
+        row = tuple(row[: len(columns)])
+        if len(row) < len(columns):
+            row += (None,) * (len(columns) - len(row))
+        buffer.append(row)
+        if len(buffer) >= chunk_size:
+            yield pd.DataFrame.from_records(buffer, columns=columns)
+            buffer = []
+            chunks += 1
+
+    if columns is None:
+        raise ValueError(f"Sheet {sheet_name!r} is empty")
+    # A header-only sheet still yields its (empty) schema
+    if buffer or not chunks:
+        yield pd.DataFrame.from_records(buffer, columns=columns)
@@ -11,16 +11,37 @@ class MetadataExtractor:
     Provides detailed information about the structure and content of the data.
     """
 
-    def __init__(self, sample_size: int = 5):
+    # Separators tried when looking for multi-valued text such as "ST, LW"
+    LIST_SEPARATORS = (",", ";", "|")
+
+    def __init__(
+        self,
+        sample_size: int = 5,
+        top_k: int = 5,
+        detection_sample: int = 1000,
+        max_value_length: int = 40,
+    ):
         """
         Initialize the MetadataExtractor.
+
+        Args:
+            sample_size (int): Rows kept as a sample
+            top_k (int): Most frequent values kept per column in a profile
+            detection_sample (int): Values inspected to detect dates and lists
+            max_value_length (int): Longer values are truncated in profiles
         """
         self.sample_size = sample_size
+        self.top_k = top_k
+        self.detection_sample = detection_sample
+        self.max_value_length = max_value_length
         self.logger = logging.getLogger(__name__)
 
-    def extract_metadata(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def extract_metadata(
+        self, df: pd.DataFrame, profile: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Extract comprehensive metadata from a DataFrame.
+        A precomputed column profile is attached when given.
         """
         try:
             metadata = {
@@ -29,8 +50,215 @@ class MetadataExtractor:
                 "Data Types": str(df.dtypes),
                 "Sample": df.head(1).to_dict(orient="records"),
             }
+            if profile is not None:
+                metadata["Profile"] = profile
             return metadata
 
         except Exception as e:
             self.logger.error(f"Error extracting metadata: {str(e)}")
             return {"error": str(e)}
+
+    def profile(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Compute per-column statistics for the prompt: null counts, cardinality,
+        min/max/mean of numbers, top values of text, date ranges and the
+        items of multi-valued text columns. The result is JSON serializable.
+        """
+        nulls = df.isna().sum()
+        numeric = df.select_dtypes(include="number")
+        # Column-wise reduction over the whole numeric block at once
+        means = numeric.mean()
+
+        columns = {}
+        for col in df.columns:
+            column = df[col]
+            stats: Dict[str, Any] = {
+                "dtype": str(column.dtype),
+                "nulls": int(nulls[col]),
+                "distinct": int(column.nunique(dropna=True)),
+            }
+            if col in numeric.columns:
+                stats.update(
+                    min=self._to_json(column.min()),
+                    max=self._to_json(column.max()),
+                    mean=self._to_json(means[col]),
+                )
+            elif pd.api.types.is_datetime64_any_dtype(column):
+                stats.update(kind="date", **self._date_range(column))
+            elif pd.api.types.is_bool_dtype(column):
+                stats["top"] = self._top_values(column)
+            else:
+                stats.update(self._profile_text(column, stats["distinct"]))
+            columns[str(col)] = stats
+
+        return {"rows": int(len(df)), "columns": columns}
+
+    def merge_profiles(
+        self, profile: Dict[str, Any], appended: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Combine the profile of a dataset with the profile of rows appended to
+        it, without the rows themselves. Counts, ranges and means are exact;
+        distinct counts and top values are estimates: columns unique per row
+        add their distinct counts, others keep the larger one, and top values
+        add up the counts the two profiles kept.
+        """
+        rows = profile["rows"] + appended["rows"]
+        columns = {}
+        for col, stats in profile["columns"].items():
+            new = appended["columns"].get(col)
+            if new is None:
+                columns[col] = stats
+                continue
+            merged = dict(stats, nulls=stats["nulls"] + new["nulls"])
+            if stats["dtype"] != new["dtype"]:
+                merged["dtype"] = self._common_dtype(stats["dtype"], new["dtype"])
+            if stats.get("kind") == "unique" and new.get("kind") == "unique":
+                merged["distinct"] = stats["distinct"] + new["distinct"]
+            else:
+                merged["distinct"] = max(stats["distinct"], new["distinct"])
+                if stats.get("kind") == "unique":
+                    del merged["kind"]
+            if "mean" in stats and "mean" in new:
+                old_count = profile["rows"] - stats["nulls"]
+                new_count = appended["rows"] - new["nulls"]
+                total = old_count + new_count
+                mean = (
+                    ((stats["mean"] or 0) * old_count + (new["mean"] or 0) * new_count)
+                    / total
+                    if total
+                    else None
+                )
+                merged["mean"] = self._to_json(mean)
+            for bound, pick in (("min", min), ("max", max)):
+                values = [v for v in (stats.get(bound), new.get(bound)) if v is not None]
+                if bound in stats or bound in new:
+                    try:
+                        merged[bound] = pick(values) if values else None
+                    except TypeError:
+                        # Text and numbers mixed across parts; keep the first
+                        merged[bound] = stats.get(bound)
+            if "max_items" in new:
+                merged["max_items"] = max(stats.get("max_items", 0), new["max_items"])
+            if "top" in stats or "top" in new:
+                counts: Dict[Any, int] = {}
+                for value, count in [*stats.get("top", []), *new.get("top", [])]:
+                    counts[value] = counts.get(value, 0) + count
+                top = sorted(counts.items(), key=lambda item: -item[1])[: self.top_k]
+                merged["top"] = [[value, count] for value, count in top]
+            columns[col] = merged
+        return {"rows": rows, "columns": columns}
+
+    @staticmethod
+    def _common_dtype(left: str, right: str) -> str:
+        """The dtype of a column concatenated from parts of these dtypes."""
+        try:
+            return str(np.result_type(np.dtype(left), np.dtype(right)))
+        except TypeError:
+            return "object"
+
+    def render_profile(
+        self, profile: Dict[str, Any], columns: Optional[List[str]] = None
+    ) -> str:
+        """
+        Render a profile as one compact line per column for the LLM prompt,
+        limited to columns when given.
+        """
+        lines = [f"{profile['rows']} rows"]
+        for col, stats in profile["columns"].items():
+            if columns is not None and col not in columns:
+                continue
+            details = [stats["dtype"]]
+            if stats["nulls"]:
+                details.append(f"{stats['nulls']} nulls")
+            details.append(f"{stats['distinct']} distinct")
+            if "mean" in stats:
+                details.append(
+                    f"min {stats['min']}, max {stats['max']}, mean {stats['mean']}"
+                )
+            kind = stats.get("kind")
+            if kind == "date":
+                details.append(f"dates {stats['min']} to {stats['max']}")
+            elif kind == "list":
+                details.append(
+                    f"lists separated by '{stats['separator']}', "
+                    f"up to {stats['max_items']} items"
+                )
+            elif kind == "unique":
+                details.append("unique per row")
+            if stats.get("top"):
+                top = ", ".join(f"{value} ({count})" for value, count in stats["top"])
+                details.append(f"top: {top}")
+            lines.append(f"- {col}: " + "; ".join(details))
+        return "\n".join(lines)
+
+    def _profile_text(self, column: pd.Series, distinct: int) -> Dict[str, Any]:
+        non_null = column.dropna()
+        if non_null.empty:
+            return {}
+        sample = non_null.iloc[: self.detection_sample].astype(str)
+
+        separator = self._list_separator(sample)
+        if separator is not None:
+            items = non_null.astype(str).str.split(separator)
+            exploded = items.explode().str.strip()
+            return {
+                "kind": "list",
+                "separator": separator,
+                "max_items": int(items.str.len().max()),
+                "top": self._top_values(exploded),
+            }
+
+        if self._looks_like_dates(sample):
+            dates = pd.to_datetime(non_null, errors="coerce", format="mixed")
+            return {"kind": "date", **self._date_range(dates)}
+
+        if distinct == len(non_null):
+            return {"kind": "unique"}
+        return {"top": self._top_values(non_null)}
+
+    def _list_separator(self, sample: pd.Series) -> Optional[str]:
+        """Return the separator of a multi-valued column, or None."""
+        for separator in self.LIST_SEPARATORS:
+            if sample.str.contains(separator, regex=False).mean() < 0.3:
+                continue
+            tokens = sample.str.split(separator).explode().str.strip()
+            # Repeating short items (positions, tags) rather than free text
+            if tokens.str.len().mean() <= 20 and tokens.nunique() <= max(
+                10 * self.top_k, 0.5 * sample.nunique()
+            ):
+                return separator
+        return None
+
+    def _looks_like_dates(self, sample: pd.Series) -> bool:
+        # Plain numbers parse as dates too; they are not dates here
+        if pd.to_numeric(sample, errors="coerce").notna().mean() > 0.5:
+            return False
+        parsed = pd.to_datetime(sample, errors="coerce", format="mixed")
+        return parsed.notna().mean() >= 0.9
+
+    def _date_range(self, dates: pd.Series) -> Dict[str, Any]:
+        return {
+            "min": self._to_json(dates.min()),
+            "max": self._to_json(dates.max()),
+        }
+
+    def _top_values(self, column: pd.Series) -> List[List[Any]]:
+        counts = column.value_counts(dropna=True).head(self.top_k)
+        return [[self._to_json(value), int(count)] for value, count in counts.items()]
+
+    def _to_json(self, value: Any) -> Any:
+        """Convert numpy/pandas scalars into JSON-friendly Python values."""
+        if value is None or (np.isscalar(value) and pd.isna(value)):
+            return None
+        if isinstance(value, (pd.Timestamp, datetime)):
+            if value == value.replace(hour=0, minute=0, second=0, microsecond=0):
+                return value.date().isoformat()
+            return value.isoformat()
+        if isinstance(value, np.generic):
+            value = value.item()
+        if isinstance(value, float):
+            return round(value, 4)
+        if isinstance(value, str) and len(value) > self.max_value_length:
+            return value[: self.max_value_length] + "..."
+        return value
@@ -0,0 +1,464 @@
+import re
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+AGGREGATIONS = {
+    "average": "mean",
+    "avg": "mean",
+    "mean": "mean",
+    "median": "median",
+    "total": "sum",
+    "sum": "sum",
+    "maximum": "max",
+    "max": "max",
+    "highest": "max",
+    "minimum": "min",
+    "min": "min",
+    "lowest": "min",
+}
+
+# Longest phrases first so "greater than or equal to" wins over "greater than"
+COMPARATORS = [
+    ("greater than or equal to", ">="),
+    ("less than or equal to", "<="),
+    ("not equal to", "!="),
+    ("greater than", ">"),
+    ("higher than", ">"),
+    ("more than", ">"),
+    ("less than", "<"),
+    ("lower than", "<"),
+    ("fewer than", "<"),
+    ("at least", ">="),
+    ("at most", "<="),
+    ("equal to", "=="),
+    ("equals", "=="),
+    ("is not", "!="),
+    ("above", ">"),
+    ("over", ">"),
+    ("below", "<"),
+    ("under", "<"),
+    ("is", "=="),
+    (">=", ">="),
+    ("<=", "<="),
+    ("!=", "!="),
+    ("==", "=="),
+    ("=", "=="),
+    (">", ">"),
+    ("<", "<"),
+]
+
+# Nouns that name the rows themselves, so "how many players" counts rows.
+# Nouns that usually name a grouping (teams, countries) are left out
+ROW_NOUNS = {
+    "rows",
+    "records",
+    "entries",
+    "items",
+    "lines",
+    "observations",
+    "samples",
+    "people",
+    "persons",
+    "players",
+    "customers",
+    "users",
+    "employees",
+    "students",
+    "products",
+    "orders",
+    "transactions",
+}
+
+_AGGREGATION_WORDS = "|".join(AGGREGATIONS)
+_GROUP_WORDS = r"by|per|for each|for every|in each|across|grouped by"
+_LEADING_WORDS = re.compile(
+    r"^(?:(?:please|can you|could you|show me|show|list|give me|find|get|display|"
+    r"return|print|tell me|what is|what's|what are|who are|which are|the|all)\s+)+"
+)
+
+
+@dataclass
+class QueryPlan:
+    """A pandas expression answering a query, evaluated against df."""
+
+    kind: str
+    code: str
+
+    def execute(self, df: pd.DataFrame) -> Any:
+        return eval(self.code, {"__builtins__": {}}, {"df": df})
+
+
+class QueryPlanner:
+    """
+    Matches common query shapes (top-N, filters, group-by aggregates and
+    counts) against a dataset's columns and turns them into pandas
+    expressions. Anything it cannot match with certainty is left to the agent.
+    """
+
+    def __init__(self, max_rows: int = 50, default_top_n: int = 10):
+        """
+        Initialize the QueryPlanner.
+
+        Args:
+            max_rows (int): Rows printed before an answer is truncated
+            default_top_n (int): N used when a top-N query gives none
+        """
+        self.max_rows = max_rows
+        self.default_top_n = default_top_n
+        self.logger = logging.getLogger(__name__)
+
+    def plan(
+        self,
+        query: str,
+        df: pd.DataFrame,
+        profile: Optional[Dict[str, Any]] = None,
+    ) -> Optional[QueryPlan]:
+        """
+        Return a plan for query, or None if it does not clearly match a
+        supported shape over df's columns.
+        """
+        try:
+            text = self._normalize(query)
+            text, masks, filter_columns = self._split_filter(text, df, profile)
+            if text is None:
+                return None
+            base = f"df[{' & '.join(f'({m})' for m in masks)}]" if masks else "df"
+            plan = self._match(text, base, df, profile, filter_columns, bool(masks))
+        except Exception as e:
+            self.logger.debug(f"Query planning failed: {e}")
+            return None
+        if plan is not None:
+            self.logger.info(f"Planned {plan.kind} query: {plan.code}")
+        return plan
+
+    def render(self, result: Any) -> str:
+        """Format a plan's result like an agent answer."""
+        if isinstance(result, pd.Series):
+            result = result.reset_index()
+        if isinstance(result, pd.DataFrame):
+            text = result.head(self.max_rows).to_string(index=False)
+            if len(result) > self.max_rows:
+                text += f"\n... {len(result) - self.max_rows} more rows"
+        elif isinstance(result, float):
+            text = f"{result:.4f}".rstrip("0").rstrip(".")
+        else:
+            text = str(result)
+        return f"```python\n{text}\n```"
+
+    def _match(
+        self,
+        text: str,
+        base: str,
+        df: pd.DataFrame,
+        profile: Optional[Dict[str, Any]],
+        filter_columns: List[str],
+        filtered: bool,
+    ) -> Optional[QueryPlan]:
+        # top/bottom N ... by <column>
+        match = re.fullmatch(
+            r"(top|bottom|highest|lowest|best|worst)\s*(\d+)?\s*(.*?)\s+"
+            r"(?:by|based on|sorted by|ranked by|in terms of)\s+(.+)",
+            text,
+        )
+        if match:
+            ascending = match.group(1) in ("bottom", "lowest", "worst")
+            return self._top_n(
+                match.group(2),
+                match.group(3),
+                match.group(4),
+                ascending,
+                base,
+                df,
+                profile,
+                filter_columns,
+            )
+
+        # N <things> with the highest <column>
+        match = re.fullmatch(
+            r"(?:top\s+)?(\d+)?\s*(.*?)\s*with\s+(?:the\s+)?"
+            r"(highest|lowest|most|least|best|worst|largest|smallest)\s+(.+)",
+            text,
+        )
+        if match:
+            ascending = match.group(3) in ("lowest", "least", "worst", "smallest")
+            return self._top_n(
+                match.group(1),
+                match.group(2),
+                match.group(4),
+                ascending,
+                base,
+                df,
+                profile,
+                filter_columns,
+            )
+
+        # <aggregation> of <column> by <column>
+        match = re.fullmatch(
+            rf"({_AGGREGATION_WORDS})\s+(?:of\s+)?(.+?)\s+(?:{_GROUP_WORDS})\s+(.+)",
+            text,
+        )
+        if match:
+            value = self._resolve_column(match.group(2), df)
+            group = self._resolve_column(match.group(3), df)
+            if value is None or group is None or not self._is_numeric(df, value):
+                return None
+            func = AGGREGATIONS[match.group(1)]
+            return QueryPlan(
+                "group_aggregate",
+                f"{base}.groupby({group!r}, observed=True)[{value!r}].{func}()"
+                ".sort_values(ascending=False)",
+            )
+
+        # count/number of <things> by <column>
+        match = re.fullmatch(
+            rf"(?:how many|count of|count|number of)\s+(.*?)\s*(?:are there\s+)?"
+            rf"(?:{_GROUP_WORDS})\s+(.+)",
+            text,
+        )
+        if match:
+            group = self._resolve_column(match.group(2), df)
+            if group is None:
+                return None
+            code = f"{base}[{group!r}].value_counts()"
+            if isinstance(df[group].dtype, pd.CategoricalDtype):
+                # Categoricals also count the categories a filter left empty
+                code += ".loc[lambda counts: counts > 0]"
+            return QueryPlan("group_count", code)
+
+        # how many <things> (with a filter)
+        match = re.fullmatch(
+            r"(?:how many|count of|count|number of|total number of)"
+            r"(?:\s+(different|distinct|unique))?((?:\s+\w+){0,2}?)"
+            r"(?:\s+(?:are there|there are|exist|do we have|are in the dataset))?",
+            text,
+        )
+        if match:
+            return self._count(bool(match.group(1)), match.group(2).strip(), base, df, profile)
+
+        # <aggregation> of <column>
+        match = re.fullmatch(rf"({_AGGREGATION_WORDS})\s+(?:of\s+)?(.+)", text)
+        if match:
+            value = self._resolve_column(match.group(2), df)
+            if value is None or not self._is_numeric(df, value):
+                return None
+            func = AGGREGATIONS[match.group(1)]
+            return QueryPlan("aggregate", f"{base}[{value!r}].{func}()")
+
+        # <things> where <condition>
+        if filtered and self._names_rows(text, df):
+            columns = self._display_columns(df, profile, filter_columns)
+            return QueryPlan("filter", f"{base}[{columns!r}]")
+
+        return None
+
+    def _top_n(
+        self,
+        n: Optional[str],
+        noun: str,
+        column_phrase: str,
+        ascending: bool,
+        base: str,
+        df: pd.DataFrame,
+        profile: Optional[Dict[str, Any]],
+        filter_columns: List[str],
+    ) -> Optional[QueryPlan]:
+        # "top 5 clubs by wage" ranks groups, not rows; leave it to the agent
+        if not self._names_rows(noun, df):
+            return None
+        column = self._resolve_column(column_phrase, df)
+        if column is None or not self._is_numeric(df, column):
+            return None
+        n = int(n) if n else self.default_top_n
+        columns = self._display_columns(df, profile, [*filter_columns, column])
+        method = "nsmallest" if ascending else "nlargest"
+        return QueryPlan("top_n", f"{base}.{method}({n}, {column!r})[{columns!r}]")
+
+    def _count(
+        self,
+        distinct: bool,
+        noun: str,
+        base: str,
+        df: pd.DataFrame,
+        profile: Optional[Dict[str, Any]],
+    ) -> Optional[QueryPlan]:
+        """
+        Count rows when the noun is the rows themselves, distinct values of a
+        categorical column, or the total of a numeric one ("how many goals").
+        """
+        column = self._resolve_column(noun, df) if noun else None
+        if column is not None:
+            stats = (profile or {}).get("columns", {}).get(str(column), {})
+            if stats.get("kind") == "list":
+                return None
+            if self._is_numeric(df, column) and not distinct:
+                return QueryPlan("aggregate", f"{base}[{column!r}].sum()")
+            return QueryPlan("distinct_count", f"{base}[{column!r}].nunique()")
+        if not distinct and self._names_rows(noun, df):
+            return QueryPlan("count", f"{base}.shape[0]")
+        return None
+
+    def _split_filter(
+        self, text: str, df: pd.DataFrame, profile: Optional[Dict[str, Any]]
+    ) -> Tuple[Optional[str], List[str], List[str]]:
+        """
+        Split a trailing "where/with/whose <conditions>" clause into boolean
+        masks. Returns (None, ...) when a clause is present but not understood.
+        """
+        match = re.search(
+            r"\s(?:where|whose|with|having|that have|who have)\s+(.+)$", text
+        )
+        if not match:
+            return text, [], []
+        # "with the highest x" is a ranking, not a filter
+        if re.match(
+            r"(?:the\s+)?(?:highest|lowest|most|least|best|worst|largest|smallest)\b",
+            match.group(1),
+        ):
+            return text, [], []
+
+        masks, columns = [], []
+        for condition in re.split(r"\s+and\s+", match.group(1)):
+            parsed = self._parse_condition(condition, df, profile)
+            if parsed is None:
+                return None, [], []
+            masks.append(parsed[0])
+            columns.append(parsed[1])
+        return text[: match.start()].strip(), masks, columns
+
+    def _parse_condition(
+        self, condition: str, df: pd.DataFrame, profile: Optional[Dict[str, Any]]
+    ) -> Optional[Tuple[str, str]]:
+        for phrase, operator in COMPARATORS:
+            pattern = (
+                rf"(.+?)\s*{re.escape(phrase)}\s*(.+)"
+                if not phrase[0].isalpha()
+                else rf"(.+?)\s+{re.escape(phrase)}\s+(.+)"
+            )
+            match = re.fullmatch(pattern, condition)
+            if not match:
+                continue
+            column = self._resolve_column(match.group(1), df)
+            if column is None:
+                continue
+            value = match.group(2).strip().strip("'\"")
+            mask = self._mask(df, profile, column, operator, value)
+            return (mask, column) if mask is not None else None
+        return None
+
+    def _mask(
+        self,
+        df: pd.DataFrame,
+        profile: Optional[Dict[str, Any]],
+        column: str,
+        operator: str,
+        value: str,
+    ) -> Optional[str]:
+        series = df[column]
+        if self._is_numeric(df, column):
+            try:
+                number = float(value.replace(",", ""))
+            except ValueError:
+                return None
+            number = int(number) if number.is_integer() else number
+            return f"df[{column!r}] {operator} {number!r}"
+
+        if operator not in ("==", "!="):
+            return None
+        stats = (profile or {}).get("columns", {}).get(str(column), {})
+        if stats.get("kind") == "list":
+            separator = re.escape(stats["separator"])
+            item = rf"(?:^|{separator})\s*{re.escape(value)}\s*(?:{separator}|$)"
+            mask = f"df[{column!r}].str.contains({item!r}, case=False, na=False)"
+            if not eval(mask, {"__builtins__": {}}, {"df": df}).any():
+                return None
+            return mask if operator == "==" else f"~{mask}"
+
+        # Use the value as spelled in the data; an unknown value means the
+        # query was probably misread
+        for candidate in series.dropna().unique():
+            if isinstance(candidate, str) and candidate.casefold() == value.casefold():
+                return f"df[{column!r}] {operator} {candidate!r}"
+        return None
+
+    def _resolve_column(self, phrase: str, df: pd.DataFrame) -> Optional[str]:
+        """Map a phrase to exactly one column, or None."""
+        phrase = self._normalize_name(re.sub(r"^(?:the|a|an)\s+", "", phrase.strip()))
+        names = {self._normalize_name(str(col)): col for col in df.columns}
+        for candidate in (phrase, phrase.rstrip("s"), self._singular(phrase)):
+            if candidate in names:
+                return names[candidate]
+        partial = [
+            col
+            for name, col in names.items()
+            if name.startswith(f"{phrase} ") or name.endswith(f" {phrase}")
+        ]
+        return partial[0] if len(partial) == 1 else None
+
+    def _resembles_column(self, phrase: str, df: pd.DataFrame) -> bool:
+        """Whether any word of phrase is also a word of a column name."""
+        words = {self._singular(word) for word in self._normalize_name(phrase).split()}
+        return any(
+            words.intersection(
+                self._singular(word) for word in self._normalize_name(str(col)).split()
+            )
+            for col in df.columns
+        )
+
+    def _names_rows(self, noun: str, df: pd.DataFrame) -> bool:
+        """Whether noun is absent or names the rows rather than a column or group."""
+        noun = noun.strip()
+        return not noun or (
+            self._is_row_entity(noun) and not self._resembles_column(noun, df)
+        )
+
+    def _is_row_entity(self, phrase: str) -> bool:
+        """Whether phrase names the rows ("players", "the rows") rather than a value."""
+        phrase = re.sub(r"^(?:the|a|an)\s+", "", phrase.strip())
+        return phrase in ROW_NOUNS
+
+    def _display_columns(
+        self,
+        df: pd.DataFrame,
+        profile: Optional[Dict[str, Any]],
+        extra: List[str],
+    ) -> List[str]:
+        """Identifier-like columns (names, ids) followed by the columns asked about."""
+        stats = (profile or {}).get("columns", {})
+        identifiers = [
+            col
+            for col in df.columns
+            if re.search(r"name|title", str(col), re.IGNORECASE)
+            or stats.get(str(col), {}).get("kind") == "unique"
+        ][:3]
+        if not identifiers:
+            identifiers = list(df.columns[:3])
+        columns = []
+        for col in [*identifiers, *extra]:
+            if col not in columns:
+                columns.append(col)
+        return columns
+
+    @staticmethod
+    def _is_numeric(df: pd.DataFrame, column: str) -> bool:
+        dtype = df[column].dtype
+        return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(
+            dtype
+        )
+
+    @staticmethod
+    def _singular(word: str) -> str:
+        if word.endswith("ies"):
+            return word[:-3] + "y"
+        return word[:-1] if word.endswith("s") and not word.endswith("ss") else word
+
+    @staticmethod
+    def _normalize(query: str) -> str:
+        text = re.sub(r"\s+", " ", query.strip().lower()).rstrip("?.! ")
+        return _LEADING_WORDS.sub("", text)
+
+    @staticmethod
+    def _normalize_name(name: str) -> str:
+        return re.sub(r"[\s_\-]+", " ", name.strip().lower())
@@ -0,0 +1,74 @@
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from core.metrics import SPAN_SECONDS
+
+_current: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar(
+    "trace", default=None
+)
+
+
+class Trace:
+    """Timed spans of one query, e.g. dataset load, each LLM call and each REPL run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+
+    def add(self, name: str, started: float, seconds: float, **attributes: Any) -> None:
+        self.spans.append(
+            {
+                "name": name,
+                "start": round(started - self.started, 4),
+                "seconds": round(seconds, 4),
+                **attributes,
+            }
+        )
+
+    def timing(self) -> Dict[str, Any]:
+        """The per-response timing block."""
+        return {
+            "total_seconds": round(time.perf_counter() - self.started, 4),
+            "spans": sorted(self.spans, key=lambda span: span["start"]),
+        }
+
+
+@contextmanager
+def trace() -> Iterator[Trace]:
+    """
+    Collect the spans recorded inside the block, including those recorded on
+    threads that copy the context (run_in_threadpool, the agent executor).
+    """
+    current = Trace()
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def record(name: str, started: float, seconds: float, **attributes: Any) -> None:
+    """Record a finished span in the span_seconds metric and the current trace."""
+    SPAN_SECONDS.observe(seconds, span=name)
+    current = _current.get()
+    if current is not None:
+        current.add(name, started, seconds, **attributes)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time the block as a span. The yielded dict can be filled with attributes
+    (e.g. token counts) that are only known at the end.
+    """
+    started = time.perf_counter()
+    try:
+        yield attributes
+    finally:
+        record(name, started, time.perf_counter() - started, **attributes)
@@ -1,9 +1,30 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from api import endpoints
+from config.settings import settings
+from core.metrics import REGISTRY
 import logging
 
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=settings.LOG_LEVEL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so /health answers while it runs
+    warmup = asyncio.create_task(endpoints.warmup()) if settings.WARMUP else None
+    if warmup is None:
+        endpoints.readiness["ready"] = True
+    yield
+    # Let warmup finish; stopping the ingest pool while it spawns workers
+    # leaves them failing to start
+    if warmup is not None:
+        await asyncio.gather(warmup, return_exceptions=True)
+    endpoints.ingest_jobs.shutdown()
+    if endpoints.repl_pool is not None:
+        endpoints.repl_pool.shutdown()
 
 
 def create_app() -> FastAPI:
@@ -11,6 +32,7 @@ def create_app() -> FastAPI:
         title="CSV Query Chatbot",
         description="A FastAPI app with CSV query and real-time chat",
         version="0.1.0",
+        lifespan=lifespan,
     )
     app.add_middleware(
         CORSMiddleware,
@@ -26,8 +48,23 @@ def create_app() -> FastAPI:
 
     @app.get("/health")
     def health():
+        """Liveness: the process is up and serving requests."""
         return {"status": "ok"}
 
+    @app.get("/ready")
+    def ready():
+        """Readiness: warmup has finished, so queries won't pay for it."""
+        if endpoints.readiness["ready"]:
+            return {"status": "ready", **endpoints.readiness}
+        status = "failed" if endpoints.readiness["error"] else "starting"
+        return JSONResponse({"status": status, **endpoints.readiness}, status_code=503)
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def metrics():
+        return PlainTextResponse(
+            REGISTRY.render(), media_type="text/plain; version=0.0.4"
+        )
+
     return app
 
 
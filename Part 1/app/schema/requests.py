@@ -1,3 +1,4 @@
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -6,3 +7,28 @@ class QueryRequest(BaseModel):
         ..., title="File ID", description="The ID of the uploaded file"
     )
     query: str = Field(..., title="Query", description="The query to be executed")
+    table: Optional[str] = Field(
+        None,
+        title="Table",
+        description="Sheet of an Excel upload to query; the first sheet by default",
+    )
+    file_ids: List[str] = Field(
+        [],
+        title="File IDs",
+        description="Other uploads the agent can join with in SQL",
+    )
+    session_id: Optional[str] = Field(
+        None,
+        title="Session ID",
+        description="Chat session whose REPL worker runs the query",
+    )
+    request_id: Optional[str] = Field(
+        None,
+        title="Request ID",
+        description="Client-chosen ID echoed on every streamed message",
+    )
+    timing: bool = Field(
+        False,
+        title="Timing",
+        description="Add a timing block with the query's spans to the answer",
+    )
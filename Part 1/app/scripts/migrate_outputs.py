@@ -0,0 +1,76 @@
+"""
+Convert cleaned CSV datasets in OUTPUT_DIR to a columnar format.
+
+Run from the app directory:
+    python -m scripts.migrate_outputs --format feather [--delete-csv] [--force]
+"""
+
+import argparse
+import glob
+import logging
+import os
+
+from config.settings import settings
+from utils.file_handler import FileHandler
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_outputs(
+    output_dir: str, file_type: str, delete_csv: bool = False, force: bool = False
+) -> int:
+    """
+    Convert every <file_id>.csv in output_dir to <file_id>.<file_type>.
+
+    Returns:
+        int: Number of files converted
+    """
+    converted = 0
+    for csv_path in sorted(glob.glob(os.path.join(output_dir, "*.csv"))):
+        target_path = f"{os.path.splitext(csv_path)[0]}.{file_type}"
+        if (
+            not force
+            and os.path.exists(target_path)
+            and os.path.getmtime(target_path) >= os.path.getmtime(csv_path)
+        ):
+            logger.info(f"Skipping {csv_path}: {target_path} is up to date")
+            continue
+
+        # Appended datasets are converted part by part
+        df = FileHandler.read_part(csv_path, "csv")
+        FileHandler.write_dataframe(df, target_path, file_type)
+        # Parts, tables, column sums, dtypes and the profile carry over; the
+        # encoding only describes the CSV
+        sidecar = FileHandler.read_sidecar(csv_path)
+        sidecar.pop("encoding", None)
+        if sidecar:
+            FileHandler.write_sidecar(target_path, sidecar)
+        converted += 1
+        logger.info(f"Converted {csv_path} -> {target_path}")
+
+        if delete_csv:
+            os.remove(csv_path)
+            sidecar_path = FileHandler.sidecar_path(csv_path)
+            if os.path.exists(sidecar_path):
+                os.remove(sidecar_path)
+
+    return converted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--format", choices=["feather", "parquet"], default="feather")
+    parser.add_argument("--output-dir", default=settings.OUTPUT_DIR)
+    parser.add_argument("--delete-csv", action="store_true")
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    converted = migrate_outputs(
+        args.output_dir, args.format, delete_csv=args.delete_csv, force=args.force
+    )
+    print(f"Converted {converted} file(s) to {args.format}")
+
+
+if __name__ == "__main__":
+    main()
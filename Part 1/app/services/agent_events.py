@@ -0,0 +1,138 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from core import tracing
+from core.metrics import LLM_TOKENS
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+AgentEvent = Dict[str, Any]
+
+
+class AgentCancelledError(Exception):
+    """Raised inside an agent run whose caller has cancelled it."""
+
+
+class AgentEventHandler(BaseCallbackHandler):
+    """
+    Turns LangChain callbacks from an agent run into structured events:
+
+    - {"type": "token", "channel": "thought" | "answer", "text": ...} for
+      streamed model output; text after "Final Answer:" is the answer channel
+    - {"type": "action", "tool": ..., "input": ..., "thought": ...} when the
+      agent decides to call a tool
+
+    Events are passed to emit on the thread running the agent. Setting
+    cancelled stops the run at its next model call, token or tool call.
+    """
+
+    # Let AgentCancelledError and errors from emit abort the run
+    raise_error = True
+
+    def __init__(
+        self,
+        emit: Optional[Callable[[AgentEvent], None]] = None,
+        cancelled: Optional[threading.Event] = None,
+    ):
+        self.emit = emit or (lambda event: None)
+        self.cancelled = cancelled or threading.Event()
+        self._text: Dict[UUID, str] = {}
+        self._last_chunk: Dict[UUID, Any] = {}
+
+    # LangChain only calls the model's streaming API when a handler
+    # implements these; passing the output through unchanged is enough
+    def tap_output_iter(self, run_id: UUID, output):
+        return output
+
+    def tap_output_aiter(self, run_id: UUID, output):
+        return output
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, **kwargs: Any) -> None:
+        self._check_cancelled()
+
+    def on_llm_start(self, serialized: Any, prompts: Any, **kwargs: Any) -> None:
+        self._check_cancelled()
+
+    def on_tool_start(self, serialized: Any, input_str: str, **kwargs: Any) -> None:
+        self._check_cancelled()
+
+    def on_llm_new_token(
+        self, token: str, *, chunk: Optional[Any] = None, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._check_cancelled()
+        # Some providers report a chunk themselves and LangChain reports it again
+        if chunk is not None and self._last_chunk.get(run_id) is chunk:
+            return
+        self._last_chunk[run_id] = chunk
+
+        before = self._text.get(run_id, "")
+        text = before + token
+        self._text[run_id] = text
+
+        marker = text.find(FINAL_ANSWER_MARKER)
+        answer_start = len(text) if marker == -1 else marker + len(FINAL_ANSWER_MARKER)
+        thought = text[len(before) : answer_start]
+        answer = text[max(answer_start, len(before)) :]
+        if thought:
+            self.emit({"type": "token", "channel": "thought", "text": thought})
+        if answer:
+            self.emit({"type": "token", "channel": "answer", "text": answer})
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._text.pop(run_id, None)
+        self._last_chunk.pop(run_id, None)
+
+    def on_agent_action(self, action: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self.emit(
+            {
+                "type": "action",
+                "tool": action.tool,
+                "input": action.tool_input,
+                "thought": action.log.split("Action:", 1)[0].strip(),
+            }
+        )
+
+    def _check_cancelled(self) -> None:
+        if self.cancelled.is_set():
+            raise AgentCancelledError("Agent run was cancelled")
+
+
+class TracingHandler(BaseCallbackHandler):
+    """Records an "llm" span with token counts for each model call of a run."""
+
+    def __init__(self):
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(
+        self, serialized: Any, messages: Any, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(
+        self, serialized: Any, prompts: Any, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        usage = {"input_tokens": 0, "output_tokens": 0}
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(generation.message, "usage_metadata", None) or {}
+                for kind in usage:
+                    usage[kind] += metadata.get(kind, 0)
+        LLM_TOKENS.inc(usage["input_tokens"], kind="input")
+        LLM_TOKENS.inc(usage["output_tokens"], kind="output")
+        tracing.record("llm", started, time.perf_counter() - started, **usage)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            seconds = time.perf_counter() - started
+            tracing.record("llm", started, seconds, error=repr(error))
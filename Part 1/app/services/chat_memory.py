@@ -0,0 +1,135 @@
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List
+
+# Phrases that lean on earlier turns; such queries never use the answer cache
+_FOLLOW_UP = re.compile(
+    r"\b(?:it|its|they|them|those|these|same|previous|above|earlier|last one|"
+    r"what about|how about|instead|again|result_\d+)\b",
+    re.IGNORECASE,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) without a tokenizer."""
+    return (len(text) + 3) // 4
+
+
+@dataclass
+class ChatTurn:
+    handle: str
+    query: str
+    answer: str
+    created: float = field(default_factory=time.time)
+
+
+class ChatMemory:
+    """
+    Per-session conversation history for follow-up questions.
+
+    Recent turns are rendered with their answers, older ones are compacted to
+    a single line, and the oldest are dropped to stay within a token budget.
+    Every answer gets a handle (result_1, result_2, ...) under which its full
+    text is available to generated code, so history never has to inline it.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 1500,
+        max_turns: int = 20,
+        recent_turns: int = 2,
+        answer_tokens: int = 200,
+    ):
+        """
+        Initialize the ChatMemory.
+
+        Args:
+            token_budget (int): Upper bound on rendered history tokens
+            max_turns (int): Turns kept per session
+            recent_turns (int): Newest turns rendered with their answer
+            answer_tokens (int): Answer tokens shown for a recent turn
+        """
+        self.token_budget = token_budget
+        self.max_turns = max_turns
+        self.recent_turns = recent_turns
+        self.answer_tokens = answer_tokens
+        self._sessions: Dict[str, Deque[ChatTurn]] = defaultdict(
+            lambda: deque(maxlen=self.max_turns)
+        )
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, session_id: str, query: str, answer: str) -> str:
+        """Record a turn and return the handle of its result."""
+        with self._lock:
+            self._counters[session_id] += 1
+            handle = f"result_{self._counters[session_id]}"
+            self._sessions[session_id].append(ChatTurn(handle, query, answer))
+            return handle
+
+    def has_history(self, session_id: str) -> bool:
+        with self._lock:
+            return bool(self._sessions.get(session_id))
+
+    def is_follow_up(self, session_id: str, query: str) -> bool:
+        """Whether query probably depends on earlier turns of the session."""
+        return self.has_history(session_id) and bool(_FOLLOW_UP.search(query))
+
+    def results(self, session_id: str) -> Dict[str, str]:
+        """Full answers of the session's kept turns, keyed by handle."""
+        with self._lock:
+            turns = self._sessions.get(session_id, ())
+            return {turn.handle: turn.answer for turn in turns}
+
+    def render(self, session_id: str) -> str:
+        """Render the session's history within the token budget, newest last."""
+        with self._lock:
+            turns = list(self._sessions.get(session_id, ()))
+        if not turns:
+            return ""
+
+        lines: List[str] = []
+        used = 0
+        for age, turn in enumerate(reversed(turns)):
+            if age < self.recent_turns:
+                answer = self._truncate(turn.answer, self.answer_tokens)
+                text = f"Human: {turn.query}\nAI ({turn.handle}): {answer}"
+            else:
+                first_line = turn.answer.strip().strip("`").strip().split("\n")[0]
+                text = (
+                    f"Human: {turn.query}\n"
+                    f"AI ({turn.handle}): {self._truncate(first_line, 20)}"
+                )
+            cost = estimate_tokens(text)
+            if used + cost > self.token_budget:
+                lines.append(f"({len(turns) - age} earlier turns omitted)")
+                break
+            lines.append(text)
+            used += cost
+
+        lines.reverse()
+        lines.append(
+            "Full answers are in the python dict `results`, keyed by the handle "
+            "shown after AI, e.g. results['result_1']."
+        )
+        return "\n".join(lines)
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._counters.pop(session_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "turns": sum(len(turns) for turns in self._sessions.values()),
+            }
+
+    @staticmethod
+    def _truncate(text: str, tokens: int) -> str:
+        limit = tokens * 4
+        return text if len(text) <= limit else text[:limit].rstrip() + " ..."
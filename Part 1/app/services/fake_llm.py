@@ -0,0 +1,136 @@
+import re
+import json
+import time
+import asyncio
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeReActChatModel(BaseChatModel):
+    """
+    A local chat model that plays a two-step ReAct transcript: one python_repl
+    call running `code`, then a final answer echoing the tool output.
+    Used to exercise the agent path offline with a simulated latency.
+    """
+
+    code: str = "print(df.head(10).to_string())"
+    tool_name: str = "python_repl"
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-react"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._with_usage(messages, self._respond(messages))
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._with_usage(messages, self._respond(messages))
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        if self.latency:
+            time.sleep(self.latency)
+        text = self._respond(messages).generations[0].message.content
+        # Word-sized chunks, keeping whitespace, like a streaming API
+        for token in re.findall(r"\s*\S+", text):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        # Streaming APIs report usage with the last chunk
+        usage = self._usage(messages, text)
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage))
+
+    @staticmethod
+    def _usage(messages: List[BaseMessage], text: str) -> Dict[str, int]:
+        """Token counts estimated at about four characters per token."""
+        input_tokens = sum(len(str(message.content)) for message in messages) // 4
+        output_tokens = len(text) // 4
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def _with_usage(self, messages: List[BaseMessage], result: ChatResult) -> ChatResult:
+        message = result.generations[0].message
+        message.usage_metadata = self._usage(messages, str(message.content))
+        return result
+
+    def _respond(self, messages: List[BaseMessage]) -> ChatResult:
+        # Everything after "New input:" is the query plus the agent scratchpad
+        scratchpad = str(messages[-1].content).split("New input:")[-1]
+        if "Observation:" not in scratchpad:
+            text = (
+                "Thought: Do I need to use a tool? Yes\n"
+                f"Action: {self.tool_name}\n"
+                f"Action Input: {self.code}"
+            )
+        else:
+            observation = scratchpad.rsplit("Observation:", 1)[-1]
+            # Keep only the code's stdout from the python_repl tool message
+            observation = observation.split("Stdout:", 1)[-1]
+            observation = observation.split("If you have completed", 1)[0].strip()
+            text = (
+                "Thought: Do I need to use a tool? No\n"
+                f"Final Answer: {observation}"
+            )
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+class ReplayChatModel(FakeReActChatModel):
+    """
+    A local chat model that plays recorded ReAct transcripts. Each transcript
+    is {"match": regex, "responses": [...]}: the first transcript whose regex
+    matches the new input answers, with responses[n] for the agent's step n
+    (the number of observations so far; the last response repeats). Inputs
+    no transcript matches get FakeReActChatModel's two-step answer. Steps
+    are read from the prompt, so concurrent agent runs replay independently.
+    """
+
+    transcripts: List[Dict[str, Any]] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs: Any) -> "ReplayChatModel":
+        """Load transcripts from a JSON file holding a list of them."""
+        with open(path, encoding="utf-8") as f:
+            return cls(transcripts=json.load(f), **kwargs)
+
+    def _respond(self, messages: List[BaseMessage]) -> ChatResult:
+        scratchpad = str(messages[-1].content).split("New input:")[-1]
+        for transcript in self.transcripts:
+            if re.search(transcript["match"], scratchpad, re.IGNORECASE):
+                responses = transcript["responses"]
+                step = min(scratchpad.count("Observation:"), len(responses) - 1)
+                message = AIMessage(content=responses[step])
+                return ChatResult(generations=[ChatGeneration(message=message)])
+        return super()._respond(messages)
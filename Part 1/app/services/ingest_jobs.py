@@ -0,0 +1,584 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from uuid import uuid4
+
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+from core.append_processor import AppendProcessor
+from core.data_processor import create_data_processor, hash_rows
+from core.meta_data import MetadataExtractor
+from core.column_index import ColumnIndex
+from core.excel_reader import sheet_names, table_slugs
+from core.metrics import INGEST_STAGE_SECONDS
+from utils.file_handler import FileHandler
+
+# Set in pool worker processes by _init_worker
+_progress_queue = None
+
+
+def _init_worker(progress_queue) -> None:
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def _warm_worker() -> None:
+    """No-op task; the worker has imported the cleaning stack by the time it runs."""
+
+
+def ingest_file(
+    job_id: str,
+    digest: str,
+    file_path: str,
+    file_type: str,
+    base: Optional[str] = None,
+) -> str:
+    """
+    Clean an upload into OUTPUT_DIR. Runs in a pool worker process.
+
+    Every sheet of an .xlsx workbook becomes its own table. The first sheet
+    that cleans is stored under the digest like a CSV upload, so it is what
+    a query gets by default; the others are stored under "{digest}.{table}"
+    and listed in the "tables" entry of the digest's sidecar.
+
+    With a base, the upload holds rows appended to the dataset stored under
+    base, and only those rows are cleaned (see _append_rows).
+
+    Returns:
+        str: Path of the cleaned artifact of the default table
+    """
+
+    def report(stage: str, rows: int = 0) -> None:
+        if _progress_queue is not None:
+            _progress_queue.put((job_id, stage, rows))
+
+    report("running")
+    if base is not None:
+        return _append_rows(digest, base, file_path, file_type, report)
+    if file_type != "xlsx":
+        return _clean_table(digest, file_path, file_type, report)
+
+    sheets = sheet_names(file_path, settings.EXCEL_ENGINE)
+    tables = []
+    for sheet, table in zip(sheets, table_slugs(sheets)):
+        key = f"{digest}.{table}" if tables else digest
+        try:
+            _clean_table(key, file_path, file_type, report, sheet)
+        except ValueError as e:
+            # Empty and unparseable sheets are left out; other tables still load
+            logging.getLogger(__name__).warning(f"Skipping sheet {sheet!r}: {e}")
+            continue
+        tables.append({"name": sheet, "table": table, "key": key})
+    if not tables:
+        raise ValueError("No sheet of the workbook could be processed")
+
+    output_path = _output_paths(digest)[0]
+    for path in _output_paths(digest):
+        FileHandler.write_sidecar(path, {"tables": tables})
+    return output_path
+
+
+def _output_paths(key: str) -> List[str]:
+    """Cleaned artifact paths for a dataset key, the preferred format first."""
+    paths = [os.path.join(settings.OUTPUT_DIR, f"{key}.{settings.OUTPUT_FORMAT}")]
+    if settings.OUTPUT_FORMAT != "csv" and settings.KEEP_CSV_OUTPUT:
+        paths.append(os.path.join(settings.OUTPUT_DIR, f"{key}.csv"))
+    return paths
+
+
+def _clean_table(
+    key: str,
+    file_path: str,
+    file_type: str,
+    report: Callable[[str, int], None],
+    sheet_name: Optional[str] = None,
+) -> str:
+    """Clean one table of an upload into the artifacts for key."""
+    output_path, *extra_output_paths = _output_paths(key)
+
+    # Detect once at upload; later reads use the persisted sidecar
+    encoding = FileHandler.get_encoding(file_path) if file_type == "csv" else "utf-8"
+
+    # Excel has no faster in-memory reader, so workbooks always stream
+    streaming = file_type == "xlsx" or (
+        file_type == "csv"
+        and os.path.getsize(file_path) >= settings.STREAMING_INGEST_MIN_BYTES
+    )
+    data_processor = create_data_processor(
+        settings.CLEANING_ENGINE,
+        settings.CSV_ENGINE,
+        chunk_size=settings.INGEST_CHUNK_ROWS if streaming else None,
+        optimize_dtypes=settings.OPTIMIZE_DTYPES,
+        excel_engine=settings.EXCEL_ENGINE,
+    )
+    data_processor.progress_callback = report
+    df = data_processor.clean_and_process_file(
+        file_path=file_path,
+        output_path=output_path,
+        encoding=encoding,
+        extra_output_paths=extra_output_paths,
+        sheet_name=sheet_name,
+    )
+    if df is None:
+        raise ValueError("File could not be processed")
+
+    # Appending rows later needs the dedup state and the sums behind the means
+    sidecar: Dict[str, Any] = {"column_sums": data_processor.column_sums}
+    if data_processor.row_hashes is not None:
+        np.save(
+            FileHandler.row_hashes_path(settings.OUTPUT_DIR, key),
+            np.sort(data_processor.row_hashes),
+        )
+    if data_processor.memory_report is not None:
+        # CSV outputs don't keep dtypes; reloads apply them from the sidecar
+        sidecar["dtypes"] = data_processor.memory_report.pop("dtypes")
+        sidecar["memory"] = data_processor.memory_report
+    if streaming:
+        # Merged from the written chunks; distinct counts are estimates
+        sidecar["profile"] = data_processor.profile
+    else:
+        # Profile while the cleaned frame is in memory
+        report("profiling", len(df))
+        sidecar["profile"] = MetadataExtractor().profile(df)
+    if sidecar["profile"] is not None:
+        sidecar["column_index"] = ColumnIndex.build(sidecar["profile"]).to_dict()
+    _write_sidecars([output_path, *extra_output_paths], sidecar)
+
+    return output_path
+
+
+def _write_sidecars(paths: List[str], sidecar: Dict[str, Any]) -> None:
+    for path in paths:
+        updates = dict(sidecar)
+        if path.endswith(".csv"):
+            updates["encoding"] = "utf-8"
+        FileHandler.write_sidecar(path, updates)
+
+
+def _append_rows(
+    key: str,
+    base: str,
+    file_path: str,
+    file_type: str,
+    report: Callable[[str, int], None],
+) -> str:
+    """
+    Clean rows appended to the dataset stored under base into a new part
+    stored under key, leaving base's artifacts untouched.
+
+    The part's sidecar lists every part of the grown dataset ("parts"), so
+    reads concatenate them, and carries the updated dedup state, column sums
+    and profile. Appended rows are loaded in memory; they are expected to be
+    a small delta such as a weekly update.
+
+    Returns:
+        str: Path of the cleaned artifact of the new part
+    """
+    base_path, base_type = FileHandler.find_output(settings.OUTPUT_DIR, base)
+    base_sidecar = FileHandler.read_sidecar(base_path)
+    parts = base_sidecar.get("parts") or [base]
+    first_path = os.path.join(settings.OUTPUT_DIR, f"{parts[0]}.{base_type}")
+
+    # Older artifacts have no saved state; rebuild it from the cleaned rows.
+    # That misses duplicates of rows that had values imputed, and counts
+    # imputed values towards the means
+    base_df = None
+
+    def load_base() -> pd.DataFrame:
+        nonlocal base_df
+        if base_df is None:
+            report("loading", 0)
+            base_df = FileHandler.read_dataframe(base_path, base_type)
+        return base_df
+
+    seen = []
+    for part in parts:
+        hashes_path = FileHandler.row_hashes_path(settings.OUTPUT_DIR, part)
+        if not os.path.exists(hashes_path):
+            seen = [hash_rows(load_base())]
+            break
+        seen.append(np.load(hashes_path))
+    column_sums = base_sidecar.get("column_sums")
+    if column_sums is None:
+        numeric = load_base().select_dtypes(include="number")
+        column_sums = {
+            col: {"count": int(numeric[col].count()), "sum": float(numeric[col].sum())}
+            for col in numeric.columns
+        }
+
+    data_processor = AppendProcessor(
+        FileHandler.read_schema(first_path, base_type),
+        np.concatenate(seen),
+        column_sums,
+        csv_engine=settings.CSV_ENGINE,
+    )
+    encoding = FileHandler.get_encoding(file_path) if file_type == "csv" else "utf-8"
+    report("reading", 0)
+    df = data_processor._load_file(file_path, encoding, ",")
+    if df is None:
+        raise ValueError("File could not be processed")
+    report("cleaning", len(df))
+    df = data_processor._clean_dataframe(df)
+
+    output_path, *extra_output_paths = _output_paths(key)
+    report("saving", len(df))
+    for path in [output_path, *extra_output_paths]:
+        data_processor._save_file(df, path, file_path)
+    np.save(
+        FileHandler.row_hashes_path(settings.OUTPUT_DIR, key),
+        np.sort(data_processor.row_hashes),
+    )
+
+    report("profiling", len(df))
+    sidecar: Dict[str, Any] = {
+        "parts": [*parts, key],
+        "column_sums": data_processor.column_sums,
+        "append": data_processor.report,
+        # CSV parts don't keep dtypes; reloads apply them from the sidecar
+        "dtypes": {
+            col: str(dtype)
+            for col, dtype in df.dtypes.items()
+            if str(dtype) in ("category", "int8", "int16", "int32")
+        },
+    }
+    profile = base_sidecar.get("profile")
+    if profile is not None:
+        extractor = MetadataExtractor()
+        sidecar["profile"] = extractor.merge_profiles(profile, extractor.profile(df))
+        sidecar["column_index"] = ColumnIndex.build(sidecar["profile"]).to_dict()
+    tables = base_sidecar.get("tables")
+    if tables:
+        # The other sheets of a workbook stay as they were
+        sidecar["tables"] = [dict(tables[0], key=key), *tables[1:]]
+    _write_sidecars([output_path, *extra_output_paths], sidecar)
+    return output_path
+
+
+class IngestQueueFullError(Exception):
+    """Raised when the ingest queue has no room for another job."""
+
+
+@dataclass
+class IngestJob:
+    job_id: str
+    digest: str
+    filename: str
+    file_ids: List[str]
+    status: str = "queued"
+    stage: Optional[str] = None
+    rows: int = 0
+    error: Optional[str] = None
+    memory: Optional[Dict[str, Any]] = None
+    # Row counts of an append: received, duplicates, sparse, invalid, appended
+    append: Optional[Dict[str, int]] = None
+    # Table names of a multi-sheet workbook, the default table first
+    tables: List[str] = field(default_factory=list)
+    # Seconds spent in each stage, measured as progress reports arrive
+    timings: Dict[str, float] = field(default_factory=dict)
+    stage_started_at: Optional[float] = field(default=None, repr=False)
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    future: Optional[Future] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "file_ids": list(self.file_ids),
+            "filename": self.filename,
+            "status": self.status,
+            "stage": self.stage,
+            "rows": self.rows,
+            "error": self.error,
+            "memory": self.memory,
+            "tables": list(self.tables),
+            "append": self.append,
+            "timings": dict(self.timings),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class IngestJobManager:
+    """
+    Runs upload cleaning in a process pool so it never blocks the event loop.
+    Identical uploads in flight share one job; progress reported by workers
+    is collected on a background thread.
+    """
+
+    def __init__(self, max_workers: int, queue_depth: int, history: int = 1000):
+        """
+        Initialize the IngestJobManager.
+
+        Args:
+            max_workers (int): Worker processes in the pool
+            queue_depth (int): Jobs that may wait for a free worker
+            history (int): Finished jobs kept for status lookups
+        """
+        self.max_workers = max_workers
+        self.queue_depth = queue_depth
+        self.history = history
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._jobs: Dict[str, IngestJob] = {}
+        self._active: Dict[str, IngestJob] = {}
+        self._file_jobs: Dict[str, str] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._progress_queue = None
+        self._progress_thread: Optional[threading.Thread] = None
+
+    def submit(
+        self,
+        digest: str,
+        file_path: str,
+        file_type: str,
+        file_id: str,
+        filename: str,
+        on_finish: Callable[[IngestJob], None],
+        base: Optional[str] = None,
+    ) -> IngestJob:
+        """
+        Queue an upload for cleaning, or attach file_id to the job already
+        processing the same digest. With a base, the upload is appended to
+        the dataset stored under base.
+
+        Raises:
+            IngestQueueFullError: If the pool and queue are saturated
+        """
+        with self._lock:
+            job = self._active.get(digest)
+            if job is not None:
+                job.file_ids.append(file_id)
+                self._file_jobs[file_id] = job.job_id
+                return job
+
+            if len(self._active) >= self.max_workers + self.queue_depth:
+                raise IngestQueueFullError(
+                    f"Ingest queue is full ({len(self._active)} jobs pending)"
+                )
+
+            job = IngestJob(
+                job_id=str(uuid4()), digest=digest, filename=filename, file_ids=[file_id]
+            )
+            self._add(job)
+            self._active[digest] = job
+            try:
+                job.future = self._get_executor().submit(
+                    ingest_file, job.job_id, digest, file_path, file_type, base
+                )
+            except BrokenProcessPool:
+                self._reset_executor()
+                job.future = self._get_executor().submit(
+                    ingest_file, job.job_id, digest, file_path, file_type, base
+                )
+
+        job.future.add_done_callback(lambda future: self._finish(job, future, on_finish))
+        return job
+
+    def completed(self, digest: str, file_id: str, filename: str) -> IngestJob:
+        """Record a job for an upload whose artifact already exists."""
+        now = time.time()
+        try:
+            output_path, _ = FileHandler.find_output(settings.OUTPUT_DIR, digest)
+            sidecar = FileHandler.read_sidecar(output_path)
+        except FileNotFoundError:
+            sidecar = {}
+        job = IngestJob(
+            job_id=str(uuid4()),
+            digest=digest,
+            filename=filename,
+            file_ids=[file_id],
+            status="completed",
+            stage="deduplicated",
+            memory=sidecar.get("memory"),
+            tables=[table["table"] for table in sidecar.get("tables", [])],
+            append=sidecar.get("append"),
+            started_at=now,
+            finished_at=now,
+        )
+        with self._lock:
+            self._add(job)
+        return job
+
+    def is_active(self, digest: str) -> bool:
+        """Whether a job is still queued or writing the artifacts of digest."""
+        with self._lock:
+            return digest in self._active
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def detach(self, file_id: str, job: IngestJob) -> None:
+        """Stop routing queries for file_id to job, e.g. a failed append."""
+        with self._lock:
+            if self._file_jobs.get(file_id) == job.job_id:
+                del self._file_jobs[file_id]
+
+    def job_for_file(self, file_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            job_id = self._file_jobs.get(file_id)
+            return self._jobs.get(job_id) if job_id else None
+
+    async def wait_for_file(self, file_id: str, timeout: float) -> None:
+        """
+        Wait until the ingest behind file_id has finished.
+
+        Raises:
+            TimeoutError: If it is still running after timeout seconds
+            ValueError: If the ingest failed
+        """
+        job = self.job_for_file(file_id)
+        if job is None or job.status == "completed":
+            return
+
+        if not job.finished and job.future is not None:
+            try:
+                await asyncio.wait_for(
+                    asyncio.shield(asyncio.wrap_future(job.future)), timeout
+                )
+            except asyncio.TimeoutError:
+                raise TimeoutError(
+                    f"File {file_id} is still being processed (job {job.job_id})"
+                )
+            except Exception:
+                # The failure is recorded on the job by _finish
+                pass
+
+        if job.status == "failed":
+            raise ValueError(f"Ingest failed for file {file_id}: {job.error}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            statuses = [job.status for job in self._active.values()]
+            return {
+                "workers": self.max_workers,
+                "queue_depth": self.queue_depth,
+                "running": statuses.count("running"),
+                "queued": statuses.count("queued"),
+            }
+
+    def warmup(self) -> List[Future]:
+        """
+        Start the worker processes ahead of the first upload.
+
+        Returns:
+            List[Future]: One no-op task per worker, done once picked up
+        """
+        with self._lock:
+            executor = self._get_executor()
+            return [executor.submit(_warm_worker) for _ in range(self.max_workers)]
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._reset_executor()
+
+    def _reset_executor(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._progress_queue is not None:
+            self._progress_queue.put(None)
+            self._progress_queue = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that holds gRPC/HTTP client threads is unsafe
+            context = multiprocessing.get_context("spawn")
+            self._progress_queue = context.Queue()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self._progress_queue,),
+            )
+            self._progress_thread = threading.Thread(
+                target=self._drain_progress, args=(self._progress_queue,), daemon=True
+            )
+            self._progress_thread.start()
+        return self._executor
+
+    def _drain_progress(self, progress_queue) -> None:
+        while True:
+            message = progress_queue.get()
+            if message is None:
+                return
+            job_id, stage, rows = message
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job.finished:
+                    continue
+                if job.started_at is None:
+                    job.started_at = time.time()
+                if stage != job.stage:
+                    self._end_stage(job)
+                    job.stage_started_at = time.monotonic()
+                job.status = "running"
+                job.stage = stage
+                job.rows = rows or job.rows
+
+    def _finish(
+        self, job: IngestJob, future: Future, on_finish: Callable[[IngestJob], None]
+    ) -> None:
+        with self._lock:
+            job.finished_at = time.time()
+            self._end_stage(job)
+            error = future.exception() if not future.cancelled() else None
+            if isinstance(error, BrokenProcessPool):
+                # A worker died (e.g. OOM); start a fresh pool for later jobs
+                self._reset_executor()
+            if future.cancelled() or error is not None:
+                job.status = "failed"
+                job.error = "cancelled" if future.cancelled() else str(error)
+                self.logger.error(f"Ingest job {job.job_id} failed: {job.error}")
+            else:
+                job.status = "completed"
+                job.stage = "completed"
+                sidecar = FileHandler.read_sidecar(future.result())
+                job.memory = sidecar.get("memory")
+                job.tables = [table["table"] for table in sidecar.get("tables", [])]
+                job.append = sidecar.get("append")
+            self._active.pop(job.digest, None)
+            self._prune()
+
+        try:
+            on_finish(job)
+        except Exception as e:
+            self.logger.error(f"Ingest job {job.job_id} completion hook failed: {e}")
+
+    def _end_stage(self, job: IngestJob) -> None:
+        if job.stage is None or job.stage_started_at is None:
+            return
+        seconds = time.monotonic() - job.stage_started_at
+        job.timings[job.stage] = round(job.timings.get(job.stage, 0) + seconds, 4)
+        INGEST_STAGE_SECONDS.observe(seconds, stage=job.stage)
+        job.stage_started_at = None
+
+    def _add(self, job: IngestJob) -> None:
+        self._jobs[job.job_id] = job
+        for file_id in job.file_ids:
+            self._file_jobs[file_id] = job.job_id
+        self._prune()
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs beyond the history limit."""
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished[: max(0, len(finished) - self.history)]:
+            del self._jobs[job.job_id]
+            for file_id in job.file_ids:
+                if self._file_jobs.get(file_id) == job.job_id:
+                    del self._file_jobs[file_id]
@@ -0,0 +1,267 @@
+import re
+import heapq
+import queue
+import random
+import logging
+import itertools
+import threading
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from core import tracing
+
+
+class LLMTimeoutError(TimeoutError):
+    """Raised when a model call produces nothing for longer than its timeout."""
+
+
+# Errors worth retrying: rate limiting, overload and timeouts
+_RETRYABLE = re.compile(
+    r"\b(?:429|500|502|503|504)\b|resource.?exhausted|rate.?limit|quota|"
+    r"unavailable|overloaded|deadline|timed? ?out",
+    re.IGNORECASE,
+)
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return bool(_RETRYABLE.search(f"{type(error).__name__} {error}"))
+
+
+# [priority, model calls made] for the agent run on the current thread
+_agent_run: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar(
+    "agent_run", default=None
+)
+
+
+@contextmanager
+def agent_run(priority: int = 0):
+    """Schedule the model calls made inside the block as one agent run."""
+    token = _agent_run.set([priority, 0])
+    try:
+        yield
+    finally:
+        _agent_run.reset(token)
+
+
+class TokenBucket:
+    """Allows rate calls per second on average, in bursts of up to burst."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token; return 0, or the seconds until one is available."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+def _pump(produce: Callable[[], Iterator], timeout: float) -> Iterator:
+    """
+    Iterate produce() on a helper thread, raising LLMTimeoutError when no
+    item arrives within timeout seconds. A call that times out is abandoned;
+    the client's own timeout ends it.
+    """
+    items: queue.Queue = queue.Queue()
+
+    def run() -> None:
+        try:
+            for item in produce():
+                items.put((True, item))
+            items.put((False, None))
+        except BaseException as e:
+            items.put((False, e))
+
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(run,), daemon=True).start()
+    while True:
+        try:
+            ok, item = items.get(timeout=timeout or None)
+        except queue.Empty:
+            raise LLMTimeoutError(f"Model call timed out after {timeout:g}s")
+        if not ok:
+            if item is not None:
+                raise item
+            return
+        yield item
+
+
+class LLMScheduler:
+    """
+    Admission control for model calls.
+
+    Calls wait in a priority queue and start when the token bucket has a
+    token and fewer than `limit` calls are in flight. The limit adapts by
+    AIMD: it grows by 1/limit after each call faster than target_latency and
+    halves (at most once per second) after a slow call, a rate-limit error
+    or a timeout. Retryable failures are retried with full-jitter backoff.
+
+    Lower priority values are served first. Within a priority, calls from
+    agent runs already under way go before the first call of a new run, so
+    started queries finish instead of every query slowing down together.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 60,
+        burst: int = 10,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        target_latency: float = 20.0,
+        timeout: float = 60.0,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+    ):
+        """
+        Initialize the LLMScheduler.
+
+        Args:
+            requests_per_minute (float): Token bucket rate; 0 disables it
+            burst (int): Calls allowed at once after an idle period
+            max_concurrency (int): Upper bound of the adaptive limit
+            min_concurrency (int): Lower bound of the adaptive limit
+            target_latency (float): Calls slower than this shrink the limit
+            timeout (float): Seconds a call may go without producing output
+            max_retries (int): Retries of a failed call
+            backoff (float): Base of the exponential backoff, in seconds
+            max_backoff (float): Cap of a single backoff
+        """
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.target_latency = target_latency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.limit = float(max_concurrency)
+        self.logger = logging.getLogger(__name__)
+        self._bucket = TokenBucket(requests_per_minute / 60, burst)
+        self._condition = threading.Condition()
+        self._waiting: List[tuple] = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._stats = {
+            "calls": 0,
+            "errors": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "decreases": 0,
+            "latency_total": 0.0,
+        }
+
+    def stream(self, produce: Callable[[], Iterator]) -> Iterator:
+        """
+        Yield the items of produce() once admitted, retrying failures that
+        happen before the first item.
+        """
+        for attempt in itertools.count():
+            self._acquire()
+            started = time.monotonic()
+            error = None
+            yielded = False
+            try:
+                for item in _pump(produce, self.timeout):
+                    yielded = True
+                    yield item
+                return
+            except Exception as e:
+                error = e
+                if yielded or attempt >= self.max_retries or not is_retryable(e):
+                    raise
+            finally:
+                self._release(time.monotonic() - started, error)
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+            self.logger.warning(
+                f"Model call failed ({error!r}), retrying in {delay:.1f}s"
+            )
+            with self._condition:
+                self._stats["retries"] += 1
+            time.sleep(delay)
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """Run fn once admitted, with the same timeout and retries as stream."""
+        for result in self.stream(lambda: iter((fn(),))):
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            stats = dict(self._stats)
+            latency_total = stats.pop("latency_total")
+            mean_latency = latency_total / stats["calls"] if stats["calls"] else 0.0
+            return {
+                **stats,
+                "mean_latency": round(mean_latency, 3),
+                "limit": round(self.limit, 2),
+                "in_flight": self._in_flight,
+                "waiting": len(self._waiting),
+            }
+
+    def _acquire(self) -> None:
+        run = _agent_run.get()
+        priority, calls = run if run is not None else (0, 0)
+        entry = (priority, 0 if calls else 1, next(self._sequence))
+        started = time.perf_counter()
+        with self._condition:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    wait = None
+                    if self._waiting[0] == entry and self._in_flight < int(self.limit):
+                        wait = self._bucket.take()
+                        if not wait:
+                            break
+                    self._condition.wait(wait)
+            except BaseException:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+                raise
+            heapq.heappop(self._waiting)
+            self._in_flight += 1
+            # The next caller in line may be admitted as well
+            self._condition.notify_all()
+        if run is not None:
+            run[1] += 1
+        tracing.record("llm_queue", started, time.perf_counter() - started)
+
+    def _release(self, latency: float, error: Optional[BaseException]) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._stats["calls"] += 1
+            self._stats["latency_total"] += latency
+            if error is not None:
+                self._stats["errors"] += 1
+                if isinstance(error, LLMTimeoutError):
+                    self._stats["timeouts"] += 1
+            # Bad requests and cancellations say nothing about load
+            overloaded = error is not None and is_retryable(error)
+            if overloaded or (error is None and latency > self.target_latency):
+                self._decrease()
+            elif error is None:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < 1.0:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_concurrency, self.limit / 2)
+        self._stats["decreases"] += 1
+        self.logger.info(f"Model concurrency limit lowered to {self.limit:.2f}")
+
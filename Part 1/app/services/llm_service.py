@@ -1,46 +1,343 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_experimental.utilities import PythonREPL
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
 from langchain.agents import create_react_agent, AgentExecutor
 from langchain.prompts import PromptTemplate
-from typing import Annotated
+from typing import Annotated, Any, Callable, Dict, List, Optional
 from langchain_core.tools import tool
+from services.agent_events import AgentEvent, AgentEventHandler, TracingHandler
+from core import tracing
+from services.repl_pool import ReplWorker
+from services.llm_scheduler import LLMScheduler, agent_run
+from services.scheduled_model import ScheduledChatModel
+from services.fake_llm import FakeReActChatModel, ReplayChatModel
+from services.sql_engine import SqlEngine, SqlTable
+from core.meta_data import MetadataExtractor
+
+# PythonREPL swaps the process-wide sys.stdout while code runs, so concurrent
+# agents may overlap on LLM calls but must take turns executing code
+_repl_lock = threading.Lock()
 
 
 class LLMService:
-    def __init__(self, model_name: str):
-        self.llm = ChatGoogleGenerativeAI(
-            model=model_name,
-            temperature=0,
-            max_tokens=None,
-            timeout=None,
-            max_retries=2,
+    def __init__(
+        self,
+        model_name: str,
+        max_concurrency: int = 4,
+        llm=None,
+        verbose: bool = True,
+        scheduler: Optional[LLMScheduler] = None,
+        sql_engine: Optional[SqlEngine] = None,
+        preferred_tool: str = "python",
+    ):
+        """
+        Initialize the LLMService.
+
+        Args:
+            model_name (str): A Gemini model, "fake" for the offline
+                FakeReActChatModel or "replay:<path>" for a ReplayChatModel
+                playing the transcripts in <path>
+            max_concurrency (int): Agent runs executed at once
+            llm: Chat model to use instead of one built from model_name
+            verbose (bool): Log agent steps
+            scheduler (LLMScheduler): Rate limits, timeouts and retries for
+                model calls; None calls the model directly
+            sql_engine (SqlEngine): Runs the agent's sql_query tool; None
+                leaves the agent with the Python REPL only
+            preferred_tool (str): Tool the prompt tells the agent to reach
+                for first, "python" or "sql"
+        """
+        if preferred_tool not in ("python", "sql"):
+            raise ValueError(f"Unknown preferred tool: {preferred_tool}")
+        self.llm = llm or self._create_model(model_name, scheduler)
+        if scheduler is not None:
+            self.llm = ScheduledChatModel(model=self.llm, scheduler=scheduler)
+        self.scheduler = scheduler
+        self.sql_engine = sql_engine
+        self.preferred_tool = preferred_tool
+        self.max_concurrency = max_concurrency
+        self.verbose = verbose
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="agent"
         )
-        self.repl = PythonREPL()
 
-    def setup_agent(self, df, metadata):
-        self.repl.globals["df"] = df
+    async def arun_agent(
+        self,
+        df,
+        metadata,
+        query_input: str,
+        repl=None,
+        on_event: Optional[Callable[[AgentEvent], None]] = None,
+        chat_history: str = "",
+        variables: Optional[Dict[str, Any]] = None,
+        priority: int = 0,
+        sql_tables: Optional[List[SqlTable]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run an agent on a bounded worker thread without blocking the event loop.
+        Cancelling the caller stops the run at its next model or tool call.
+        Model calls of runs with a lower priority are scheduled first.
+        """
+        cancelled = threading.Event()
+        # Copy the context so spans recorded by the agent join the caller's trace
+        future = self._executor.submit(
+            contextvars.copy_context().run,
+            self.run_agent,
+            df,
+            metadata,
+            query_input,
+            repl,
+            on_event,
+            cancelled,
+            chat_history,
+            variables,
+            priority,
+            sql_tables,
+        )
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            cancelled.set()
+            # Callers release the REPL once we return, so wait for the thread
+            if not future.cancelled():
+                done, _ = await asyncio.wait([asyncio.wrap_future(future)])
+                # The run's own error is moot once cancelled; retrieve it so
+                # asyncio doesn't log it as never retrieved
+                for finished in done:
+                    finished.cancelled() or finished.exception()
+            raise
+
+    def run_agent(
+        self,
+        df,
+        metadata,
+        query_input: str,
+        repl=None,
+        on_event: Optional[Callable[[AgentEvent], None]] = None,
+        cancelled: Optional[threading.Event] = None,
+        chat_history: str = "",
+        variables: Optional[Dict[str, Any]] = None,
+        priority: int = 0,
+        sql_tables: Optional[List[SqlTable]] = None,
+    ) -> Dict[str, Any]:
+        agent_executor = self.setup_agent(
+            df, metadata, repl, on_event, variables, sql_tables
+        )
+        handlers = [AgentEventHandler(on_event, cancelled), TracingHandler()]
+        with agent_run(priority), tracing.span("agent") as span:
+            result = agent_executor.invoke(
+                {"input": query_input, "chat_history": chat_history},
+                config={"callbacks": handlers},
+            )
+            span["steps"] = len(result.get("intermediate_steps", []))
+            return result
+
+    def setup_agent(
+        self,
+        df,
+        metadata,
+        repl=None,
+        on_event: Optional[Callable[[AgentEvent], None]] = None,
+        variables: Optional[Dict[str, Any]] = None,
+        sql_tables: Optional[List[SqlTable]] = None,
+    ):
+        """
+        Build an agent whose python_repl tool runs code against df, and whose
+        sql_query tool, if there is a SQL engine, runs SQL over sql_tables.
+
+        Args:
+            df: DataFrame exposed to generated code; unused when repl is given
+            metadata: Dataset metadata
+            repl: A REPL with df already loaded, e.g. a ReplWorker running in
+                its own process. Defaults to an in-process PythonREPL.
+            on_event: Called with a "stdout" event after each code execution
+            variables: Extra names defined for generated code, e.g. earlier results
+            sql_tables: Cleaned artifacts queryable with SQL; "df" is the dataset
+        """
+        repl, repl_lock = self._make_repl(df, repl, variables)
 
         @tool
         def python_repl(
             code: Annotated[str, "The python code to execute to generate your chart."]
         ):
             """Execute python code and return results."""
+            started = time.perf_counter()
+            error = None
             try:
-                result = self.repl.run(code)
+                with repl_lock:
+                    if on_event and isinstance(repl, ReplWorker):
+                        # Workers stream what the code prints while it runs
+                        result = repl.run(
+                            code,
+                            on_output=lambda text: on_event(
+                                {"type": "output", "text": text}
+                            ),
+                        )
+                    else:
+                        result = repl.run(code)
             except BaseException as e:
-                return f"Failed to execute. Error: {repr(e)}"
+                error = repr(e)
+            seconds = time.perf_counter() - started
+            attributes = {"error": error} if error else {}
+            tracing.record("repl", started, seconds, **attributes)
+
+            if error is not None:
+                if on_event:
+                    on_event(
+                        {
+                            "type": "stdout",
+                            "output": "",
+                            "error": error,
+                            "seconds": round(seconds, 3),
+                        }
+                    )
+                return f"Failed to execute. Error: {error}"
+            if on_event:
+                on_event(
+                    {"type": "stdout", "output": result, "seconds": round(seconds, 3)}
+                )
             return (
                 f"Successfully executed:\n```python\n{code}\n```\nStdout: {result}"
                 + "\n\nIf you have completed all tasks, respond with FINAL ANSWER."
             )
 
-        prompt = self._create_base_prompt()
-        agent = create_react_agent(self.llm, [python_repl], prompt)
+        @tool
+        def full_schema(query: Annotated[str, "Ignored; pass an empty string."] = ""):
+            """List every column of the dataset with its profile."""
+            if metadata.get("Profile"):
+                return MetadataExtractor().render_profile(metadata["Profile"])
+            return str(metadata.get("Schema"))
+
+        tools = [python_repl, full_schema]
+        if self.sql_engine is not None and sql_tables:
+            tools.append(self._sql_tool(sql_tables, on_event))
+        prompt = self._create_base_prompt(len(tools) > 2)
+        agent = create_react_agent(self.llm, tools, prompt)
         return AgentExecutor(
-            agent=agent, tools=[python_repl], verbose=True, handle_parsing_errors=True
+            agent=agent,
+            tools=tools,
+            verbose=self.verbose,
+            handle_parsing_errors=True,
+            return_intermediate_steps=True,
         )
 
-    def _create_base_prompt(self) -> PromptTemplate:
+    def _sql_tool(
+        self,
+        sql_tables: List[SqlTable],
+        on_event: Optional[Callable[[AgentEvent], None]] = None,
+    ):
+        engine = self.sql_engine
+
+        @tool
+        def sql_query(query: Annotated[str, "A DuckDB SQL SELECT statement."]):
+            """Run a read-only DuckDB SQL query."""
+            started = time.perf_counter()
+            error = None
+            try:
+                result = engine.run(query, sql_tables)
+            except Exception as e:
+                error = repr(e)
+            seconds = time.perf_counter() - started
+            attributes = {"error": error} if error else {}
+            tracing.record("sql", started, seconds, **attributes)
+
+            if on_event:
+                event = {"type": "stdout", "output": result if error is None else ""}
+                if error is not None:
+                    event["error"] = error
+                on_event({**event, "seconds": round(seconds, 3)})
+            if error is not None:
+                return f"Failed to execute. Error: {error}"
+            return (
+                f"Successfully executed:\n```sql\n{query}\n```\nStdout: {result}"
+                + "\n\nIf you have completed all tasks, respond with FINAL ANSWER."
+            )
+
+        # The tables and their columns are part of the tool's description
+        sql_query.description = (
+            "Run a read-only DuckDB SQL query over these tables and return the"
+            " result rows. Quote names that aren't plain identifiers with double"
+            " quotes.\n" + engine.describe(sql_tables)
+        )
+        return sql_query
+
+    def replay(self, df, code: List[str], repl=None) -> str:
+        """
+        Re-run code from an earlier agent run without calling the LLM.
+
+        Returns:
+            str: Stdout of the last step, formatted like an agent answer
+        """
+        repl, repl_lock = self._make_repl(df, repl)
+        stdout = ""
+        for step in code:
+            with repl_lock:
+                stdout = repl.run(step)
+        return f"```python\n{stdout.strip()}\n```"
+
+    @staticmethod
+    def executed_code(result: Dict[str, Any]) -> List[str]:
+        """
+        Return the code passed to python_repl during an agent run, in order.
+        Runs that used sql_query can't be replayed in a REPL and return none.
+        """
+        code = []
+        for action, _ in result.get("intermediate_steps", []):
+            if getattr(action, "tool", None) == "sql_query":
+                return []
+            if getattr(action, "tool", None) != "python_repl":
+                continue
+            tool_input = action.tool_input
+            code.append(
+                tool_input.get("code", "") if isinstance(tool_input, dict) else tool_input
+            )
+        return code
+
+    @staticmethod
+    def _create_model(model_name: str, scheduler: Optional[LLMScheduler] = None):
+        if model_name == "fake":
+            return FakeReActChatModel()
+        if model_name.startswith("replay:"):
+            return ReplayChatModel.from_file(model_name.split(":", 1)[1])
+        # The Gemini client is the slowest import here; offline models skip it
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        if scheduler is None:
+            return ChatGoogleGenerativeAI(
+                model=model_name,
+                temperature=0,
+                max_tokens=None,
+                timeout=None,
+                max_retries=2,
+            )
+        # The scheduler retries calls itself; the client timeout ends
+        # requests the scheduler has given up on
+        return ChatGoogleGenerativeAI(
+            model=model_name,
+            temperature=0,
+            max_tokens=None,
+            timeout=scheduler.timeout or None,
+            max_retries=0,
+        )
+
+    def _make_repl(self, df, repl=None, variables: Optional[Dict[str, Any]] = None):
+        # Worker processes have their own stdout; only in-process REPLs need the lock
+        if repl is not None:
+            if variables:
+                repl.update_namespace(variables)
+            return repl, nullcontext()
+        from langchain_experimental.utilities import PythonREPL
+
+        # A REPL per agent keeps concurrent queries from sharing globals
+        repl = PythonREPL()
+        repl.globals["df"] = df
+        repl.globals.update(variables or {})
+        return repl, _repl_lock
+
+    def _create_base_prompt(self, sql: bool = False) -> PromptTemplate:
         instructions = """
         You are an agent that writes and executes python code
         You have access to a Python abstract REPL, which you can use to execute the python code.
@@ -49,6 +346,16 @@ class LLMService:
         You might know the answer without running any code, but you should still run the code to get the answer.
         If it does not seem like you can write code to answer the question, just return "I don't know" as the answer.
         Do not create example dataframes
+        Text columns with few distinct values are pandas categoricals, so pass observed=True to groupby
+        """
+        if sql and self.preferred_tool == "sql":
+            instructions += """
+        Prefer the sql_query tool: the dataset is the table df, and filters, group-bys and joins run faster in SQL
+        Use the Python REPL only for what SQL can't express
+        """
+        elif sql:
+            instructions += """
+        The sql_query tool runs SQL over the same dataset (the table df) and the other tables it lists; use it to join them
         """
 
         template = """
@@ -0,0 +1,513 @@
+import io
+import re
+import signal
+import logging
+import threading
+import time
+import multiprocessing
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: no CPU-time limit
+    resource = None
+
+
+class ExecutionLimitError(RuntimeError):
+    """Raised when generated code exceeds its time or memory limit."""
+
+
+@dataclass(frozen=True)
+class ExecutionLimits:
+    """Limits for one code execution in a worker; 0 disables a limit."""
+
+    cpu_seconds: float = 0
+    wall_seconds: float = 0
+    memory_bytes: int = 0
+
+
+class _CpuLimitExceeded(BaseException):
+    # A BaseException so generated code's `except Exception` can't swallow it
+    pass
+
+
+def _on_cpu_limit(signum, frame) -> None:
+    raise _CpuLimitExceeded("CPU time limit exceeded")
+
+
+def _set_cpu_limit(seconds: float) -> None:
+    """Let the worker use seconds more CPU time before SIGXCPU; 0 lifts the limit."""
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = hard
+    if seconds:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _data_bytes() -> Optional[int]:
+    """Size of the process's data segment (VmData); None where unavailable."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmData:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _set_data_limit(memory_bytes: int) -> None:
+    """
+    Let the worker's data segment grow by at most memory_bytes from its
+    current size, so an allocation past the limit fails with MemoryError even
+    between the parent's polls. RLIMIT_AS is not used: it counts every
+    mapping, shared libraries and thread stacks included. The hard limit is
+    lowered too, so generated code can't lift it.
+    """
+    if resource is None or not memory_bytes or not hasattr(resource, "RLIMIT_DATA"):
+        return
+    current = _data_bytes()
+    if current is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_DATA)
+    limit = current + memory_bytes
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+
+
+def _sanitize_input(code: str) -> str:
+    """Strip whitespace and markdown code fences around generated code."""
+    code = re.sub(r"^(\s|`)*(?i:python)?\s*", "", code)
+    return re.sub(r"(\s|`)*$", "", code)
+
+
+class _PipeWriter(io.TextIOBase):
+    """
+    Stdout for code run in a worker. Complete lines are forwarded to the
+    parent as they are printed, batched so a print loop can't flood the pipe.
+    """
+
+    def __init__(self, conn, interval: float = 0.05):
+        self.conn = conn
+        self.interval = interval
+        self._chunks = []
+        self._pending = ""
+        self._last_sent = 0.0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self._chunks.append(text)
+        self._pending += text
+        now = time.monotonic()
+        if "\n" in self._pending and now - self._last_sent >= self.interval:
+            lines, _, self._pending = self._pending.rpartition("\n")
+            self.conn.send(("stdout", lines + "\n"))
+            self._last_sent = now
+        return len(text)
+
+    def flush(self) -> None:
+        if self._pending:
+            self.conn.send(("stdout", self._pending))
+            self._pending = ""
+
+    def getvalue(self) -> str:
+        return "".join(self._chunks)
+
+
+def _worker_main(conn, memory_bytes: int = 0) -> None:
+    """
+    Serve load/run requests over conn. Runs in a REPL worker process.
+
+    The dataset is read by the worker itself, so only file paths and code
+    strings cross the pipe. Each worker holds its own copy of the DataFrame:
+    a full pool costs REPL_POOL_SIZE times the loaded dataset in memory.
+    """
+    from utils.file_handler import FileHandler
+
+    if resource is not None:
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    namespace: Dict[str, Any] = {}
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        command = message[0]
+        if command == "close":
+            return
+        try:
+            if command == "load":
+                _, file_path, file_type = message
+                df = FileHandler.read_dataframe(file_path, file_type)
+                # A new dataset starts a fresh session namespace
+                namespace = {"df": df}
+                # Counted from here, so the dataset isn't charged to the limit
+                _set_data_limit(memory_bytes)
+                conn.send(("ok", len(df)))
+            elif command == "update":
+                namespace.update(message[1])
+                conn.send(("ok", None))
+            elif command == "run":
+                _, code, cpu_seconds = message
+                stdout = _PipeWriter(conn)
+                try:
+                    _set_cpu_limit(cpu_seconds)
+                    with redirect_stdout(stdout):
+                        exec(_sanitize_input(code), namespace)
+                    output = stdout.getvalue()
+                except (Exception, _CpuLimitExceeded, SystemExit) as e:
+                    output = repr(e)
+                finally:
+                    _set_cpu_limit(0)
+                stdout.flush()
+                conn.send(("ok", output))
+            else:
+                conn.send(("error", f"Unknown command: {command}"))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+class ReplWorker:
+    """
+    A Python REPL running in its own process with one dataset loaded as df.
+
+    Each run is bounded by limits: CPU time is enforced inside the worker
+    with RLIMIT_CPU, wall-clock time and anonymous RSS are watched from here.
+    The memory limit is counted on top of the loaded dataset. A run past its
+    wall-clock or memory limit kills the process; the next call starts a
+    fresh one with the same dataset loaded. RLIMIT_DATA backs the memory
+    limit inside the worker, so a single large allocation fails with
+    MemoryError before a poll could notice it.
+    """
+
+    def __init__(
+        self,
+        context,
+        limits: ExecutionLimits = ExecutionLimits(),
+        poll_interval: float = 0.1,
+    ):
+        self.context = context
+        self.limits = limits
+        self.poll_interval = poll_interval
+        self.dataset_key: Optional[str] = None
+        self.logger = logging.getLogger(__name__)
+        self._source: Optional[tuple] = None
+        # Anonymous RSS right after the dataset loaded
+        self._baseline = 0
+        self._lock = threading.Lock()
+        self._start()
+
+    def load(self, dataset_key: str, file_path: str, file_type: str) -> None:
+        """Load the dataset behind file_path as df, resetting the namespace."""
+        # The memory limit can't be raised again once set, so another dataset
+        # is loaded into a fresh process
+        if self._source is not None and self.limits.memory_bytes:
+            self.close()
+            self._start()
+        self._source = (file_path, file_type)
+        self._load_source()
+        self.dataset_key = dataset_key
+
+    def update_namespace(self, variables: Dict[str, Any]) -> None:
+        """Define variables for code run in the worker."""
+        self._request("update", variables)
+
+    def run(self, code: str, on_output: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Execute code in the worker and return its stdout.
+
+        Args:
+            code (str): Python code; may be wrapped in a markdown fence
+            on_output (Callable[[str], None]): Called with stdout lines as
+                the code prints them
+
+        Raises:
+            ExecutionLimitError: If the code ran past the wall-clock or
+                memory limit; the worker is killed and restarted
+        """
+        if not self.alive and self._source is not None:
+            self._restart()
+        return self._request(
+            "run", code, self.limits.cpu_seconds, on_output=on_output, limited=True
+        )
+
+    def rss_bytes(self) -> Optional[int]:
+        """Anonymous resident memory of the worker; None where unavailable."""
+        try:
+            with open(f"/proc/{self.process.pid}/status") as status:
+                for line in status:
+                    # RssAnon leaves out shared libraries and file-backed pages
+                    if line.startswith("RssAnon:"):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def close(self) -> None:
+        # A worker still running code is killed rather than waited for
+        if not self._lock.acquire(blocking=False):
+            self._kill()
+        else:
+            try:
+                self._conn.send(("close",))
+            except (OSError, EOFError):
+                pass
+            finally:
+                self._lock.release()
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
+        self._conn.close()
+
+    @property
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def _start(self) -> None:
+        self._conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_worker_main,
+            args=(child_conn, self.limits.memory_bytes),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def _restart(self) -> None:
+        self._conn.close()
+        self._start()
+        self._load_source()
+
+    def _load_source(self) -> None:
+        self._request("load", *self._source)
+        self._baseline = self.rss_bytes() or 0
+
+    def _kill(self) -> None:
+        self.process.kill()
+        self.process.join(timeout=1)
+
+    def _request(
+        self,
+        *message,
+        on_output: Optional[Callable[[str], None]] = None,
+        limited: bool = False,
+    ):
+        with self._lock:
+            try:
+                self._conn.send(message)
+                started = time.monotonic()
+                while True:
+                    if not self._conn.poll(self.poll_interval):
+                        if limited:
+                            self._check_limits(started)
+                        continue
+                    status, value = self._conn.recv()
+                    if status != "stdout":
+                        break
+                    if on_output is not None:
+                        on_output(value)
+            except (OSError, EOFError):
+                raise RuntimeError("REPL worker exited unexpectedly")
+        if status != "ok":
+            raise RuntimeError(value)
+        return value
+
+    def _check_limits(self, started: float) -> None:
+        elapsed = time.monotonic() - started
+        if self.limits.wall_seconds and elapsed > self.limits.wall_seconds:
+            reason = f"ran for more than {self.limits.wall_seconds:g}s"
+        elif self.limits.memory_bytes and (
+            (self.rss_bytes() or 0) - self._baseline > self.limits.memory_bytes
+        ):
+            reason = f"used more than {self.limits.memory_bytes // 2**20} MB of memory"
+        else:
+            return
+        self.logger.warning(f"Killing REPL worker {self.process.pid}: code {reason}")
+        self._kill()
+        raise ExecutionLimitError(
+            f"Code {reason} and was stopped; variables defined earlier were lost"
+        )
+
+
+@dataclass
+class _Session:
+    worker: ReplWorker
+    last_used: float = field(default_factory=time.time)
+    busy: bool = False
+
+
+class ReplPool:
+    """
+    A bounded pool of REPL worker processes keyed by chat session.
+
+    A session keeps its worker, and so its loaded DataFrame and any variables
+    defined by earlier code, across follow-up questions. Sessions idle for
+    longer than idle_seconds are closed by a background reaper; when the pool
+    is full the least recently used idle session gives up its worker.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        idle_seconds: float,
+        limits: ExecutionLimits = ExecutionLimits(),
+    ):
+        """
+        Initialize the ReplPool.
+
+        Args:
+            max_workers (int): Maximum number of live worker processes
+            idle_seconds (float): Close sessions unused for this long
+            limits (ExecutionLimits): Time and memory limits per code execution
+        """
+        self.max_workers = max_workers
+        self.idle_seconds = idle_seconds
+        self.limits = limits
+        self.logger = logging.getLogger(__name__)
+        # spawn: forking a process that holds gRPC/HTTP client threads is unsafe
+        self._context = multiprocessing.get_context("spawn")
+        self._sessions: Dict[str, _Session] = {}
+        self._condition = threading.Condition()
+        self._reaper: Optional[threading.Thread] = None
+        self._closed = False
+        self.started = 0
+        self.reused = 0
+        self.evictions = 0
+
+    def acquire(
+        self,
+        session_id: str,
+        dataset_key: str,
+        file_path: str,
+        file_type: str,
+        timeout: Optional[float] = None,
+    ) -> ReplWorker:
+        """
+        Reserve the session's worker, starting one if needed, with dataset_key
+        loaded. Blocks while the session is busy or the pool is full.
+
+        Raises:
+            TimeoutError: If no worker became available within timeout seconds
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._start_reaper()
+            while True:
+                session = self._sessions.get(session_id)
+                if session is not None and not session.busy:
+                    break
+                if session is None and self._make_room():
+                    session = _Session(worker=ReplWorker(self._context, self.limits))
+                    self._sessions[session_id] = session
+                    self.started += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No REPL worker available")
+                self._condition.wait(remaining)
+            session.busy = True
+
+        try:
+            worker = session.worker
+            if not worker.alive:
+                worker = session.worker = ReplWorker(self._context, self.limits)
+            if worker.dataset_key == dataset_key:
+                self.reused += 1
+            else:
+                worker.load(dataset_key, file_path, file_type)
+            return worker
+        except Exception:
+            self.close_session(session_id, force=True)
+            raise
+
+    def release(self, session_id: str) -> None:
+        """Return the session's worker to the pool for later follow-ups."""
+        with self._condition:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.busy = False
+                session.last_used = time.time()
+            self._condition.notify_all()
+
+    def close_session(self, session_id: str, force: bool = False) -> bool:
+        """Stop the session's worker, unless it is busy and force is not set."""
+        with self._condition:
+            session = self._sessions.get(session_id)
+            if session is None or (session.busy and not force):
+                return False
+            del self._sessions[session_id]
+            self._condition.notify_all()
+        session.worker.close()
+        return True
+
+    def evict_idle(self) -> int:
+        """Close sessions idle for longer than idle_seconds."""
+        cutoff = time.time() - self.idle_seconds
+        with self._condition:
+            idle = [
+                session_id
+                for session_id, session in self._sessions.items()
+                if not session.busy and session.last_used < cutoff
+            ]
+        evicted = [session_id for session_id in idle if self.close_session(session_id)]
+        self.evictions += len(evicted)
+        return len(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "workers": len(self._sessions),
+                "busy": sum(session.busy for session in self._sessions.values()),
+                "max_workers": self.max_workers,
+                "started": self.started,
+                "reused": self.reused,
+                "evictions": self.evictions,
+            }
+
+    def shutdown(self) -> None:
+        with self._condition:
+            self._closed = True
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._condition.notify_all()
+        for session in sessions:
+            session.worker.close()
+
+    def _make_room(self) -> bool:
+        """Free a slot by closing the least recently used idle session."""
+        if len(self._sessions) < self.max_workers:
+            return True
+        idle = [
+            (session.last_used, session_id)
+            for session_id, session in self._sessions.items()
+            if not session.busy
+        ]
+        if not idle:
+            return False
+        _, session_id = min(idle)
+        session = self._sessions.pop(session_id)
+        session.worker.close()
+        self.evictions += 1
+        self.logger.debug(f"Evicted REPL worker for session {session_id}")
+        return True
+
+    def _start_reaper(self) -> None:
+        if self._reaper is None and self.idle_seconds > 0:
+            self._reaper = threading.Thread(target=self._reap, daemon=True)
+            self._reaper.start()
+
+    def _reap(self) -> None:
+        interval = max(1.0, self.idle_seconds / 2)
+        while not self._closed:
+            time.sleep(interval)
+            self.evict_idle()
@@ -0,0 +1,42 @@
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+
+class ScheduledChatModel(BaseChatModel):
+    """A chat model whose calls to model go through scheduler."""
+
+    model: Any
+    scheduler: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return f"scheduled-{self.model._llm_type}"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return self.scheduler.call(
+            lambda: self.model._generate(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            )
+        )
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        yield from self.scheduler.stream(
+            lambda: self.model._stream(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            )
+        )
@@ -0,0 +1,136 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import pandas as pd
+
+# pyarrow dataset formats of the cleaned artifact types
+_DATASET_FORMATS = {"feather": "ipc", "parquet": "parquet", "csv": "csv"}
+
+
+class SqlTimeoutError(TimeoutError):
+    """Raised when a SQL query runs longer than the engine's timeout."""
+
+
+@dataclass(frozen=True)
+class SqlTable:
+    """A cleaned dataset exposed to SQL under name; appended datasets have several parts."""
+
+    name: str
+    paths: Sequence[str]
+    file_type: str
+    source: str = ""
+
+
+class SqlEngine:
+    """
+    Read-only DuckDB SQL over cleaned artifacts.
+
+    Every run opens its own in-memory DuckDB database and registers each
+    part as a pyarrow dataset, so files are scanned in place, without
+    loading them into pandas, by DuckDB's multi-threaded vectorized
+    execution, and column projections and filters are pushed down into the
+    scans. A table
+    with several parts is a UNION ALL BY NAME view over them. File access,
+    extension loading and configuration changes are locked once the tables
+    are registered, so generated SQL can only read those tables.
+    """
+
+    def __init__(
+        self,
+        threads: int = 0,
+        memory_limit: str = "1GB",
+        timeout: float = 30.0,
+        max_rows: int = 50,
+    ):
+        """
+        Initialize the SqlEngine.
+
+        Args:
+            threads (int): Threads per query; 0 lets DuckDB use every core
+            memory_limit (str): DuckDB memory limit per query, e.g. "1GB"
+            timeout (float): Seconds a query may run before it is interrupted
+            max_rows (int): Result rows returned to the agent
+        """
+        self.threads = threads
+        self.memory_limit = memory_limit
+        self.timeout = timeout
+        self.max_rows = max_rows
+        self.logger = logging.getLogger(__name__)
+
+    def run(self, sql: str, tables: List[SqlTable]) -> str:
+        """
+        Run sql over tables and render its result as text.
+
+        Raises:
+            SqlTimeoutError: If the query runs longer than the timeout
+        """
+        import duckdb
+
+        connection = self._connect(tables)
+        timer = threading.Timer(self.timeout, connection.interrupt) if self.timeout else None
+        try:
+            if timer is not None:
+                timer.start()
+            cursor = connection.execute(sql)
+            if cursor.description is None:
+                return "OK"
+            columns = [column[0] for column in cursor.description]
+            rows = cursor.fetchmany(self.max_rows + 1)
+        except duckdb.InterruptException:
+            raise SqlTimeoutError(f"SQL query timed out after {self.timeout:g}s")
+        finally:
+            if timer is not None:
+                timer.cancel()
+            connection.close()
+
+        result = pd.DataFrame(rows[: self.max_rows], columns=columns)
+        text = result.to_string(index=False) if len(result) else "(no rows)"
+        if len(rows) > self.max_rows:
+            text += f"\n... (first {self.max_rows} rows shown; aggregate or add LIMIT)"
+        return text
+
+    def describe(self, tables: List[SqlTable]) -> str:
+        """One line per table with its columns and SQL types, for the prompt."""
+        connection = self._connect(tables)
+        try:
+            lines = []
+            for table in tables:
+                columns = connection.execute(f'DESCRIBE "{table.name}"').fetchall()
+                listing = ", ".join(f"{name} {type_}" for name, type_, *_ in columns)
+                source = f" (from {table.source})" if table.source else ""
+                lines.append(f"{table.name}{source}: {listing}")
+            return "\n".join(lines)
+        finally:
+            connection.close()
+
+    def _connect(self, tables: List[SqlTable]):
+        import duckdb
+        import pyarrow.dataset as ds
+
+        config = {"memory_limit": self.memory_limit}
+        if self.threads:
+            config["threads"] = self.threads
+        connection = duckdb.connect(config=config)
+        try:
+            for table in tables:
+                parts = []
+                for i, path in enumerate(table.paths):
+                    part = f"__{table.name}_{i}"
+                    dataset = ds.dataset(path, format=_DATASET_FORMATS[table.file_type])
+                    connection.register(part, dataset)
+                    parts.append(f'SELECT * FROM "{part}"')
+                connection.execute(
+                    f'CREATE TEMP VIEW "{table.name}" AS '
+                    + " UNION ALL BY NAME ".join(parts)
+                )
+            connection.execute("SET enable_external_access = false")
+            connection.execute("SET autoinstall_known_extensions = false")
+            connection.execute("SET autoload_known_extensions = false")
+            connection.execute("SET lock_configuration = true")
+        except BaseException:
+            connection.close()
+            raise
+        return connection
+
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Tests import modules the way the app does, from the app directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def messy_csv(tmp_path) -> str:
+    """
+    A CSV with what cleaning has to handle: duplicate rows, sparse rows,
+    missing numbers, numbers stored as text and a free-text column.
+    """
+    rng = np.random.default_rng(0)
+    rows = 3000
+    df = pd.DataFrame(
+        {
+            "Player Name": [f"player {i}" for i in range(rows)],
+            "Age": rng.integers(16, 40, rows).astype(float),
+            "Wage": (rng.random(rows) * 1000).round(2),
+            "Club": rng.choice(["Arsenal", "Barcelona", "Inter"], rows),
+            "Height": rng.normal(180, 7, rows).round(1).astype(str),
+            "Notes": rng.choice(["fast", "tall", "left footed", ""], rows),
+        }
+    )
+    df.loc[rng.choice(rows, 200, replace=False), "Age"] = np.nan
+    df.loc[rng.choice(rows, 100, replace=False), "Height"] = "n/a"
+    df.loc[rng.choice(rows, 50, replace=False), ["Age", "Wage", "Club", "Height"]] = np.nan
+    df = pd.concat([df, df.sample(300, random_state=0)], ignore_index=True)
+    path = tmp_path / "messy.csv"
+    df.to_csv(path, index=False)
+    return str(path)
@@ -0,0 +1,80 @@
+import threading
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from services.agent_events import AgentCancelledError, AgentEventHandler
+
+
+def stream(handler: AgentEventHandler, tokens, chunk=None) -> None:
+    run_id = uuid4()
+    for token in tokens:
+        handler.on_llm_new_token(token, chunk=chunk, run_id=run_id)
+    handler.on_llm_end(None, run_id=run_id)
+
+
+def test_tokens_after_the_final_answer_marker_go_to_the_answer_channel():
+    events = []
+    handler = AgentEventHandler(events.append)
+
+    stream(handler, ["I know it.\nFinal ", "Answer: 4", "2"])
+
+    assert events == [
+        {"type": "token", "channel": "thought", "text": "I know it.\nFinal "},
+        {"type": "token", "channel": "thought", "text": "Answer:"},
+        {"type": "token", "channel": "answer", "text": " 4"},
+        {"type": "token", "channel": "answer", "text": "2"},
+    ]
+
+
+def test_a_token_spanning_the_marker_is_split_between_channels():
+    events = []
+    handler = AgentEventHandler(events.append)
+
+    stream(handler, ["done. Final Answer: yes"])
+
+    assert [(e["channel"], e["text"]) for e in events] == [
+        ("thought", "done. Final Answer:"),
+        ("answer", " yes"),
+    ]
+
+
+def test_a_chunk_reported_twice_is_emitted_once():
+    events = []
+    handler = AgentEventHandler(events.append)
+    chunk = object()
+
+    stream(handler, ["Thought", "Thought"], chunk=chunk)
+
+    assert len(events) == 1
+
+
+def test_agent_action_carries_the_thought_before_the_action():
+    events = []
+    handler = AgentEventHandler(events.append)
+    action = SimpleNamespace(
+        tool="python_repl_ast",
+        tool_input="df.shape",
+        log="I should look at the shape.\nAction: python_repl_ast",
+    )
+
+    handler.on_agent_action(action, run_id=uuid4())
+
+    assert events == [
+        {
+            "type": "action",
+            "tool": "python_repl_ast",
+            "input": "df.shape",
+            "thought": "I should look at the shape.",
+        }
+    ]
+
+
+def test_cancelled_run_stops_at_the_next_token():
+    cancelled = threading.Event()
+    handler = AgentEventHandler(cancelled=cancelled)
+    cancelled.set()
+
+    with pytest.raises(AgentCancelledError):
+        handler.on_llm_new_token("x", run_id=uuid4())
@@ -0,0 +1,101 @@
+import pytest
+
+from core import answer_cache
+from core.answer_cache import AnswerCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(answer_cache.time, "time", clock)
+    return clock
+
+
+def make_cache(tmp_path, ttl_seconds: float = 0, max_entries: int = 10) -> AnswerCache:
+    return AnswerCache(str(tmp_path / "answers.sqlite3"), ttl_seconds, max_entries)
+
+
+def test_hit_after_put(tmp_path, clock):
+    cache = make_cache(tmp_path)
+    cache.put("d", "Top 5 players by wage?", "answer", ["print(1)"], 2)
+
+    hit = cache.get("d", "  top 5 players  by WAGE ")
+
+    assert hit.answer == "answer"
+    assert hit.code == ["print(1)"]
+    assert cache.stats()["llm_calls_saved"] == 2
+    assert cache.get("other", "top 5 players by wage") is None
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl_seconds=60)
+    cache.put("d", "q", "answer", [], 1)
+
+    clock.now += 59
+    assert cache.get("d", "q") is not None
+
+    clock.now += 2
+    assert cache.get("d", "q") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_entries_are_dropped_on_put(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl_seconds=60)
+    cache.put("d", "old", "answer", [], 1)
+
+    clock.now += 61
+    cache.put("d", "new", "answer", [], 1)
+
+    assert cache.stats()["entries"] == 1
+
+
+def test_zero_ttl_never_expires(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl_seconds=0)
+    cache.put("d", "q", "answer", [], 1)
+
+    clock.now += 10 * 365 * 86400
+
+    assert cache.get("d", "q") is not None
+
+
+def test_least_recently_used_are_evicted(tmp_path, clock):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.put("d", "first", "1", [], 1)
+    clock.now += 1
+    cache.put("d", "second", "2", [], 1)
+    clock.now += 1
+    # Reading "first" makes "second" the least recently used
+    cache.get("d", "first")
+    clock.now += 1
+    cache.put("d", "third", "3", [], 1)
+
+    assert cache.get("d", "second") is None
+    assert cache.get("d", "first") is not None
+    assert cache.get("d", "third") is not None
+
+
+def test_invalidate_drops_dataset_and_its_tables(tmp_path, clock):
+    cache = make_cache(tmp_path)
+    cache.put("abc", "q", "1", [], 1)
+    cache.put("abc.sheet2", "q", "2", [], 1)
+    cache.put("abcd", "q", "3", [], 1)
+
+    cache.invalidate("abc")
+
+    assert cache.get("abc", "q") is None
+    assert cache.get("abc.sheet2", "q") is None
+    assert cache.get("abcd", "q") is not None
+
+
+def test_entries_persist_across_instances(tmp_path, clock):
+    make_cache(tmp_path).put("d", "q", "answer", [], 1)
+
+    assert make_cache(tmp_path).get("d", "q").answer == "answer"
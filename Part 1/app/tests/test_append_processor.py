@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.append_processor import AppendProcessor
+from core.data_processor import VectorizedDataProcessor
+
+
+@pytest.fixture
+def base(tmp_path):
+    """A cleaned dataset and the state its ingest left behind."""
+    path = tmp_path / "base.csv"
+    path.write_text(
+        "player_name,team,runs,avg\n"
+        "a,x,10,1.0\n"
+        "b,y,30,\n"
+        "b,y,30,\n"
+        "c,x,20,3.0\n"
+    )
+    processor = VectorizedDataProcessor()
+    df = processor.clean_and_process_file(str(path), str(tmp_path / "out.csv"))
+    return df, processor
+
+
+def append(base, rows: pd.DataFrame):
+    df, processor = base
+    appender = AppendProcessor(
+        df.head(0), np.sort(processor.row_hashes), processor.column_sums
+    )
+    return appender, appender._clean_dataframe(rows)
+
+
+def test_rows_seen_before_or_repeated_are_dropped(base):
+    rows = pd.DataFrame(
+        {
+            "player_name": ["c", "d", "d"],
+            "team": ["x", "z", "z"],
+            "runs": [20, 50, 50],
+            "avg": [3.0, 4.0, 4.0],
+        }
+    )
+
+    appender, cleaned = append(base, rows)
+
+    assert cleaned["player_name"].tolist() == ["d"]
+    assert appender.report["duplicates"] == 2
+    assert appender.report["rows_appended"] == 1
+    assert len(appender.row_hashes) == 1
+
+
+def test_missing_numbers_take_the_mean_over_every_row_so_far(base):
+    rows = pd.DataFrame(
+        {
+            "player_name": ["d", "e"],
+            "team": ["z", "z"],
+            "runs": [40, 60],
+            "avg": [8.0, None],
+        }
+    )
+
+    appender, cleaned = append(base, rows)
+
+    # Observed avg values: 1.0 and 3.0 at ingest, 8.0 appended
+    assert cleaned["avg"].tolist() == [8.0, 4.0]
+    assert appender.column_sums["avg"] == {"count": 3, "sum": 12.0}
+    assert appender.column_sums["runs"] == {"count": 5, "sum": 160.0}
+
+
+def test_mismatched_columns_are_rejected(base):
+    rows = pd.DataFrame({"player_name": ["d"], "goals": [1]})
+
+    with pytest.raises(ValueError, match="don't match"):
+        append(base, rows)
@@ -0,0 +1,60 @@
+from services.chat_memory import ChatMemory, estimate_tokens
+
+
+def history(memory: ChatMemory, turns: int, answer: str = "a short answer") -> None:
+    for i in range(1, turns + 1):
+        memory.add("s", f"question {i}", f"{answer} {i}")
+
+
+def test_rendered_history_stays_within_the_token_budget():
+    memory = ChatMemory(token_budget=100, answer_tokens=50)
+    history(memory, 10, answer="x" * 400)
+
+    rendered = memory.render("s")
+    turns = rendered.rsplit("\n", 1)[0]
+
+    assert estimate_tokens(turns) <= 100 + estimate_tokens("(10 earlier turns omitted)")
+    assert "earlier turns omitted" in rendered
+    # The newest turn is always the one kept
+    assert "Human: question 10" in rendered
+    assert "Human: question 1\n" not in rendered
+
+
+def test_omitted_count_covers_every_dropped_turn():
+    memory = ChatMemory(token_budget=60, recent_turns=1)
+    history(memory, 6)
+
+    rendered = memory.render("s")
+    kept = rendered.count("Human:")
+
+    assert f"({6 - kept} earlier turns omitted)" in rendered
+
+
+def test_only_recent_turns_keep_their_full_answer():
+    memory = ChatMemory(recent_turns=1)
+    memory.add("s", "first", "line one\nline two")
+    memory.add("s", "second", "line three\nline four")
+
+    rendered = memory.render("s")
+
+    assert "AI (result_1): line one\nHuman: second" in rendered
+    assert "AI (result_2): line three\nline four" in rendered
+
+
+def test_recent_answers_are_truncated_to_answer_tokens():
+    memory = ChatMemory(answer_tokens=5)
+    memory.add("s", "q", "y" * 100)
+
+    rendered = memory.render("s")
+
+    assert "AI (result_1): " + "y" * 20 + " ..." in rendered
+
+
+def test_results_keep_full_answers_by_handle():
+    memory = ChatMemory(max_turns=2)
+    history(memory, 3, answer="z" * 1000)
+
+    results = memory.results("s")
+
+    assert list(results) == ["result_2", "result_3"]
+    assert results["result_3"] == "z" * 1000 + " 3"
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.chunked_processor import ChunkedDataProcessor
+from core.data_processor import VectorizedDataProcessor, create_data_processor
+from core.meta_data import MetadataExtractor
+
+
+def clean(processor, input_path, output_path) -> pd.DataFrame:
+    assert processor.clean_and_process_file(input_path, output_path) is not None
+    return pd.read_csv(output_path)
+
+
+@pytest.mark.parametrize("chunk_size", [7, 250, 100_000])
+def test_chunked_matches_whole_file(messy_csv, tmp_path, chunk_size):
+    expected = clean(VectorizedDataProcessor(), messy_csv, str(tmp_path / "whole.csv"))
+    chunked = ChunkedDataProcessor(chunk_size=chunk_size)
+    result = clean(chunked, messy_csv, str(tmp_path / "chunked.csv"))
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_chunked_row_hashes_are_sorted(messy_csv, tmp_path):
+    chunked = ChunkedDataProcessor(chunk_size=500)
+    clean(chunked, messy_csv, str(tmp_path / "out.csv"))
+
+    hashes = chunked.row_hashes
+    assert (hashes[1:] > hashes[:-1]).all()
+
+
+@pytest.mark.parametrize("extension", ["feather", "parquet"])
+def test_chunked_columnar_output_matches_csv(messy_csv, tmp_path, extension):
+    csv_path = str(tmp_path / "out.csv")
+    columnar_path = str(tmp_path / f"out.{extension}")
+    ChunkedDataProcessor(chunk_size=700).clean_and_process_file(
+        messy_csv, columnar_path, extra_output_paths=[csv_path]
+    )
+
+    reader = pd.read_feather if extension == "feather" else pd.read_parquet
+    # Arrow reads missing text back as None where the CSV reader gives NaN
+    pd.testing.assert_frame_equal(
+        reader(columnar_path).fillna(np.nan), pd.read_csv(csv_path), check_dtype=False
+    )
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        ["messy.csv", "out.csv", f"out.{extension}"]
+    )
+
+
+def test_chunked_profile_matches_the_whole_output(messy_csv, tmp_path):
+    chunked = ChunkedDataProcessor(chunk_size=500)
+    result = clean(chunked, messy_csv, str(tmp_path / "out.csv"))
+    expected = MetadataExtractor().profile(result)
+
+    # Counts, ranges and means merge exactly; distinct counts are estimates
+    profile = chunked.profile
+    assert profile["rows"] == expected["rows"]
+    for col, stats in expected["columns"].items():
+        merged = profile["columns"][col]
+        assert merged["nulls"] == stats["nulls"]
+        for bound in ("min", "max", "mean"):
+            assert merged.get(bound) == pytest.approx(stats.get(bound))
+
+
+def test_streaming_overrides_the_cleaning_engine_with_a_warning(caplog):
+    processor = create_data_processor("legacy", chunk_size=1000)
+
+    assert isinstance(processor, ChunkedDataProcessor)
+    assert "'legacy'" in caplog.text
+
+
+def test_unknown_engine_is_rejected_when_streaming():
+    with pytest.raises(ValueError):
+        create_data_processor("fast", chunk_size=1000)
@@ -0,0 +1,115 @@
+import io
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from utils.content_store import ContentStore
+
+
+def upload(data: bytes):
+    return SimpleNamespace(file=io.BytesIO(data))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ContentStore(
+        str(tmp_path / "files"), str(tmp_path / "outputs"), max_bytes=0
+    )
+
+
+def add(store: ContentStore, file_id: str, data: bytes) -> str:
+    digest, _ = store.save_upload(upload(data), ".csv")
+    store.register(file_id, digest, f"{file_id}.csv")
+    return digest
+
+
+def write_artifact(store: ContentStore, digest: str) -> None:
+    os.makedirs(store.output_dir, exist_ok=True)
+    for name in (f"{digest}.feather", f"{digest}.feather.meta.json"):
+        with open(os.path.join(store.output_dir, name), "w") as f:
+            f.write("x")
+
+
+def test_identical_uploads_share_one_blob(store):
+    first = add(store, "a", b"x,y\n1,2\n")
+    second = add(store, "b", b"x,y\n1,2\n")
+
+    assert first == second
+    assert store.resolve("a") == store.resolve("b") == first
+    assert store.stats()["blobs"] == 1
+    assert [name for name in os.listdir(store.upload_dir) if name.endswith(".csv")] == [
+        f"{first}.csv"
+    ]
+
+
+def test_is_processed_once_artifact_exists(store):
+    digest = add(store, "a", b"x\n1\n")
+    assert not store.is_processed(digest)
+
+    write_artifact(store, digest)
+
+    assert store.is_processed(digest)
+
+
+def test_referenced_blobs_are_not_evicted(store):
+    digest = add(store, "a", b"x\n1\n")
+    add(store, "b", b"x\n1\n")
+    write_artifact(store, digest)
+
+    store.remove("a")
+    assert store.evict() == []
+
+    store.remove("b")
+    assert store.evict() == [digest]
+    assert os.listdir(store.output_dir) == []
+    assert not store.is_processed(digest)
+
+
+def test_eviction_drops_least_recently_used_first(tmp_path):
+    store = ContentStore(str(tmp_path / "files"), str(tmp_path / "outputs"), max_bytes=20)
+    old = add(store, "old", b"0123456789")
+    new = add(store, "new", b"abcdefghij")
+    add(store, "newer", b"ABCDEFGHIJ")
+    # Re-uploading refreshes last use
+    add(store, "again", b"0123456789")
+    for file_id in ("old", "new", "again"):
+        store.remove(file_id)
+
+    assert store.evict() == [new]
+    assert store.stats()["blobs"] == 2
+
+
+def test_appended_parts_keep_their_base(store):
+    base = add(store, "a", b"x\n1\n")
+    digest, _ = store.save_upload(upload(b"x\n2\n"), ".csv", base)
+    store.update("a", digest)
+
+    assert store.evict() == []
+    store.remove("a")
+    assert sorted(store.evict()) == sorted([base, digest])
+
+
+def test_index_survives_restart(store):
+    digest = add(store, "a", b"x\n1\n")
+
+    reopened = ContentStore(store.upload_dir, store.output_dir, max_bytes=0)
+
+    assert reopened.resolve("a") == digest
+    assert reopened.filename("a") == "a.csv"
+
+
+def test_unknown_file_ids_resolve_to_themselves(store):
+    assert store.resolve("legacy-id") == "legacy-id"
+    assert not store.remove("legacy-id")
+
+
+def test_remove_artifacts_keeps_the_blob(store):
+    digest = add(store, "a", b"x\n1\n")
+    write_artifact(store, digest)
+
+    store.remove_artifacts(digest)
+
+    assert not store.is_processed(digest)
+    assert store.stats()["blobs"] == 1
+    assert store.resolve("a") == digest
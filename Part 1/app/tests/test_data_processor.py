@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from core.data_processor import DataProcessor, VectorizedDataProcessor
+
+
+def clean(processor, input_path, output_path) -> pd.DataFrame:
+    assert processor.clean_and_process_file(input_path, output_path) is not None
+    return pd.read_csv(output_path)
+
+
+def test_vectorized_matches_legacy(messy_csv, tmp_path):
+    legacy = clean(DataProcessor(), messy_csv, str(tmp_path / "legacy.csv"))
+    vectorized = clean(VectorizedDataProcessor(), messy_csv, str(tmp_path / "vectorized.csv"))
+
+    pd.testing.assert_frame_equal(vectorized, legacy)
+
+
+def test_vectorized_removes_duplicates_and_imputes(messy_csv, tmp_path):
+    df = clean(VectorizedDataProcessor(), messy_csv, str(tmp_path / "out.csv"))
+
+    assert not df.duplicated().any()
+    assert df["age"].notna().all()
+    assert pd.api.types.is_float_dtype(df["height"])
+
+
+@pytest.mark.parametrize("extension", ["feather", "parquet", "xlsx"])
+def test_outputs_match_csv_and_leave_no_temporary_files(messy_csv, tmp_path, extension):
+    processor = VectorizedDataProcessor()
+    expected = clean(processor, messy_csv, str(tmp_path / "out.csv"))
+    output_path = str(tmp_path / f"out.{extension}")
+    processor.clean_and_process_file(messy_csv, output_path)
+
+    reader = {"feather": pd.read_feather, "parquet": pd.read_parquet, "xlsx": pd.read_excel}
+    result = reader[extension](output_path)
+    assert result.shape == expected.shape
+    assert list(result.columns) == list(expected.columns)
+    assert not list(tmp_path.glob("*.partial"))
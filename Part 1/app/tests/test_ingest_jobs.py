@@ -0,0 +1,83 @@
+import asyncio
+import os
+
+import pytest
+
+from services.ingest_jobs import IngestJobManager, IngestQueueFullError
+
+
+@pytest.fixture(scope="module")
+def workdir(tmp_path_factory):
+    # Workers write to the relative OUTPUT_DIR of the directory they start in
+    path = tmp_path_factory.mktemp("ingest")
+    previous = os.getcwd()
+    os.chdir(path)
+    yield path
+    os.chdir(previous)
+
+
+@pytest.fixture(scope="module")
+def manager(workdir):
+    manager = IngestJobManager(max_workers=1, queue_depth=1)
+    yield manager
+    manager.shutdown()
+
+
+def upload(workdir, name: str, text: str) -> str:
+    path = workdir / name
+    path.write_text(text)
+    return str(path)
+
+
+def wait(manager: IngestJobManager, file_id: str) -> None:
+    asyncio.run(manager.wait_for_file(file_id, timeout=60))
+
+
+def test_upload_is_cleaned_in_the_background(manager, workdir):
+    finished = []
+    path = upload(workdir, "ok.csv", "name,runs\na,1\nb,2\nb,2\n")
+
+    job = manager.submit("d1", path, "csv", "f1", "ok.csv", finished.append)
+    wait(manager, "f1")
+
+    assert job.status == "completed"
+    assert finished == [job]
+    assert os.path.exists(os.path.join("outputs", "d1.csv"))
+    assert not manager.is_active("d1")
+    assert "running" in job.timings
+
+
+def test_identical_uploads_in_flight_share_a_job(manager, workdir):
+    path = upload(workdir, "same.csv", "name,runs\na,1\n")
+
+    first = manager.submit("d2", path, "csv", "f2", "same.csv", lambda job: None)
+    second = manager.submit("d2", path, "csv", "f3", "same.csv", lambda job: None)
+    wait(manager, "f3")
+
+    assert second is first
+    assert first.file_ids == ["f2", "f3"]
+    assert manager.job_for_file("f2") is manager.job_for_file("f3") is first
+
+
+def test_failed_ingest_is_reported_to_waiting_queries(manager, workdir):
+    path = upload(workdir, "empty.csv", "")
+
+    job = manager.submit("d3", path, "csv", "f4", "empty.csv", lambda job: None)
+
+    with pytest.raises(ValueError, match="Ingest failed"):
+        wait(manager, "f4")
+    assert job.status == "failed"
+    assert job.error
+
+
+def test_full_queue_rejects_new_uploads(manager, workdir):
+    path = upload(workdir, "busy.csv", "name,runs\na,1\n")
+    jobs = [
+        manager.submit(f"q{i}", path, "csv", f"q{i}", "busy.csv", lambda job: None)
+        for i in range(2)
+    ]
+
+    with pytest.raises(IngestQueueFullError):
+        manager.submit("q2", path, "csv", "q2", "busy.csv", lambda job: None)
+    for job in jobs:
+        wait(manager, job.file_ids[0])
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+from services.llm_scheduler import LLMScheduler, LLMTimeoutError, agent_run
+
+
+def scheduler(**kwargs) -> LLMScheduler:
+    options = dict(requests_per_minute=0, max_concurrency=4, backoff=0)
+    options.update(kwargs)
+    return LLMScheduler(**options)
+
+
+def failing(errors):
+    """A model call raising each of errors in turn, then answering "ok"."""
+    errors = list(errors)
+
+    def call():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    return call
+
+
+def test_retryable_error_is_retried_and_halves_the_limit():
+    llm = scheduler()
+
+    assert llm.call(failing([RuntimeError("429 Resource exhausted")])) == "ok"
+
+    stats = llm.stats()
+    assert stats["retries"] == 1
+    assert stats["errors"] == 1
+    assert stats["decreases"] == 1
+    # Halved by the 429, then grown by 1/limit by the successful retry
+    assert stats["limit"] == 2.5
+
+
+def test_bad_request_is_not_retried_and_keeps_the_limit():
+    llm = scheduler()
+
+    with pytest.raises(ValueError):
+        llm.call(failing([ValueError("400 invalid argument")]))
+
+    stats = llm.stats()
+    assert stats["retries"] == 0
+    assert stats["limit"] == 4
+
+
+def test_retries_stop_after_max_retries():
+    llm = scheduler(max_retries=2)
+
+    with pytest.raises(ConnectionError):
+        llm.call(failing([ConnectionError("reset")] * 3))
+
+    assert llm.stats()["retries"] == 2
+
+
+def test_limit_halves_at_most_once_per_second():
+    llm = scheduler()
+
+    llm.call(failing([RuntimeError("503 unavailable")] * 2))
+
+    stats = llm.stats()
+    assert stats["errors"] == 2
+    assert stats["decreases"] == 1
+
+
+def test_limit_grows_additively_up_to_max_concurrency():
+    llm = scheduler(max_concurrency=2)
+    llm.limit = 1.0
+
+    for _ in range(3):
+        llm.call(lambda: "ok")
+
+    assert llm.limit == 2
+
+
+def test_slow_call_times_out_and_shrinks_the_limit():
+    llm = scheduler(timeout=0.05, max_retries=0)
+
+    with pytest.raises(LLMTimeoutError):
+        llm.call(lambda: time.sleep(1))
+
+    stats = llm.stats()
+    assert stats["timeouts"] == 1
+    assert stats["limit"] == 2
+
+
+def test_failure_after_streaming_started_is_not_retried():
+    llm = scheduler()
+
+    def produce():
+        yield "partial"
+        raise RuntimeError("503 unavailable")
+
+    received = []
+    with pytest.raises(RuntimeError):
+        for item in llm.stream(produce):
+            received.append(item)
+
+    assert received == ["partial"]
+    assert llm.stats()["retries"] == 0
+
+
+def test_waiting_calls_are_admitted_by_priority():
+    llm = scheduler(max_concurrency=1, min_concurrency=1)
+    release = threading.Event()
+    order = []
+
+    def run(priority, name):
+        with agent_run(priority):
+            llm.call(lambda: order.append(name))
+
+    blocker = threading.Thread(target=lambda: llm.call(release.wait))
+    blocker.start()
+    while llm.stats()["in_flight"] == 0:
+        time.sleep(0.01)
+    threads = []
+    for priority, name in ((2, "background"), (0, "interactive")):
+        thread = threading.Thread(target=run, args=(priority, name))
+        thread.start()
+        threads.append(thread)
+        while llm.stats()["waiting"] < len(threads):
+            time.sleep(0.01)
+    release.set()
+    for thread in [blocker, *threads]:
+        thread.join()
+
+    assert order == ["interactive", "background"]
@@ -0,0 +1,176 @@
+import pandas as pd
+import pytest
+
+from core.meta_data import MetadataExtractor
+from core.query_planner import QueryPlanner
+
+
+@pytest.fixture(scope="module")
+def players() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "name": ["Messi", "Ronaldo", "Mbappe", "Haaland", "Pedri", "Gavi"],
+            "age": [36, 38, 24, 23, 20, 19],
+            "potential": [94, 92, 95, 94, 91, 90],
+            "goals": [30, 25, 40, 50, 5, 3],
+            "nationality": ["Argentina", "Portugal", "France", "Norway", "Spain", "Spain"],
+            "positions": ["RW,CF", "ST", "ST,LW", "ST", "CM", "CM,CAM"],
+            "preferred_foot": ["Left", "Right", "Right", "Left", "Right", "Right"],
+            "club": ["Miami", "Al Nassr", "Real Madrid", "Man City", "Barcelona", "Barcelona"],
+            "wage_euro": [1_000_000, 3_000_000, 1_200_000, 900_000, 200_000, 150_000],
+            "value_euro": [30e6, 15e6, 180e6, 180e6, 100e6, 90e6],
+        }
+    )
+
+
+@pytest.fixture(scope="module")
+def profile(players):
+    return MetadataExtractor().profile(players)
+
+
+@pytest.fixture
+def plan(players, profile):
+    planner = QueryPlanner()
+
+    def plan(query: str):
+        return planner.plan(query, players, profile)
+
+    return plan
+
+
+def test_top_n(plan, players):
+    result = plan("top 2 players by potential")
+
+    assert result.kind == "top_n"
+    assert result.execute(players)["name"].tolist() == ["Mbappe", "Messi"]
+
+
+def test_bottom_n_with_filter(plan, players):
+    result = plan("lowest 1 players by age where nationality is Spain")
+
+    assert result.execute(players)["name"].tolist() == ["Gavi"]
+
+
+def test_top_n_without_noun(plan, players):
+    result = plan("top 1 by goals")
+
+    assert result.execute(players)["name"].tolist() == ["Haaland"]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        # Ranking groups, not rows: player rows would be a wrong answer
+        "top 5 clubs by wage_euro",
+        "top 5 nationalities by value_euro",
+        "3 nationalities with the highest wage_euro",
+        "top 3 countries by goals",
+        "how many players with the highest potential",
+    ],
+)
+def test_top_n_of_groups_goes_to_the_agent(plan, query):
+    assert plan(query) is None
+
+
+def test_with_the_highest(plan, players):
+    result = plan("3 players with the highest goals")
+
+    assert result.execute(players)["name"].tolist() == ["Haaland", "Mbappe", "Messi"]
+
+
+def test_filter(plan, players):
+    result = plan("players where age less than 21 and preferred foot is right")
+
+    assert result.kind == "filter"
+    assert result.execute(players)["name"].tolist() == ["Pedri", "Gavi"]
+
+
+def test_filter_on_list_column(plan, players):
+    result = plan("show players whose positions is ST")
+
+    assert result.execute(players)["name"].tolist() == ["Ronaldo", "Mbappe", "Haaland"]
+
+
+def test_group_aggregate(plan, players):
+    result = plan("average goals by preferred foot")
+
+    assert result.kind == "group_aggregate"
+    assert result.execute(players).to_dict() == {"Left": 40.0, "Right": 18.25}
+
+
+def test_group_count(plan, players):
+    result = plan("count of players by nationality")
+
+    assert result.kind == "group_count"
+    assert result.execute(players)["Spain"] == 2
+
+
+def test_aggregate(plan, players):
+    result = plan("maximum age")
+
+    assert result.kind == "aggregate"
+    assert result.execute(players) == 38
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("how many players", 6),
+        ("how many rows are there", 6),
+        ("number of players where nationality is Spain", 2),
+        ("how many players where age > 30", 2),
+        ("count", 6),
+    ],
+)
+def test_count_rows(plan, players, query, expected):
+    result = plan(query)
+
+    assert result.kind == "count"
+    assert result.execute(players) == expected
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["how many different nationalities", "how many nationalities are there"],
+)
+def test_count_distinct_values(plan, players, query):
+    result = plan(query)
+
+    assert result.kind == "distinct_count"
+    assert result.execute(players) == 5
+
+
+@pytest.mark.parametrize("query", ["how many goals", "total number of goals"])
+def test_count_of_numeric_column_sums_it(plan, players, query):
+    assert plan(query).execute(players) == 153
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        # Not a column, not the rows
+        "how many assists",
+        "how many trophies are there",
+        # Items of a list column aren't distinct cell values
+        "number of positions",
+        "how many different leagues",
+        # Leftover words that aren't the rows would be dropped from the filter
+        "players under 20 with potential above 85",
+        "left footed players with goals above 10",
+        "how many players under 20 with potential above 85",
+        # Unknown column or value
+        "players where salary is above 10",
+        "players where nationality is Atlantis",
+        "top 3 players by name",
+        "explain the relationship between age and goals",
+    ],
+)
+def test_unmatched_queries_go_to_the_agent(plan, query):
+    assert plan(query) is None
+
+
+def test_render_truncates_long_results():
+    planner = QueryPlanner(max_rows=2)
+    text = planner.render(pd.DataFrame({"x": range(5)}))
+
+    assert "... 3 more rows" in text
@@ -0,0 +1,116 @@
+import multiprocessing
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.repl_pool import ExecutionLimitError, ExecutionLimits, ReplPool, ReplWorker
+
+# RLIMIT_DATA and RssAnon polling rely on Linux
+linux_only = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="memory limits need Linux"
+)
+
+
+@pytest.fixture
+def datasets(tmp_path):
+    paths = {}
+    for name, rows in (("small", 3), ("large", 5)):
+        path = tmp_path / f"{name}.csv"
+        pd.DataFrame({"x": range(rows)}).to_csv(path, index=False)
+        paths[name] = str(path)
+    return paths
+
+
+@pytest.fixture
+def pool():
+    pool = ReplPool(max_workers=1, idle_seconds=0)
+    yield pool
+    pool.shutdown()
+
+
+def test_session_keeps_its_worker_and_variables(pool, datasets):
+    worker = pool.acquire("a", "small", datasets["small"], "csv")
+    worker.run("total = int(df.x.sum())")
+    pool.release("a")
+
+    again = pool.acquire("a", "small", datasets["small"], "csv")
+
+    assert again is worker
+    assert again.run("print(total)").strip() == "3"
+    assert pool.stats()["reused"] == 1
+    pool.release("a")
+
+
+def test_loading_another_dataset_resets_the_namespace(pool, datasets):
+    worker = pool.acquire("a", "small", datasets["small"], "csv")
+    worker.run("total = 1")
+    pool.release("a")
+
+    worker = pool.acquire("a", "large", datasets["large"], "csv")
+
+    assert worker.run("print(len(df))").strip() == "5"
+    assert "NameError" in worker.run("print(total)")
+    pool.release("a")
+
+
+def test_full_pool_evicts_the_least_recently_used_idle_session(pool, datasets):
+    first = pool.acquire("a", "small", datasets["small"], "csv")
+    pool.release("a")
+
+    pool.acquire("b", "small", datasets["small"], "csv")
+
+    assert not first.alive
+    stats = pool.stats()
+    assert stats["workers"] == 1
+    assert stats["evictions"] == 1
+    pool.release("b")
+
+
+def test_acquire_times_out_while_the_only_worker_is_busy(pool, datasets):
+    pool.acquire("a", "small", datasets["small"], "csv")
+
+    with pytest.raises(TimeoutError):
+        pool.acquire("b", "small", datasets["small"], "csv", timeout=0.2)
+    pool.release("a")
+
+
+def test_close_session_spares_a_busy_worker_unless_forced(pool, datasets):
+    worker = pool.acquire("a", "small", datasets["small"], "csv")
+
+    assert not pool.close_session("a")
+    assert pool.close_session("a", force=True)
+    assert not worker.alive
+    assert pool.stats()["workers"] == 0
+
+
+@pytest.fixture
+def limited_worker(tmp_path):
+    # 80 MB of data against a 48 MB limit: only growth after the load counts
+    path = tmp_path / "wide.feather"
+    pd.DataFrame({"x": np.arange(10_000_000, dtype="float64")}).to_feather(path)
+    worker = ReplWorker(
+        multiprocessing.get_context("spawn"),
+        ExecutionLimits(memory_bytes=48 * 2**20),
+    )
+    worker.load("wide", str(path), "feather")
+    yield worker
+    worker.close()
+
+
+@linux_only
+def test_memory_limit_does_not_count_the_loaded_dataset(limited_worker):
+    output = limited_worker.run("small = bytearray(16 * 2**20)\nprint(len(df))")
+
+    assert output.strip() == "10000000"
+
+
+@linux_only
+def test_memory_limit_stops_growth_past_the_limit(limited_worker):
+    try:
+        output = limited_worker.run("big = bytearray(256 * 2**20)")
+    except ExecutionLimitError:
+        return
+    assert "MemoryError" in output
+    assert limited_worker.run("print(len(df))").strip() == "10000000"
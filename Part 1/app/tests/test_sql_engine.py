@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from services.sql_engine import SqlEngine, SqlTable
+from utils.file_handler import FileHandler
+
+
+@pytest.fixture(params=["feather", "parquet", "csv"])
+def players(request, tmp_path):
+    """A dataset of two parts, as left by an append, in each artifact format."""
+    file_type = request.param
+    parts = [
+        pd.DataFrame({"name": ["a", "b", "c"], "team": ["x", "y", "x"], "runs": [10, 30, 20]}),
+        # An appended part may store its columns in another order
+        pd.DataFrame({"runs": [50, 5], "team": ["z", "x"], "name": ["d", "e"]}),
+    ]
+    paths = []
+    for i, part in enumerate(parts):
+        path = str(tmp_path / f"part{i}.{file_type}")
+        FileHandler.write_dataframe(part, path, file_type)
+        paths.append(path)
+    return SqlTable(name="df", paths=paths, file_type=file_type)
+
+
+def test_query_spans_every_part(players):
+    result = SqlEngine().run(
+        "SELECT team, SUM(runs) AS runs FROM df GROUP BY team ORDER BY team", [players]
+    )
+
+    assert result.split() == ["team", "runs", "x", "35", "y", "30", "z", "50"]
+
+
+def test_describe_lists_the_columns_once(players):
+    description = SqlEngine().describe([players])
+
+    assert description.startswith("df: ")
+    assert [column.split()[0] for column in description[4:].split(", ")] == [
+        "name",
+        "team",
+        "runs",
+    ]
+
+
+def test_long_results_are_cut_to_max_rows(players):
+    result = SqlEngine(max_rows=2).run("SELECT name FROM df ORDER BY name", [players])
+
+    assert [line.strip() for line in result.splitlines()[1:3]] == ["a", "b"]
+    assert "first 2 rows shown" in result
+
+
+def test_files_outside_the_tables_cannot_be_read(players, tmp_path):
+    other = tmp_path / "secret.csv"
+    other.write_text("x\n1\n")
+
+    with pytest.raises(Exception, match="disabled"):
+        SqlEngine().run(f"SELECT * FROM read_csv('{other}')", [players])
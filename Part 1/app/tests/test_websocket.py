@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from api.websocket import Connection, ConnectionClosedError, ConnectionManager
+
+
+class FakeWebSocket:
+    """Records sent messages; a cleared `ready` event stalls the client."""
+
+    def __init__(self):
+        self.sent = []
+        self.ready = asyncio.Event()
+        self.ready.set()
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        await self.ready.wait()
+        self.sent.append(message)
+
+
+async def drain():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_messages_are_delivered_in_order():
+    async def main():
+        websocket = FakeWebSocket()
+        connection = Connection(websocket, queue_size=2, send_timeout=1)
+        for i in range(5):
+            await connection.send({"n": i})
+        await drain()
+        await connection.close()
+        return websocket.sent
+
+    assert asyncio.run(main()) == [{"n": i} for i in range(5)]
+
+
+def test_stalled_client_is_closed_and_its_queries_cancelled():
+    async def main():
+        websocket = FakeWebSocket()
+        websocket.ready.clear()
+        connection = Connection(websocket, queue_size=1, send_timeout=0.05)
+        query = asyncio.ensure_future(asyncio.sleep(10))
+        connection.tasks["q"] = query
+        await connection.send({"n": 0})
+        await drain()
+        await connection.send({"n": 1})
+        with pytest.raises(ConnectionClosedError):
+            await connection.send({"n": 2})
+        await drain()
+        with pytest.raises(ConnectionClosedError):
+            await connection.send({"n": 3})
+        return connection, query
+
+    connection, query = asyncio.run(main())
+    assert connection.closed
+    assert query.cancelled()
+
+
+def test_broadcast_skips_full_queues_without_waiting():
+    async def main():
+        manager = ConnectionManager(queue_size=1, send_timeout=1)
+        fast, slow = FakeWebSocket(), FakeWebSocket()
+        slow.ready.clear()
+        fast_connection = await manager.connect(fast)
+        await manager.connect(slow)
+        # The slow client's writer holds one message and its queue another
+        await manager.broadcast({"n": 0})
+        await drain()
+        await manager.broadcast({"n": 1})
+        await drain()
+        queued = await manager.broadcast({"n": 2})
+        await drain()
+        stats = manager.stats()
+        await manager.disconnect(fast_connection)
+        return queued, fast.sent, stats
+
+    queued, fast_sent, stats = asyncio.run(main())
+    assert queued == 1
+    assert fast_sent == [{"n": 0}, {"n": 1}, {"n": 2}]
+    assert stats["connections"] == 2
+    assert stats["queued_messages"] == 1
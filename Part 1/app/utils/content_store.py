@@ -0,0 +1,226 @@
+import os
+import glob
+import hashlib
+import json
+import time
+import logging
+import threading
+from uuid import uuid4
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.file_handler import FileHandler
+
+
+class ContentStore:
+    """
+    A content-addressed store for uploads and their cleaned artifacts.
+    Uploads are keyed by the SHA-256 of their bytes so identical files are
+    stored and processed once; file_ids are references to a digest.
+    """
+
+    INDEX_NAME = "index.json"
+
+    def __init__(
+        self,
+        upload_dir: str,
+        output_dir: str,
+        max_bytes: int,
+        retention_seconds: int = 0,
+    ):
+        """
+        Initialize the ContentStore.
+
+        Args:
+            upload_dir (str): Directory holding upload blobs and the index
+            output_dir (str): Directory holding cleaned artifacts
+            max_bytes (int): Size bound for blobs plus their artifacts
+            retention_seconds (int): Drop file_id references older than this (0 = keep)
+        """
+        self.upload_dir = upload_dir
+        self.output_dir = output_dir
+        self.max_bytes = max_bytes
+        self.retention_seconds = retention_seconds
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._index_path = os.path.join(upload_dir, self.INDEX_NAME)
+        self._index = self._load_index()
+
+    def save_upload(
+        self, upload_file, extension: str, base: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """
+        Stream an upload to disk while hashing it.
+
+        An upload of rows appended to the dataset stored under base is keyed
+        by the hash of base and its own digest, so the same rows appended to
+        the same data are stored and cleaned once. The blob keeps base (and
+        its own base, and so on) from being evicted.
+
+        Returns:
+            Tuple[str, str]: (digest, blob path)
+        """
+        os.makedirs(self.upload_dir, exist_ok=True)
+        tmp_path = os.path.join(self.upload_dir, f".upload-{uuid4()}{extension}")
+        try:
+            digest = FileHandler.save_upload_file(upload_file, tmp_path)
+            if base is not None:
+                digest = hashlib.sha256(f"{base}:{digest}".encode()).hexdigest()
+            blob_path = self.blob_path(digest, extension)
+            with self._lock:
+                if os.path.exists(blob_path):
+                    os.remove(tmp_path)
+                else:
+                    os.replace(tmp_path, blob_path)
+                blob = self._index["blobs"].setdefault(
+                    digest, {"extension": extension}
+                )
+                if base is not None:
+                    blob["base"] = base
+                blob["last_used"] = time.time()
+                self._save_index()
+            return digest, blob_path
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def blob_path(self, digest: str, extension: str) -> str:
+        return os.path.join(self.upload_dir, f"{digest}{extension}")
+
+    def is_processed(self, digest: str) -> bool:
+        """Whether a cleaned artifact already exists for digest."""
+        try:
+            FileHandler.find_output(self.output_dir, digest)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def remove_artifacts(self, digest: str) -> None:
+        """
+        Delete the cleaned artifacts of digest with their sidecars, e.g. the
+        partial output of a failed ingest, keeping the upload blob.
+        """
+        with self._lock:
+            for path in glob.glob(os.path.join(self.output_dir, f"{digest}*")):
+                os.remove(path)
+        self.logger.info(f"Removed artifacts of {digest}")
+
+    def register(self, file_id: str, digest: str, filename: str) -> None:
+        """Point file_id at the blob stored under digest."""
+        with self._lock:
+            self._index["files"][file_id] = {
+                "digest": digest,
+                "filename": filename,
+                "created": time.time(),
+            }
+            if digest in self._index["blobs"]:
+                self._index["blobs"][digest]["last_used"] = time.time()
+            self._save_index()
+
+    def update(self, file_id: str, digest: str) -> None:
+        """Point an existing file_id at another digest, e.g. after an append."""
+        with self._lock:
+            # Uploads that predate the store get an entry now
+            entry = self._index["files"].setdefault(
+                file_id, {"filename": None, "created": time.time()}
+            )
+            entry["digest"] = digest
+            if digest in self._index["blobs"]:
+                self._index["blobs"][digest]["last_used"] = time.time()
+            self._save_index()
+
+    def resolve(self, file_id: str) -> str:
+        """
+        Return the artifact key for file_id.
+        Uploads that predate the store are keyed by their file_id.
+        """
+        with self._lock:
+            entry = self._index["files"].get(file_id)
+        return entry["digest"] if entry else file_id
+
+    def filename(self, file_id: str) -> Optional[str]:
+        """Return the name file_id was uploaded under, if known."""
+        with self._lock:
+            entry = self._index["files"].get(file_id)
+        return entry.get("filename") if entry else None
+
+    def remove(self, file_id: str) -> bool:
+        """Drop the reference held by file_id."""
+        with self._lock:
+            removed = self._index["files"].pop(file_id, None) is not None
+            if removed:
+                self._save_index()
+            return removed
+
+    def evict(self) -> List[str]:
+        """
+        Delete least recently used unreferenced blobs, with their artifacts,
+        until the store fits in max_bytes.
+
+        Returns:
+            List[str]: Digests that were evicted
+        """
+        evicted = []
+        with self._lock:
+            if self.retention_seconds > 0:
+                cutoff = time.time() - self.retention_seconds
+                for file_id, entry in list(self._index["files"].items()):
+                    if entry["created"] < cutoff:
+                        del self._index["files"][file_id]
+
+            referenced = {entry["digest"] for entry in self._index["files"].values()}
+            # Appended datasets read the parts stored under their bases
+            pending = list(referenced)
+            while pending:
+                blob = self._index["blobs"].get(pending.pop(), {})
+                if blob.get("base") and blob["base"] not in referenced:
+                    referenced.add(blob["base"])
+                    pending.append(blob["base"])
+            sizes = {digest: self._blob_size(digest) for digest in self._index["blobs"]}
+            total = sum(sizes.values())
+            candidates = sorted(
+                (d for d in self._index["blobs"] if d not in referenced),
+                key=lambda d: self._index["blobs"][d].get("last_used", 0),
+            )
+            for digest in candidates:
+                if total <= self.max_bytes:
+                    break
+                for path in self._blob_files(digest):
+                    os.remove(path)
+                del self._index["blobs"][digest]
+                total -= sizes[digest]
+                evicted.append(digest)
+                self.logger.info(f"Evicted unreferenced blob {digest}")
+
+            self._save_index()
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "files": len(self._index["files"]),
+                "blobs": len(self._index["blobs"]),
+                "bytes": sum(self._blob_size(d) for d in self._index["blobs"]),
+                "max_bytes": self.max_bytes,
+            }
+
+    def _blob_files(self, digest: str) -> List[str]:
+        return glob.glob(os.path.join(self.upload_dir, f"{digest}*")) + glob.glob(
+            os.path.join(self.output_dir, f"{digest}*")
+        )
+
+    def _blob_size(self, digest: str) -> int:
+        return sum(os.path.getsize(path) for path in self._blob_files(digest))
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"files": {}, "blobs": {}}
+
+    def _save_index(self) -> None:
+        os.makedirs(self.upload_dir, exist_ok=True)
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
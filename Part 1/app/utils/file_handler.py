@@ -1,26 +1,226 @@
-import shutil
-import chardet
+import os
+import json
+import hashlib
 import pandas as pd
+from chardet.universaldetector import UniversalDetector
 from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from uuid import uuid4
+
+# Persisted formats for cleaned datasets, in order of preference when loading
+OUTPUT_FORMATS = ("feather", "parquet", "csv")
+ENCODING_CHUNK_SIZE = 64 * 1024
+ENCODING_SAMPLE_BYTES = 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def partial_path(output_path: str) -> str:
+    """
+    Where an artifact is written before it is moved to output_path, so
+    readers never see a half-written file under the final name.
+    """
+    return f"{output_path}.{uuid4().hex[:8]}.partial"
 
 
 class FileHandler:
     @staticmethod
-    def detect_encoding(file_path: str) -> str:
+    def detect_encoding(
+        file_path: str, max_bytes: int = ENCODING_SAMPLE_BYTES
+    ) -> str:
+        """Detect encoding from at most max_bytes, stopping once chardet is confident."""
+        detector = UniversalDetector()
+        read = 0
         with open(file_path, "rb") as f:
-            result = chardet.detect(f.read())
-        return result["encoding"]
+            while read < max_bytes:
+                chunk = f.read(min(ENCODING_CHUNK_SIZE, max_bytes - read))
+                if not chunk:
+                    break
+                read += len(chunk)
+                detector.feed(chunk)
+                if detector.done:
+                    break
+        detector.close()
+
+        encoding = detector.result["encoding"]
+        # A pure-ASCII sample says nothing about the rest of the file
+        if encoding is None or encoding.lower() == "ascii":
+            return "utf-8"
+        return encoding
+
+    @staticmethod
+    def get_encoding(file_path: str) -> str:
+        """Return the encoding stored in the file's sidecar, detecting it once if missing."""
+        encoding = FileHandler.read_sidecar(file_path).get("encoding")
+        if encoding is None:
+            encoding = FileHandler.detect_encoding(file_path)
+            FileHandler.write_sidecar(file_path, {"encoding": encoding})
+        return encoding
+
+    @staticmethod
+    def sidecar_path(file_path: str) -> str:
+        return f"{file_path}.meta.json"
+
+    @staticmethod
+    def read_sidecar(file_path: str) -> Dict[str, Any]:
+        """Read per-file metadata persisted next to file_path."""
+        try:
+            with open(FileHandler.sidecar_path(file_path), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    @staticmethod
+    def write_sidecar(file_path: str, updates: Dict[str, Any]) -> None:
+        """Merge updates into the per-file metadata persisted next to file_path."""
+        sidecar = FileHandler.read_sidecar(file_path)
+        sidecar.update(updates)
+        tmp_path = f"{FileHandler.sidecar_path(file_path)}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(sidecar, f)
+        os.replace(tmp_path, FileHandler.sidecar_path(file_path))
 
     @staticmethod
-    def save_upload_file(upload_file, file_path: str):
+    def save_upload_file(upload_file, file_path: str) -> str:
+        """Copy an upload to file_path and return the SHA-256 of its bytes."""
+        digest = hashlib.sha256()
         with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
+            while True:
+                chunk = upload_file.file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                buffer.write(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def find_output(output_dir: str, file_id: str) -> Tuple[str, str]:
+        """Return (path, file_type) of the preferred cleaned artifact for file_id."""
+        for file_type in OUTPUT_FORMATS:
+            path = os.path.join(output_dir, f"{file_id}.{file_type}")
+            if os.path.exists(path):
+                return path, file_type
+        raise FileNotFoundError(f"No processed dataset found for file_id {file_id}")
+
+    @staticmethod
+    def find_table(output_dir: str, key: str, table: str) -> str:
+        """
+        Return the dataset key of a table (sheet) of the upload stored under key.
+
+        Tables are listed by name or sheet name in the sidecar of the upload's
+        default artifact; uploads without one only have their default table.
+        """
+        path, _ = FileHandler.find_output(output_dir, key)
+        tables = FileHandler.read_sidecar(path).get("tables", [])
+        for entry in tables:
+            if table in (entry["table"], entry["name"]):
+                return entry["key"]
+        names = ", ".join(entry["table"] for entry in tables) or "none"
+        raise ValueError(f"Unknown table {table!r}; tables: {names}")
+
+    @staticmethod
+    def part_paths(file_path: str, file_type: str) -> List[str]:
+        """
+        Artifacts whose rows make up the dataset at file_path, oldest first.
+        A dataset that had rows appended lists its earlier parts in "parts".
+        """
+        parts = FileHandler.read_sidecar(file_path).get("parts")
+        if not parts:
+            return [file_path]
+        output_dir = os.path.dirname(file_path)
+        return [os.path.join(output_dir, f"{key}.{file_type}") for key in parts]
 
     @staticmethod
     def read_dataframe(file_path: str, file_type: str) -> pd.DataFrame:
-        encoding = FileHandler.detect_encoding(file_path)
-        if file_type == "csv":
-            return pd.read_csv(file_path, encoding=encoding)
+        """Read a dataset, concatenating the parts of one that had rows appended."""
+        paths = FileHandler.part_paths(file_path, file_type)
+        if len(paths) == 1:
+            return FileHandler.read_part(file_path, file_type)
+        return FileHandler.concat_parts(
+            [FileHandler.read_part(path, file_type) for path in paths]
+        )
+
+    @staticmethod
+    def concat_parts(frames: List[pd.DataFrame]) -> pd.DataFrame:
+        """Concatenate parts, keeping columns categorical across their categories."""
+        for col in frames[0].columns:
+            if all(isinstance(df[col].dtype, pd.CategoricalDtype) for df in frames):
+                categories = pd.api.types.union_categoricals(
+                    [df[col] for df in frames]
+                ).categories
+                dtype = pd.CategoricalDtype(categories)
+                frames = [df.assign(**{col: df[col].astype(dtype)}) for df in frames]
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def read_schema(file_path: str, file_type: str) -> pd.DataFrame:
+        """An empty DataFrame with the columns and dtypes of the artifact."""
+        if file_type == "feather":
+            import pyarrow as pa
+
+            with pa.memory_map(file_path) as source:
+                schema = pa.ipc.open_file(source).schema
+            return schema.empty_table().to_pandas()
+        elif file_type == "parquet":
+            import pyarrow.parquet as pq
+
+            return pq.read_schema(file_path).empty_table().to_pandas()
+        # CSV has no schema; infer dtypes from the first rows
+        sample = pd.read_csv(
+            file_path,
+            nrows=1000,
+            encoding=FileHandler.get_encoding(file_path),
+            dtype=FileHandler.read_sidecar(file_path).get("dtypes"),
+        )
+        return sample.head(0)
+
+    @staticmethod
+    def row_hashes_path(output_dir: str, key: str) -> str:
+        """Hashes of the distinct input rows behind the artifacts of key."""
+        return os.path.join(output_dir, f"{key}.rows.npy")
+
+    @staticmethod
+    def read_part(file_path: str, file_type: str) -> pd.DataFrame:
+        if file_type == "feather":
+            import pyarrow.feather as feather
+
+            # Mapping the file saves a read() into a buffer; to_pandas() still
+            # copies the columns into memory owned by the DataFrame
+            table = feather.read_table(file_path, memory_map=True)
+            return table.to_pandas()
+        elif file_type == "parquet":
+            return pd.read_parquet(file_path, memory_map=True)
+
+        elif file_type == "csv":
+            encoding = FileHandler.get_encoding(file_path)
+            # Dtypes chosen at ingest (small ints, categoricals) aren't in the CSV
+            dtypes = FileHandler.read_sidecar(file_path).get("dtypes")
+            return pd.read_csv(file_path, encoding=encoding, dtype=dtypes)
         elif file_type == "xlsx":
-            return pd.read_excel(file_path, encoding=encoding)
+            # Workbooks are zip archives; cell text carries its own encoding
+            return pd.read_excel(file_path, engine="openpyxl")
         raise ValueError(f"Unsupported file type: {file_type}")
+
+    @staticmethod
+    def write_dataframe(df: pd.DataFrame, file_path: str, file_type: str) -> None:
+        """Write df to a temporary file and move it to file_path once complete."""
+        tmp_path = partial_path(file_path)
+        try:
+            if file_type == "feather":
+                # Feather needs a default index; uncompressed loads skip decompression
+                df.reset_index(drop=True).to_feather(tmp_path, compression="uncompressed")
+            elif file_type == "parquet":
+                df.to_parquet(tmp_path, index=False)
+            elif file_type == "csv":
+                df.to_csv(tmp_path, index=False, encoding="utf-8")
+            elif file_type == "xlsx":
+                # openpyxl refuses to write a file without an Excel extension
+                tmp_path += ".xlsx"
+                df.to_excel(tmp_path, index=False, engine="openpyxl")
+            else:
+                raise ValueError(f"Unsupported file type: {file_type}")
+            os.replace(tmp_path, file_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        if file_type == "csv":
+            FileHandler.write_sidecar(file_path, {"encoding": "utf-8"})
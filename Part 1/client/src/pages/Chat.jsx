@@ -9,6 +9,7 @@ const Chat = () => {
     const [conversation, setConversation] = useState([]);
     const [isLoading, setIsLoading] = useState(false);
     const socketRef = useRef(null);
+    const requestIdRef = useRef(null);
     const [fileId, setFileId] = useState("");
 
 
@@ -18,15 +19,26 @@ const Chat = () => {
             console.log("Connected to WebSocket server");
         };
         socketRef.current.onmessage = (event) => {
-            const data = event.data;
-            setConversation((prev) =>
-                prev.map((message, index) =>
-                    index === prev.length - 1 && message.sender === "bot"
-                        ? { ...message, message: data }
-                        : message
-                )
-            );
-            setIsLoading(false);
+            const data = JSON.parse(event.data);
+            // Only update the reply to the query this client is waiting on
+            if (data.request_id !== requestIdRef.current) return;
+            const update = (change) =>
+                setConversation((prev) =>
+                    prev.map((message, index) =>
+                        index === prev.length - 1 && message.sender === "bot"
+                            ? change(message)
+                            : message
+                    )
+                );
+            if (data.type === "token" && data.channel === "answer") {
+                update((message) => ({ ...message, message: message.message + data.text }));
+            } else if (data.type === "final") {
+                update((message) => ({ ...message, message: data.response }));
+                setIsLoading(false);
+            } else if (data.type === "error") {
+                update((message) => ({ ...message, message: data.detail }));
+                setIsLoading(false);
+            }
         };
         socketRef.current.onclose = () => {
             console.log("Disconnected from WebSocket server");
@@ -42,7 +54,8 @@ const Chat = () => {
         if (!message.trim()) return;
         try {
             if (socketRef.current) {
-                const query = { file_id: fileId, query: message };
+                requestIdRef.current = crypto.randomUUID();
+                const query = { file_id: fileId, query: message, request_id: requestIdRef.current };
                 socketRef.current.send(JSON.stringify(query));
                 setConversation((prev) => [...prev, { conversation_id: 1, message, sender: "You" }]);
                 setConversation((prev) => [...prev, { conversation_id: 1, message: "", sender: "bot" }]);